@@ -0,0 +1,161 @@
+import asyncio
+import threading
+import time
+
+
+class AccountSnapshot:
+    """Point-in-time view of balance, margin and open positions"""
+
+    __slots__ = ("balance", "margin_used", "withdrawable", "positions", "fetched_at")
+
+    def __init__(self, balance: float, margin_used: float = 0.0, withdrawable: float = None, positions=None):
+        self.balance = balance
+        self.margin_used = margin_used
+        self.withdrawable = balance - margin_used if withdrawable is None else withdrawable
+        self.positions = positions or []
+        self.fetched_at = time.monotonic()
+
+    def to_dict(self) -> dict:
+        return {
+            "balance": self.balance,
+            "marginUsed": self.margin_used,
+            "withdrawable": self.withdrawable,
+            "positions": self.positions,
+        }
+
+
+class _Flight:
+    """A refresh in progress that other threads can wait on"""
+
+    __slots__ = ("generation", "event", "result", "error")
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class AccountStateCache:
+    """TTL cache for the account state with single-flight refresh
+
+    Concurrent callers that miss the cache share one in-flight fetch instead
+    of each issuing their own request. ``invalidate()`` bumps a generation
+    counter, so a fetch that was already running when our own fill landed is
+    not allowed to repopulate the cache with pre-fill state.
+
+    ``fetch`` is a callable returning an AccountSnapshot; use ``get()`` when it
+    is a plain function and ``aget()`` when it is a coroutine function.
+    """
+
+    def __init__(self, fetch, ttl: float = 2.0):
+        self.fetch = fetch
+        self.ttl = ttl
+        self._snapshot = None
+        self._snapshot_generation = -1
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._inflight = None
+        self._inflight_task = None
+        self._inflight_generation = -1
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    def _fresh(self):
+        snapshot = self._snapshot
+        if (snapshot is not None
+                and self._snapshot_generation == self._generation
+                and time.monotonic() - snapshot.fetched_at < self.ttl):
+            return snapshot
+        return None
+
+    def _store(self, snapshot, generation):
+        if generation == self._generation:
+            self._snapshot = snapshot
+            self._snapshot_generation = generation
+
+    @property
+    def latest(self):
+        """Most recent snapshot even if expired or invalidated, without fetching; None before the first"""
+        return self._snapshot
+
+    def invalidate(self):
+        """Drop the cached snapshot, e.g. after one of our own orders filled"""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+
+    def get(self) -> AccountSnapshot:
+        snapshot = self._fresh()
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+
+        with self._lock:
+            generation = self._generation
+            flight = self._inflight
+            # Only join a refresh that started after the last invalidation
+            leader = flight is None or flight.generation != generation
+            if leader:
+                flight = self._inflight = _Flight(generation)
+
+        if not leader:
+            self.coalesced += 1
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        self.misses += 1
+        try:
+            snapshot = flight.result = self.fetch()
+            self._store(snapshot, generation)
+            return snapshot
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._inflight is flight:
+                    self._inflight = None
+            flight.event.set()
+
+    async def aget(self) -> AccountSnapshot:
+        snapshot = self._fresh()
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+
+        generation = self._generation
+        task = self._inflight_task
+        if task is not None and not task.done() and self._inflight_generation == generation:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.misses += 1
+
+        async def refresh():
+            snapshot = await self.fetch()
+            self._store(snapshot, generation)
+            return snapshot
+
+        task = self._inflight_task = asyncio.ensure_future(refresh())
+        self._inflight_generation = generation
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if task.done() and self._inflight_task is task:
+                self._inflight_task = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "ttl": self.ttl,
+        }
@@ -0,0 +1,114 @@
+import asyncio
+import json
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from app.logger import logger
+
+# Name of the account configured through HYPERLIQUID_PRIVATE_KEY/ACCOUNT_ADDRESS
+MAIN_ACCOUNT = "main"
+
+
+class AccountConfig(BaseModel):
+    """One entry of the accounts file"""
+
+    name: str
+    private_key: str = ""
+    account_address: str = ""
+    size_multiplier: float = Field(default=1.0, gt=0)  # applied to sizes given in the alert
+    assets: Optional[List[str]] = None  # assets this account follows; all when omitted
+    enabled: bool = True
+
+
+def load_account_configs(path: str) -> List[AccountConfig]:
+    """Read enabled accounts from a JSON list (or {"accounts": [...]}) file"""
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("accounts", [])
+    configs = [AccountConfig.model_validate(entry) for entry in data]
+    names = [config.name for config in configs]
+    for name in names:
+        if name == MAIN_ACCOUNT or names.count(name) > 1:
+            raise ValueError(f"Reserved or duplicate account name in {path}: {name}")
+    return [config for config in configs if config.enabled]
+
+
+class Account:
+    """An exchange manager that alerts are copied to, with its sizing rules"""
+
+    __slots__ = ("name", "manager", "size_multiplier", "assets")
+
+    def __init__(self, name: str, manager, size_multiplier: float = 1.0, assets=None):
+        self.name = name
+        self.manager = manager
+        self.size_multiplier = size_multiplier
+        self.assets = frozenset(assets) if assets else None
+
+    def follows(self, asset: str) -> bool:
+        return self.assets is None or asset in self.assets
+
+    def scale(self, size):
+        """Explicit sizes are scaled; None stays None so the account's own sizer decides"""
+        return None if size is None else size * self.size_multiplier
+
+    def queue_key(self, asset: str) -> str:
+        """Executor queue: per asset for the main account, per account and asset otherwise"""
+        return asset if self.name == MAIN_ACCOUNT else f"{self.name}/{asset}"
+
+
+class AccountRegistry:
+    """Accounts that every alert is fanned out to
+
+    The main account is always present. Additional accounts each have their
+    own exchange manager (signer, position book, account cache and sizer);
+    in live mode they share the main account's HTTP client.
+    """
+
+    def __init__(self, main_manager):
+        self.main = Account(MAIN_ACCOUNT, main_manager)
+        self._accounts = {MAIN_ACCOUNT: self.main}
+
+    def add(self, name: str, manager, size_multiplier: float = 1.0, assets=None) -> Account:
+        if name in self._accounts:
+            raise ValueError(f"Account {name} is already registered")
+        account = self._accounts[name] = Account(name, manager, size_multiplier, assets)
+        return account
+
+    def get(self, name: str) -> Account:
+        return self._accounts[name]
+
+    def following(self, asset: str) -> list:
+        """Accounts that take alerts for an asset, main account first"""
+        return [account for account in self._accounts.values() if account.follows(asset)]
+
+    @property
+    def extra(self) -> list:
+        return [account for account in self._accounts.values() if account is not self.main]
+
+    async def start(self):
+        """Start every additional account's manager concurrently"""
+        accounts = [a for a in self.extra if hasattr(a.manager, "start")]
+        results = await asyncio.gather(*(a.manager.start() for a in accounts), return_exceptions=True)
+        for account, result in zip(accounts, results):
+            if isinstance(result, Exception):
+                logger.error("Error starting account %s: %s", account.name, result)
+
+    async def stop(self):
+        accounts = [a for a in self.extra if hasattr(a.manager, "stop")]
+        await asyncio.gather(*(a.manager.stop() for a in accounts), return_exceptions=True)
+
+    def __len__(self) -> int:
+        return len(self._accounts)
+
+    def __iter__(self):
+        return iter(list(self._accounts.values()))
+
+    def stats(self) -> dict:
+        return {
+            account.name: {
+                "size_multiplier": account.size_multiplier,
+                "assets": sorted(account.assets) if account.assets else None,
+                "positions": len(account.manager.positions),
+            }
+            for account in self
+        }
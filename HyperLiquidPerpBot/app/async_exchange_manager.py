@@ -0,0 +1,513 @@
+import asyncio
+import time
+from eth_account import Account
+from app.config import settings
+from app.exchange_manager import ExchangeManager
+from app.hyperliquid_client import ExchangeBackend, HyperliquidClient, HyperliquidAPIError, OrderInDoubtError
+from app.signing import Signer, floor_size, order_action, order_wire, round_price
+from app.logger import logger
+from app.account_cache import AccountSnapshot
+from app.journal import ACKED, INTENT, SUBMITTED
+from app.models import ActionResult
+from app.metrics import timed
+from app.rate_limit import ORDER, read_priority
+from app.sizing import INTERVAL_SECONDS
+
+MAINNET_API_URL = "https://api.hyperliquid.xyz"
+# Slack when matching exchange fill times against our own clock
+FILL_CLOCK_SKEW_MS = 2000
+
+
+class AsyncExchangeManager(ExchangeManager):
+    """ExchangeManager variant that trades through the HyperLiquid REST API
+
+    All exchange calls are coroutines sharing one pooled HTTP client, so
+    concurrent webhooks are processed in parallel on the event loop. Any
+    ExchangeBackend can stand in for the client, e.g. a PaperExchange.
+    """
+
+    # HyperLiquid nets each asset into a single one-way position
+    hedge_mode = False
+
+    def __init__(self, client: ExchangeBackend = None, private_key: str = None, account_address: str = None,
+                 close_client: bool = True):
+        self.client = client or HyperliquidClient()
+        # False when the client is shared with other accounts' managers
+        self.close_client = close_client
+        self.signer = None
+        self.loop = None
+        self.is_mainnet = self.client.base_url == MAINNET_API_URL
+        self._asset_meta = {}
+        self._asset_names = {}
+        self._last_nonce = 0
+        super().__init__(private_key=private_key, account_address=account_address)
+
+    def initialize_exchange(self):
+        """Derive the signer from the configured private key (again after a key update)"""
+        logger.info("Initializing async exchange connection...")
+        previous = self.signer
+        key = self.private_key
+        if not key and self.client.paper:
+            # Paper backends accept any signature; sign with a throwaway key
+            key = Account.create().key
+        self.signer = Signer(key, self.is_mainnet, threads=settings.signer_threads) if key else None
+        if previous is not None:
+            previous.close()
+        logger.info("Successfully initialized exchange for asset %s at %s", self.asset_name, self.client.base_url)
+        return True
+
+    async def start(self):
+        """Bind to the running event loop and load the asset universe"""
+        self.loop = asyncio.get_running_loop()
+        try:
+            await self.load_meta()
+        except HyperliquidAPIError as e:
+            logger.error("Error loading exchange metadata: %s", e)
+        await self.load_candles()
+        try:
+            # Give the sizer an account snapshot before the first alert
+            await self.account_cache.aget()
+        except Exception as e:
+            logger.error("Error loading account state: %s", e)
+
+    async def stop(self):
+        if self.close_client:
+            await self.client.close()
+        if self.signer is not None:
+            self.signer.close()
+
+    def run_coroutine(self, coro, timeout=None):
+        """Run one of this manager's coroutines from a thread outside the event loop"""
+        if self.loop is None:
+            raise RuntimeError("AsyncExchangeManager has not been started")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    async def load_meta(self):
+        meta = await self.client.info({"type": "meta"})
+        self._asset_meta = {
+            asset["name"]: (index, asset["szDecimals"])
+            for index, asset in enumerate(meta["universe"])
+        }
+        self._asset_names = {index: name for name, (index, _) in self._asset_meta.items()}
+        self.sizer.set_size_decimals({name: decimals for name, (_, decimals) in self._asset_meta.items()})
+
+    async def load_candles(self):
+        """Warm the sizer's ATR from recent candles of the traded assets"""
+        assets = {self.asset_name}
+        assets.update(a.strip() for a in settings.market_data_assets.split(",") if a.strip())
+        interval = self.sizer.candle_interval
+        end = int(time.time() * 1000)
+        start = end - INTERVAL_SECONDS[interval] * 1000 * (self.sizer.atr_period + 2)
+        for asset in assets:
+            try:
+                candles = await self.client.info({
+                    "type": "candleSnapshot",
+                    "req": {"coin": asset, "interval": interval, "startTime": start, "endTime": end},
+                })
+                candles = [
+                    (c["t"] / 1000.0, float(c["h"]), float(c["l"]), float(c["c"]))
+                    for c in sorted(candles or [], key=lambda c: c["t"])
+                    if c["T"] < end  # skip the candle that is still open
+                ]
+            except Exception as e:
+                logger.error("Error loading %s candles: %s", asset, e)
+                continue
+            self.sizer.seed_candles(asset, candles)
+
+    async def _asset_info(self, asset):
+        if asset not in self._asset_meta:
+            await self.load_meta()
+        if asset not in self._asset_meta:
+            raise ValueError(f"Unknown asset: {asset}")
+        return self._asset_meta[asset]
+
+    def _next_nonce(self):
+        # Nonces must be unique per signer; millisecond clock, bumped on collisions
+        nonce = max(int(time.time() * 1000), self._last_nonce + 1)
+        self._last_nonce = nonce
+        return nonce
+
+    async def get_mid_price(self, asset):
+        """Mid from the market data cache, falling back to a REST lookup when stale"""
+        mid = self.market_data.get_mid(asset)
+        if mid is not None:
+            return mid
+        mids = await self.client.info({"type": "allMids"})
+        self.market_data.update_mids(mids)
+        return float(mids[asset])
+
+    async def _fetch_account_state(self):
+        state = await self.client.info({"type": "clearinghouseState", "user": self.account_address})
+        margin = state["marginSummary"]
+        return AccountSnapshot(
+            balance=float(margin["accountValue"]),
+            margin_used=float(margin.get("totalMarginUsed", 0.0)),
+            withdrawable=float(state.get("withdrawable", margin["accountValue"])),
+            positions=self._parse_positions(state),
+        )
+
+    @staticmethod
+    def _parse_positions(state):
+        positions = []
+        for entry in state.get("assetPositions", []):
+            position = entry["position"]
+            szi = float(position["szi"])
+            if szi == 0:
+                continue
+            size = abs(szi)
+            positions.append({
+                "asset": position["coin"],
+                "size": size,
+                "direction": "BUY" if szi > 0 else "SELL",
+                "entryPrice": float(position["entryPx"]),
+                "currentPrice": float(position["positionValue"]) / size,
+                "pnl": float(position["unrealizedPnl"]),
+            })
+        return positions
+
+    async def get_account_state(self):
+        """Get the cached account snapshot, refreshing it once the TTL expires"""
+        return await self.account_cache.aget()
+
+    async def get_open_positions(self):
+        """Get current open positions from the exchange"""
+        try:
+            return (await self.get_account_state()).positions
+
+        except Exception as e:
+            logger.error("Error getting open positions: %s", e)
+            return []
+
+    async def get_open_orders(self):
+        """Resting orders on the exchange, or None when the backend does not report them"""
+        orders = await self.client.info({"type": "openOrders", "user": self.account_address})
+        return orders if isinstance(orders, list) else None
+
+    async def sync_positions(self):
+        """Rebuild the local position book from the exchange"""
+        self.account_cache.invalidate()
+        positions = await self.get_open_positions()
+        self.positions.clear()
+        for position in positions:
+            self.positions.apply_fill(position["asset"], position["direction"], position["size"], position["entryPrice"])
+            self.positions.mark(position["asset"], position["currentPrice"])
+        return positions
+
+    async def get_account_balance(self):
+        """Get current account balance"""
+        try:
+            return (await self.get_account_state()).balance
+
+        except Exception as e:
+            logger.error("Error getting account balance: %s", e)
+            return 0.0
+
+    async def _order_wire(self, asset, is_buy, size, slippage, reduce_only=False):
+        """IOC limit order wire priced through the current mid"""
+        # Lookups made for an order are rate limited as part of the order
+        token = read_priority.set(ORDER)
+        try:
+            asset_index, sz_decimals = await self._asset_info(asset)
+            # Sizes round down, so an order never exceeds what was asked or allowed
+            wire_size = floor_size(size, sz_decimals)
+            if wire_size <= 0:
+                raise ValueError(f"Size {size} is below the {asset} minimum of {10 ** -sz_decimals}")
+            mid = await self.get_mid_price(asset)
+        finally:
+            read_priority.reset(token)
+        limit_px = round_price(mid * (1 + slippage) if is_buy else mid * (1 - slippage), sz_decimals)
+        return order_wire(asset_index, is_buy, wire_size, limit_px, reduce_only=reduce_only)
+
+    async def _send_orders(self, wires):
+        """Sign the order wires as one action and return the per-order statuses
+
+        A failure after the request was sent, other than a definite rejection,
+        raises OrderInDoubtError: the orders may have executed. With a journal attached, the orders and their nonce are journaled
+        before signing, and the request is only sent once that ``submitted``
+        record is on disk; the fsync overlaps the signing. Orders whose
+        request went out but got no definite answer stay ``submitted`` for
+        ``resolve_pending_orders``.
+        """
+        signer = self.signer
+        if signer is None:
+            raise RuntimeError("No private key configured for order signing")
+
+        journal = self.journal
+        if journal is None:
+            action = order_action(wires)
+            nonce = self._next_nonce()
+            signature = await signer.sign_async(action, None, nonce)
+            try:
+                response = await self.client.exchange(action, nonce, signature)
+                return response["data"]["statuses"]
+            except HyperliquidAPIError:
+                raise
+            except Exception as e:
+                raise OrderInDoubtError(f"Order request may have been executed: {e}") from e
+
+        ids = journal.intent([{
+            "asset": self._asset_names.get(wire["a"], wire["a"]),
+            "side": "BUY" if wire["b"] else "SELL",
+            "size": float(wire["s"]),
+            "px": float(wire["p"]),
+            "reduce_only": wire["r"],
+        } for wire in wires])
+        try:
+            action = order_action(wires)
+            nonce = self._next_nonce()
+            submitted = journal.submitted(ids, nonce)
+            signature = await signer.sign_async(action, None, nonce)
+            await journal.sync(submitted)
+        except Exception as e:
+            journal.failed(ids, str(e))
+            raise
+        try:
+            response = await self.client.exchange(action, nonce, signature)
+            statuses = response["data"]["statuses"]
+        except OrderInDoubtError:
+            logger.warning("Orders %s may have reached the exchange; left pending in the journal", ids)
+            raise
+        except HyperliquidAPIError as e:
+            journal.failed(ids, str(e))
+            raise
+        except Exception as e:
+            logger.warning("Orders %s may have reached the exchange; left pending in the journal", ids)
+            raise OrderInDoubtError(f"Order request may have been executed: {e}") from e
+        journal.answered(ids, statuses)
+        return statuses
+
+    async def resolve_pending_orders(self) -> dict:
+        """Settle the orders a restart left in doubt against the exchange
+
+        Orders that were never submitted cannot have reached the exchange.
+        Submitted orders are matched against the account's fills since their
+        submission, and resting orders are looked up by oid. The position
+        book itself is repaired by the reconciler.
+        """
+        journal = self.journal
+        if journal is None or not journal.pending:
+            return {}
+        orders = sorted(journal.pending.values(), key=lambda order: order["ts"])
+        fills = None
+        submitted = [order for order in orders if order["state"] == SUBMITTED]
+        if submitted:
+            try:
+                fills = await self.client.info({
+                    "type": "userFillsByTime",
+                    "user": self.account_address,
+                    "startTime": int(submitted[0]["ts"] * 1000) - FILL_CLOCK_SKEW_MS,
+                })
+            except Exception as e:
+                logger.error("Error fetching fills to resolve in-doubt orders: %s", e)
+
+        outcomes = {}
+        used = set()
+        for order in orders:
+            if order["state"] == INTENT:
+                outcome, fields = "not_sent", {}
+            elif order["state"] == ACKED:
+                try:
+                    status = await self.client.info({"type": "orderStatus", "user": self.account_address, "oid": order["oid"]})
+                    outcome = status.get("order", {}).get("status") or status.get("status", "unknown")
+                except Exception as e:
+                    logger.error("Error looking up resting order %s: %s", order['oid'], e)
+                    outcome = "unknown"
+                if outcome == "open":
+                    continue
+                fields = {}
+            elif fills is None:
+                outcome, fields = "unknown", {}
+            else:
+                size = notional = 0.0
+                side = "B" if order["side"] == "BUY" else "A"
+                for i, fill in enumerate(fills):
+                    if (i in used or fill["coin"] != order["asset"] or fill["side"] != side
+                            or fill["time"] < order["ts"] * 1000 - FILL_CLOCK_SKEW_MS or size >= order["size"]):
+                        continue
+                    used.add(i)
+                    size += float(fill["sz"])
+                    notional += float(fill["sz"]) * float(fill["px"])
+                outcome = "filled" if size else "not_filled"
+                fields = {"size": size, "price": notional / size} if size else {}
+            journal.resolved(order["id"], outcome, **fields)
+            outcomes[order["id"]] = outcome
+            logger.warning("In-doubt %s order %s for %s resolved as %s", order["state"], order["id"], order["asset"], outcome)
+        return outcomes
+
+    @staticmethod
+    def _parse_fill(status):
+        """(filled size, avg price) from an order status, raising if it did not fill"""
+        if "filled" in status:
+            filled = status["filled"]
+            return float(filled["totalSz"]), float(filled["avgPx"])
+        if "error" in status:
+            raise HyperliquidAPIError(status["error"])
+        raise HyperliquidAPIError(f"Order not filled: {status}")
+
+    async def _market_order(self, asset, is_buy, size, slippage, reduce_only=False):
+        """Send an IOC limit order priced through the mid and return (filled size, avg price)"""
+        wire = await self._order_wire(asset, is_buy, size, slippage, reduce_only)
+        statuses = await self._send_orders([wire])
+        return self._parse_fill(statuses[0])
+
+    @timed("open_position_seconds")
+    async def open_position(self, is_buy: bool, size: float, slippage: float = 0.05, asset: str = None):
+        """Open a new position on the exchange"""
+        asset = asset or self.asset_name
+        try:
+            direction = "BUY" if is_buy else "SELL"
+            logger.debug("Opening %s position for %s, size: %s, slippage: %s", direction, asset, size, slippage)
+
+            filled_size, avg_px = await self._market_order(asset, is_buy, size, slippage)
+            self.positions.apply_fill(asset, direction, filled_size, avg_px)
+            self.account_cache.invalidate()
+            self._publish_positions()
+
+            logger.info("Opened %s %s position: size %s at %s", asset, direction, filled_size, avg_px)
+            return ActionResult(True, direction, asset, side=direction, size=filled_size, price=avg_px)
+
+        except Exception as e:
+            logger.error("Error opening position: %s", e)
+            return ActionResult.failed("BUY" if is_buy else "SELL", asset, f"Error: {str(e)}",
+                                       in_doubt=isinstance(e, OrderInDoubtError))
+
+    @timed("close_position_seconds")
+    async def close_position(self, size: float, entry_px: float, is_buy: bool, slippage: float = 0.05,
+                             asset: str = None):
+        """Close an existing position on the exchange"""
+        asset = asset or self.asset_name
+        try:
+            close_direction = "SELL" if is_buy else "BUY"
+            logger.debug("Closing %s position for %s, size: %s, entry_px: %s, slippage: %s", close_direction, asset, size, entry_px, slippage)
+
+            filled_size, avg_px = await self._market_order(asset, not is_buy, size, slippage, reduce_only=True)
+            self.positions.close(asset, side="BUY" if is_buy else "SELL", size=filled_size)
+            self.account_cache.invalidate()
+            self._publish_positions()
+
+            if is_buy:
+                pnl = (avg_px - entry_px) * filled_size
+            else:
+                pnl = (entry_px - avg_px) * filled_size
+
+            logger.info("Closed %s position: PnL = %s", asset, pnl)
+            return ActionResult(True, "CLOSE", asset, side="BUY" if is_buy else "SELL", size=filled_size,
+                                price=avg_px, pnl=pnl)
+
+        except Exception as e:
+            logger.error("Error closing position: %s", e)
+            return ActionResult.failed("CLOSE", asset, f"Error: {str(e)}", in_doubt=isinstance(e, OrderInDoubtError))
+
+    @timed("handle_action_seconds")
+    async def handle_action(self, action: str, size=None, asset=None) -> ActionResult:
+        """Process trading actions received from webhooks"""
+        asset = asset or self.asset_name
+        action = str(action).upper()
+        try:
+            logger.debug("Processing action: %s, size: %s, asset: %s", action, size, asset)
+
+            if action in ("BUY", "SELL"):
+                size = self.calculate_max_position_size(asset) if size is None else float(size)
+                if size <= 0:
+                    return ActionResult.failed(action, asset, f"No room for a new {asset} position under the risk limits")
+
+                return await self.open_position(is_buy=action == "BUY", size=size, asset=asset)
+
+            elif action == "CLOSE":
+                position = self.positions.get(asset)
+                if position is None:
+                    # Not in the local book (e.g. after a restart); ask the exchange
+                    await self.sync_positions()
+                    position = self.positions.get(asset)
+                if position is not None:
+                    close_size = float(size) if size is not None else position.size
+
+                    return await self.close_position(
+                        size=close_size,
+                        entry_px=position.entry_price,
+                        is_buy=position.is_buy,
+                        asset=asset
+                    )
+                else:
+                    return ActionResult.failed(action, asset, f"No open {asset} position to close")
+
+            else:
+                return ActionResult.failed(action, asset, f"Unknown action: {action}")
+
+        except Exception as e:
+            logger.error("Error handling action: %s", e)
+            return ActionResult.failed(action, asset, f"Error: {str(e)}", in_doubt=isinstance(e, OrderInDoubtError))
+
+    @timed("submit_batch_seconds")
+    async def submit_batch(self, orders, slippage: float = 0.05):
+        """Send a list of actions as a single signed multi-order request
+
+        Returns one ActionResult per order, in input order, as handle_action
+        would. Orders that cannot be built (e.g. a CLOSE with no open
+        position) fail individually without blocking the rest.
+        """
+        validated = self.validate_batch(orders)
+        results = [None] * len(validated)
+
+        if any(action == "CLOSE" and self.positions.get(asset) is None for action, _, asset in validated):
+            await self.sync_positions()
+
+        wires = []
+        legs = []  # (result index, action, asset, open position for CLOSE)
+        for i, (action, size, asset) in enumerate(validated):
+            try:
+                if action == "CLOSE":
+                    position = self.positions.get(asset)
+                    if position is None:
+                        results[i] = ActionResult.failed(action, asset, f"No open {asset} position to close")
+                        continue
+                    close_size = size if size is not None else position.size
+                    wire = await self._order_wire(asset, not position.is_buy, close_size, slippage, reduce_only=True)
+                else:
+                    position = None
+                    size = self.calculate_max_position_size(asset) if size is None else size
+                    if size <= 0:
+                        raise ValueError(f"No room for a new {asset} position under the risk limits")
+                    wire = await self._order_wire(asset, action == "BUY", size, slippage)
+            except Exception as e:
+                logger.error("Error building batch order for %s: %s", asset, e)
+                results[i] = ActionResult.failed(action, asset, f"Error: {str(e)}")
+                continue
+            wires.append(wire)
+            legs.append((i, action, asset, position))
+
+        if wires:
+            logger.info("Submitting batch of %d orders", len(wires))
+            try:
+                statuses = await self._send_orders(wires)
+            except Exception as e:
+                logger.error("Error submitting batch: %s", e)
+                for i, action, asset, _ in legs:
+                    results[i] = ActionResult.failed(action, asset, f"Error: {str(e)}",
+                                                     in_doubt=isinstance(e, OrderInDoubtError))
+                statuses = []
+
+            for (i, action, asset, position), status in zip(legs, statuses):
+                try:
+                    filled_size, avg_px = self._parse_fill(status)
+                except HyperliquidAPIError as e:
+                    logger.error("Batch order for %s failed: %s", asset, e)
+                    results[i] = ActionResult.failed(action, asset, f"Error: {str(e)}")
+                    continue
+
+                if action == "CLOSE":
+                    self.positions.close(asset, side=position.side, size=filled_size)
+                    if position.is_buy:
+                        pnl = (avg_px - position.entry_price) * filled_size
+                    else:
+                        pnl = (position.entry_price - avg_px) * filled_size
+                    results[i] = ActionResult(True, action, asset, side=position.side, size=filled_size,
+                                              price=avg_px, pnl=pnl)
+                else:
+                    self.positions.apply_fill(asset, action, filled_size, avg_px)
+                    results[i] = ActionResult(True, action, asset, side=action, size=filled_size, price=avg_px)
+
+            self.account_cache.invalidate()
+            self._publish_positions()
+
+        return results
@@ -0,0 +1,413 @@
+"""
+Offline backtest: replay recorded webhook alerts against historical prices.
+
+Alerts go through the regular ExchangeManager.handle_action; only the fills
+are simulated (slippage, taker fee, hourly funding). Prices are streamed, so
+memory stays flat however long the history is.
+
+    python -m app.backtest --alerts alerts.jsonl --prices BTC.csv ETH.csv
+"""
+
+import argparse
+import csv
+import datetime
+import heapq
+import json
+import os
+import time
+from operator import itemgetter
+from app.exchange_manager import ExchangeManager
+from app.logger import logger
+from app.market_data import PriceCache
+from app.models import ActionResult
+
+FUNDING_INTERVAL = 3600
+TS_COLUMNS = ("ts", "timestamp", "time")
+ASSET_COLUMNS = ("asset", "coin", "symbol")
+PRICE_COLUMNS = ("close", "mid", "price")
+
+
+def parse_ts(value) -> float:
+    """Epoch seconds from epoch seconds/milliseconds, an ISO-8601 string or a datetime"""
+    if isinstance(value, datetime.datetime):
+        dt = value
+    else:
+        try:
+            number = float(value)
+            return number / 1000 if number > 1e11 else number
+        except ValueError:
+            dt = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.timestamp()
+
+
+def _ts_converter(sample):
+    """Fastest converter that handles the first value of a timestamp column"""
+    try:
+        number = float(sample)
+    except (TypeError, ValueError):
+        return parse_ts
+    if number > 1e11:
+        return lambda value: float(value) / 1000
+    return float
+
+
+def _pick(columns, names, path, required=True):
+    for name in names:
+        if name in columns:
+            return columns.index(name)
+    if required:
+        raise ValueError(f"{path}: needs one of the columns {', '.join(names)}")
+    return None
+
+
+def _read_csv(path):
+    default_asset = os.path.splitext(os.path.basename(path))[0]
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        columns = [c.strip().lower() for c in next(reader)]
+        ts_i = _pick(columns, TS_COLUMNS, path)
+        asset_i = _pick(columns, ASSET_COLUMNS, path, required=False)
+        px_i = _pick(columns, PRICE_COLUMNS, path)
+        funding_i = _pick(columns, ("funding",), path, required=False)
+
+        convert = None
+        for row in reader:
+            if not row:
+                continue
+            if convert is None:
+                convert = _ts_converter(row[ts_i])
+            funding = row[funding_i] if funding_i is not None else ""
+            yield (
+                convert(row[ts_i]),
+                row[asset_i] if asset_i is not None else default_asset,
+                float(row[px_i]),
+                float(funding) if funding else None,
+            )
+
+
+def _read_parquet(path):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading Parquet price files requires pyarrow (pip install pyarrow)")
+
+    default_asset = os.path.splitext(os.path.basename(path))[0]
+    parquet = pq.ParquetFile(path)
+    columns = [c.lower() for c in parquet.schema_arrow.names]
+    names = parquet.schema_arrow.names
+    ts_name = names[_pick(columns, TS_COLUMNS, path)]
+    asset_i = _pick(columns, ASSET_COLUMNS, path, required=False)
+    px_name = names[_pick(columns, PRICE_COLUMNS, path)]
+    funding_i = _pick(columns, ("funding",), path, required=False)
+
+    convert = None
+    for batch in parquet.iter_batches(batch_size=65536):
+        data = batch.to_pydict()
+        ts_values = data[ts_name]
+        if convert is None and ts_values:
+            convert = _ts_converter(ts_values[0]) if not isinstance(ts_values[0], datetime.datetime) else parse_ts
+        assets = data[names[asset_i]] if asset_i is not None else [default_asset] * len(ts_values)
+        fundings = data[names[funding_i]] if funding_i is not None else [None] * len(ts_values)
+        yield from zip(map(convert, ts_values), assets, data[px_name], fundings)
+
+
+def read_prices(paths):
+    """Stream (ts, asset, price, funding rate or None) rows from time-sorted CSV/Parquet files
+
+    Several files (e.g. one per asset, named after it when there is no asset
+    column) are merged by timestamp.
+    """
+    streams = [_read_parquet(p) if p.endswith((".parquet", ".pq")) else _read_csv(p) for p in paths]
+    if len(streams) == 1:
+        return streams[0]
+    return heapq.merge(*streams, key=itemgetter(0))
+
+
+def read_alerts(path):
+    """Load alerts from a JSON-lines file of webhook payloads with a ``ts`` field, sorted by time"""
+    alerts = []
+    with open(path) as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            payload = json.loads(line)
+            if "ts" not in payload or "action" not in payload:
+                raise ValueError(f"{path}:{line_no}: alerts need 'ts' and 'action' fields")
+            alerts.append((parse_ts(payload.pop("ts")), payload))
+    alerts.sort(key=itemgetter(0))
+    return alerts
+
+
+class FillModel:
+    """Taker fills at the mid plus slippage, with a fee on notional and hourly funding"""
+
+    def __init__(self, slippage_bps: float = 5.0, fee_bps: float = 3.5, funding_rate: float = 0.0):
+        self.slippage = slippage_bps / 10000
+        self.fee = fee_bps / 10000
+        self.funding_rate = funding_rate  # per hour, used when the price data has none
+
+    def fill(self, mid: float, is_buy: bool, size: float):
+        """(fill price, fee) for a market order"""
+        price = mid * (1 + self.slippage) if is_buy else mid * (1 - self.slippage)
+        return price, price * size * self.fee
+
+
+class BacktestExchangeManager(ExchangeManager):
+    """ExchangeManager that fills against replayed prices and keeps a cash ledger
+
+    handle_action is inherited unchanged, so alerts take exactly the live
+    code path down to open_position/close_position.
+    """
+
+    # HyperLiquid nets each asset into a single one-way position
+    hedge_mode = False
+
+    def __init__(self, fill_model: FillModel = None, initial_balance: float = 10000.0):
+        self.fill_model = fill_model or FillModel()
+        self.initial_balance = initial_balance
+        self.prices = {}  # asset -> latest replayed mid
+        self.clock = 0.0
+        self.cash = initial_balance
+        self.realized = 0.0
+        self.fees = 0.0
+        self.funding = 0.0
+        self.fills = []  # (ts, asset, side, size, price, fee, realized)
+        self.closed_pnls = []
+        self.exposure = {}  # asset -> (net signed size, signed cost)
+        self.unrealized = {}  # asset -> unrealized PnL at the latest price
+        self.total_unrealized = 0.0
+        super().__init__(market_data=PriceCache())
+
+    def initialize_exchange(self):
+        return True
+
+    def get_price(self, asset: str, fallback: float = None):
+        return self.prices.get(asset, fallback)
+
+    def _fetch_account_state(self):
+        snapshot = super()._fetch_account_state()
+        snapshot.balance = self.equity
+        return snapshot
+
+    @property
+    def equity(self) -> float:
+        return self.cash + self.total_unrealized
+
+    def _refresh_exposure(self, asset: str):
+        signed = cost = 0.0
+        for position in self.positions.positions():
+            if position.asset == asset:
+                sign = 1 if position.is_buy else -1
+                signed += sign * position.size
+                cost += sign * position.size * position.entry_price
+        if signed:
+            self.exposure[asset] = (signed, cost)
+            unrealized = signed * self.prices[asset] - cost
+        else:
+            self.exposure.pop(asset, None)
+            unrealized = 0.0
+        self.total_unrealized += unrealized - self.unrealized.get(asset, 0.0)
+        self.unrealized[asset] = unrealized
+
+    def _execute(self, asset: str, is_buy: bool, size: float):
+        """Fill a market order, book realized PnL against any opposite position, return fill price"""
+        mid = self.prices.get(asset)
+        if mid is None:
+            raise ValueError(f"No price for {asset} at {self.clock}")
+        price, fee = self.fill_model.fill(mid, is_buy, size)
+
+        realized = 0.0
+        opposite = self.positions.get(asset, "SELL" if is_buy else "BUY")
+        if opposite is not None:
+            reduced = min(opposite.size, size)
+            realized = (opposite.entry_price - price) * reduced if is_buy else (price - opposite.entry_price) * reduced
+            self.closed_pnls.append(realized - fee)
+
+        self.positions.apply_fill(asset, "BUY" if is_buy else "SELL", size, price)
+        self.cash += realized - fee
+        self.realized += realized
+        self.fees += fee
+        self.fills.append((self.clock, asset, "BUY" if is_buy else "SELL", size, price, fee, realized))
+        self._refresh_exposure(asset)
+        return price
+
+    def open_position(self, is_buy: bool, size: float, slippage: float = 0.05, asset: str = None):
+        asset = asset or self.asset_name
+        try:
+            price = self._execute(asset, is_buy, size)
+            direction = "BUY" if is_buy else "SELL"
+            return ActionResult(True, direction, asset, side=direction, size=size, price=price)
+        except Exception as e:
+            logger.error("Backtest open failed: %s", e)
+            return ActionResult.failed("BUY" if is_buy else "SELL", asset, f"Error: {str(e)}")
+
+    def close_position(self, size: float, entry_px: float, is_buy: bool, slippage: float = 0.05,
+                       asset: str = None):
+        asset = asset or self.asset_name
+        try:
+            price = self._execute(asset, not is_buy, size)
+            pnl = (price - entry_px) * size if is_buy else (entry_px - price) * size
+            return ActionResult(True, "CLOSE", asset, side="BUY" if is_buy else "SELL", size=size, price=price, pnl=pnl)
+        except Exception as e:
+            logger.error("Backtest close failed: %s", e)
+            return ActionResult.failed("CLOSE", asset, f"Error: {str(e)}")
+
+    def apply_funding(self, rates: dict):
+        """Charge one funding interval on every open position (longs pay positive rates)"""
+        for asset, (signed, _) in list(self.exposure.items()):
+            rate = rates.get(asset, self.fill_model.funding_rate)
+            payment = signed * self.prices[asset] * rate
+            self.cash -= payment
+            self.funding += payment
+
+
+class Backtest:
+    """Merges alerts into a price stream and tracks equity and drawdown bar by bar"""
+
+    def __init__(self, alerts, prices, fill_model: FillModel = None, initial_balance: float = 10000.0,
+                 curve_interval: float = 86400):
+        self.alerts = alerts
+        self.prices = prices
+        self.manager = BacktestExchangeManager(fill_model, initial_balance)
+        self.curve_interval = curve_interval
+
+    def run(self) -> dict:
+        manager = self.manager
+        alerts = self.alerts
+        started = time.perf_counter()
+
+        peak = manager.initial_balance
+        max_drawdown = 0.0
+        max_drawdown_pct = 0.0
+        rows = 0
+        executed = failed = 0
+        alert_i = 0
+        next_alert_ts = alerts[0][0] if alerts else float("inf")
+        next_funding = None
+        next_curve = None
+        funding_rates = {}
+        curve = []
+        prices = manager.prices
+        exposure = manager.exposure
+        unrealized = manager.unrealized
+        # Alerts without a size are sized by the risk engine, which needs every tick
+        sizer = manager.sizer if any(payload.get("size") is None for _, payload in alerts) else None
+
+        def run_alerts(until):
+            nonlocal alert_i, next_alert_ts, executed, failed
+            while alert_i < len(alerts) and next_alert_ts <= until:
+                ts, payload = alerts[alert_i]
+                manager.clock = ts
+                if sizer is not None and payload.get("size") is None:
+                    manager.account_cache.invalidate()
+                    manager.account_cache.get()
+                result = manager.handle_action(payload["action"], size=payload.get("size"),
+                                               asset=payload.get("asset"))
+                if result.success:
+                    executed += 1
+                else:
+                    failed += 1
+                alert_i += 1
+                next_alert_ts = alerts[alert_i][0] if alert_i < len(alerts) else float("inf")
+
+        for ts, asset, price, funding in self.prices:
+            if ts >= next_alert_ts:
+                # Alerts execute against prices strictly before their timestamp
+                run_alerts(ts - 1e-9)
+            if next_funding is None:
+                next_funding = ts - ts % FUNDING_INTERVAL + FUNDING_INTERVAL
+                next_curve = ts - ts % self.curve_interval + self.curve_interval
+            elif ts >= next_funding:
+                manager.apply_funding(funding_rates)
+                next_funding += FUNDING_INTERVAL * ((ts - next_funding) // FUNDING_INTERVAL + 1)
+
+            prices[asset] = price
+            if sizer is not None:
+                sizer.on_price(asset, price, ts)
+            if funding is not None:
+                funding_rates[asset] = funding
+            rows += 1
+
+            position = exposure.get(asset)
+            if position is not None:
+                value = position[0] * price - position[1]
+                manager.total_unrealized += value - unrealized[asset]
+                unrealized[asset] = value
+            equity = manager.cash + manager.total_unrealized
+            if equity > peak:
+                peak = equity
+            elif peak - equity > max_drawdown:
+                max_drawdown = peak - equity
+                max_drawdown_pct = max_drawdown / peak
+
+            if ts >= next_curve:
+                curve.append((next_curve, equity))
+                next_curve += self.curve_interval * ((ts - next_curve) // self.curve_interval + 1)
+
+        run_alerts(float("inf"))
+        return self._results(rows, executed, failed, max_drawdown, max_drawdown_pct, curve,
+                             time.perf_counter() - started)
+
+    def _results(self, rows, executed, failed, max_drawdown, max_drawdown_pct, curve, elapsed):
+        manager = self.manager
+        wins = [p for p in manager.closed_pnls if p > 0]
+        losses = [p for p in manager.closed_pnls if p <= 0]
+        for asset in manager.positions.assets():
+            manager.positions.mark(asset, manager.prices[asset])
+        per_asset = {}
+        for _, asset, _, _, _, fee, realized in manager.fills:
+            per_asset[asset] = per_asset.get(asset, 0.0) + realized - fee
+        return {
+            "initial_balance": manager.initial_balance,
+            "final_equity": manager.equity,
+            "total_pnl": manager.equity - manager.initial_balance,
+            "realized_pnl": manager.realized,
+            "unrealized_pnl": manager.total_unrealized,
+            "fees": manager.fees,
+            "funding": manager.funding,
+            "max_drawdown": max_drawdown,
+            "max_drawdown_pct": max_drawdown_pct,
+            "fills": len(manager.fills),
+            "closed_trades": len(manager.closed_pnls),
+            "win_rate": len(wins) / len(manager.closed_pnls) if manager.closed_pnls else 0.0,
+            "avg_win": sum(wins) / len(wins) if wins else 0.0,
+            "avg_loss": sum(losses) / len(losses) if losses else 0.0,
+            "profit_factor": sum(wins) / -sum(losses) if losses and sum(losses) < 0 else None,
+            "pnl_by_asset": per_asset,
+            "open_positions": manager.positions.to_list(),
+            "alerts_executed": executed,
+            "alerts_failed": failed,
+            "price_rows": rows,
+            "elapsed_seconds": elapsed,
+            "equity_curve": curve,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded alerts against historical prices")
+    parser.add_argument("--alerts", required=True, help="JSON lines of webhook payloads with a 'ts' field")
+    parser.add_argument("--prices", required=True, nargs="+", help="time-sorted CSV or Parquet price files")
+    parser.add_argument("--balance", type=float, default=10000.0)
+    parser.add_argument("--slippage-bps", type=float, default=5.0)
+    parser.add_argument("--fee-bps", type=float, default=3.5)
+    parser.add_argument("--funding-rate", type=float, default=0.0, help="hourly rate when prices carry none")
+    parser.add_argument("--curve", action="store_true", help="include the daily equity curve")
+    args = parser.parse_args()
+
+    backtest = Backtest(
+        read_alerts(args.alerts),
+        read_prices(args.prices),
+        FillModel(args.slippage_bps, args.fee_bps, args.funding_rate),
+        args.balance,
+    )
+    results = backtest.run()
+    if not args.curve:
+        results.pop("equity_curve")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,16 +7,89 @@ class Settings(BaseSettings):
     hyperliquid_private_key: str = Field(default="", env='HYPERLIQUID_PRIVATE_KEY')
     hyperliquid_account_address: str = Field(default="", env='HYPERLIQUID_ACCOUNT_ADDRESS')
     hyperliquid_monitoring_address: str = Field(default="", env='HYPERLIQUID_MONITORING_ADDRESS')
+    hyperliquid_api_url: str = Field(default="https://api.hyperliquid.xyz", env='HYPERLIQUID_API_URL')
+    
+    hyperliquid_ws_url: str = Field(default="wss://api.hyperliquid.xyz/ws", env='HYPERLIQUID_WS_URL')
+    
+    # Market data feed settings
+    # None: on for the live and paper backends or a replay file, off in demo mode
+    market_data_enabled: bool | None = Field(default=None)
+    market_data_assets: str = Field(default="")  # comma-separated l2Book assets, defaults to asset_name
+    market_data_stale_after: float = Field(default=10.0)
+    market_data_replay_file: str = Field(default="")  # replay recorded messages instead of connecting
+    market_data_replay_loop: bool = Field(default=False)  # restart the replay file at its end
+    
+    # HTTP client settings for the async exchange path
+    http_timeout: float = Field(default=10.0)
+    http_max_connections: int = Field(default=20)
+    http_max_keepalive: int = Field(default=10)
+    http_retries: int = Field(default=2)
+    http_retry_backoff: float = Field(default=0.2)
+    
+    # HyperLiquid request weight budget per IP (see README)
+    rate_limit_enabled: bool = Field(default=True)
+    rate_limit_weight_per_minute: int = Field(default=1200)
+    rate_limit_burst: int = Field(default=200)  # weight that can be spent at once; the rest is paced
+    
+    # Worker threads that sign orders off the event loop
+    signer_threads: int = Field(default=2)
     
     # Trading settings
     asset_name: str = Field(default="ETH")
     leverage: int = Field(default=5)
     is_cross: bool = Field(default=True)
     
+    # JSON file of additional accounts every alert is copied to (see README)
+    accounts_file: str = Field(default="")
+    
+    # Risk-based sizing for alerts without an explicit size
+    sizing_risk_per_trade: float = Field(default=0.01)  # fraction of equity lost if the stop is hit
+    sizing_atr_multiple: float = Field(default=2.0)  # stop distance in ATRs
+    sizing_atr_period: int = Field(default=14)
+    sizing_candle_interval: str = Field(default="15m")
+    sizing_default_stop: float = Field(default=0.02)  # stop as a fraction of price until the ATR is known
+    sizing_max_gross_exposure: float = Field(default=3.0)  # total open notional / equity
+    sizing_max_asset_exposure: float = Field(default=1.0)  # open notional per asset / equity
+    sizing_fallback_size: float = Field(default=0.1)  # used before any balance or price is known
+    
+    # Background reconciliation of the position book against the exchange
+    reconcile_enabled: bool = Field(default=True)
+    reconcile_min_interval: float = Field(default=2.0)  # seconds, right after our own fills or drift
+    reconcile_max_interval: float = Field(default=60.0)  # seconds, reached by doubling while idle
+    
+    # Crash-safe journal of orders and positions, replayed on startup
+    journal_enabled: bool = Field(default=True)
+    journal_dir: str = Field(default="journal")
+    journal_snapshot_every: int = Field(default=2000)  # records between snapshots
+    
+    # Exchange backend: "live" (HyperLiquid API), "paper" (in-process
+    # simulator fed by the market data cache), "demo", or "auto" (live when
+    # keys are set, demo otherwise)
+    exchange_backend: str = Field(default="auto")
+    paper_balance: float = Field(default=10000.0)
+    paper_taker_fee_bps: float = Field(default=4.5)
+    paper_maker_fee_bps: float = Field(default=1.5)
+    paper_level_notional: float = Field(default=250000.0)  # USD depth per book level
+    paper_latency_ms: float = Field(default=0.0)  # simulated round-trip per request
+    
+    # Seconds a cached balance/positions snapshot is served before refreshing
+    account_cache_ttl: float = Field(default=2.0)
+    
+    # Pending actions allowed per asset before webhooks get HTTP 429
+    executor_max_queue_size: int = Field(default=100)
+    executor_idle_timeout: float = Field(default=300.0)  # seconds before an idle asset queue is removed
+    
     # API settings
     api_host: str = Field(default="0.0.0.0")
     api_port: int = Field(default=8000)
     
+    # Logging settings
+    log_level: str = Field(default="INFO")
+    log_dir: str = Field(default="logs")
+    log_json: bool = Field(default=True)  # JSON lines in the log file, plain text otherwise
+    log_backup_count: int = Field(default=14)  # rotated daily files kept
+    log_debug_sample_rate: int = Field(default=10)  # keep 1 in N DEBUG records per call site
+    
     # UI settings
     ui_host: str = Field(default="0.0.0.0")
     ui_port: int = Field(default=5000)
@@ -0,0 +1,110 @@
+import asyncio
+import itertools
+import queue
+import threading
+import time
+
+# Queued to a subscriber that fell behind; it should reload a full snapshot
+RESYNC = object()
+
+
+class Event:
+    __slots__ = ("id", "type", "data", "timestamp")
+
+    def __init__(self, event_id: int, event_type: str, data):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+        self.timestamp = time.time()
+
+
+class Subscription:
+    """Bounded per-subscriber event queue, readable from a thread or a coroutine"""
+
+    def __init__(self, maxsize: int):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self._loop = None
+        self._ready = None  # asyncio.Event set when an event is queued for aget
+
+    def _wake(self):
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            pass  # loop closed
+
+    def put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # Slow consumer: drop its backlog and ask it to resync
+            self.dropped += 1
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._queue.put_nowait(RESYNC)
+        self._wake()
+
+    def get(self, timeout: float = None):
+        """Next event, RESYNC, or raise queue.Empty after timeout"""
+        return self._queue.get(timeout=timeout)
+
+    async def aget(self, timeout: float = None):
+        """Await the next event, RESYNC, or raise queue.Empty after timeout"""
+        if self._loop is None:
+            self._ready = asyncio.Event()
+            self._loop = asyncio.get_running_loop()
+        while True:
+            self._ready.clear()
+            try:
+                return self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                raise queue.Empty
+
+
+class EventBus:
+    """Thread-safe fan-out of dashboard deltas (trades, balance, status, positions)"""
+
+    def __init__(self, subscriber_queue_size: int = 1000):
+        self.subscriber_queue_size = subscriber_queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.published = 0
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.subscriber_queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event_type: str, data):
+        with self._lock:
+            if not self._subscribers:
+                return
+            event = Event(next(self._ids), event_type, data)
+            subscribers = list(self._subscribers)
+        self.published += 1
+        for subscription in subscribers:
+            subscription.put(event)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+# Shared bus between the webhook side and the dashboard stream
+event_bus = EventBus()
@@ -8,27 +8,54 @@ from eth_account.datastructures import SignedMessage
 import logging
 from app.config import settings
 from app.logger import logger
+from app.position_book import PositionBook
+from app.account_cache import AccountSnapshot, AccountStateCache
+from app.sizing import PositionSizer
+from app.models import ActionResult
+from app.market_data import price_cache
+from app.events import event_bus
+from app.metrics import timed
+
+# Upper bound on orders accepted in one submit_batch call
+MAX_BATCH_ORDERS = 50
 
 class ExchangeManager:
-    def __init__(self):
-        self.private_key = settings.hyperliquid_private_key
-        self.account_address = settings.hyperliquid_account_address
+    # Long and short positions in one asset are tracked separately
+    hedge_mode = True
+    # OrderJournal the book and orders are journaled to, set by the webhook handler
+    journal = None
+
+    def __init__(self, market_data=None, private_key: str = None, account_address: str = None):
+        # Credentials default to the configured main account
+        self.private_key = private_key if private_key is not None else settings.hyperliquid_private_key
+        self.account_address = account_address if account_address is not None else settings.hyperliquid_account_address
         self.monitoring_address = settings.hyperliquid_monitoring_address
         self.asset_name = settings.asset_name
         self.leverage = settings.leverage
         self.is_cross = settings.is_cross
         self.status = "INITIALIZED"
         self.exchange = None
-        self.positions = []
+        self.positions = PositionBook(hedge_mode=self.hedge_mode)
+        self.account_cache = AccountStateCache(self._fetch_account_state, ttl=settings.account_cache_ttl)
+        self.sizer = PositionSizer(self.account_cache, self.leverage)
+        self.positions.add_listener(self.sizer.on_position)
+        self.market_data = market_data or price_cache
+        self.market_data.add_listener(self._on_price)
         
         try:
             self.initialize_exchange()
         except Exception as e:
-            logger.error(f"Error initializing exchange: {e}")
+            logger.error("Error initializing exchange: %s", e)
     
-    def calculate_max_position_size(self):
-        # TODO: Implement based on available balance
-        return 0.1  # Default conservative value
+    def calculate_max_position_size(self, asset=None):
+        """Risk-based size for an order without an explicit size"""
+        asset = asset or self.asset_name
+        if self.sizer.price(asset) is None:
+            # No tick seen since startup; start from the cached mid
+            mid = self.market_data.get_mid(asset)
+            if mid is not None:
+                self.sizer.on_price(asset, mid)
+        return self.sizer.max_size(asset)
     
     def initialize_exchange(self):
         """Initialize the exchange connection and verify API access"""
@@ -36,86 +63,93 @@ class ExchangeManager:
         
         # Here we would normally authenticate with the exchange
         # For now, we'll just log that it was successful
-        logger.info(f"Successfully initialized exchange for asset {self.asset_name}")
+        logger.info("Successfully initialized exchange for asset %s", self.asset_name)
         
         # Additional initialization steps would go here
         
         return True
     
+    def _on_price(self, asset, mid):
+        """Mark open positions to the latest mid and feed the sizer"""
+        self.sizer.on_price(asset, mid)
+        if asset in self.positions:
+            self.positions.mark(asset, mid)
+    
+    def _publish_positions(self):
+        """Push the current position book to dashboard subscribers"""
+        event_bus.publish("positions", self.positions.to_list())
+    
+    def get_price(self, asset: str, fallback: float = None):
+        """Latest cached mid for an asset, or the fallback when the feed has none"""
+        return self.market_data.get_price(asset, fallback)
+    
+    def _fetch_account_state(self):
+        """Build an account snapshot; demo mode derives it from local state"""
+        positions = self.positions.to_list()
+        margin_used = sum(p["size"] * p["entryPrice"] for p in positions) / self.leverage
+        return AccountSnapshot(balance=10000.0, margin_used=margin_used, positions=positions)
+    
+    def get_account_state(self):
+        """Get the cached account snapshot, refreshing it once the TTL expires"""
+        return self.account_cache.get()
+    
     def get_open_positions(self):
         """Get current open positions from the exchange"""
         try:
-            # In a real implementation, this would call the HyperLiquid API
-            # For demonstration, we'll return an example
-            
-            # Example position data structure
-            # In a real implementation, this would be retrieved from the exchange
-            if len(self.positions) > 0:
-                return self.positions
-            else:
-                return []
+            return self.get_account_state().positions
                 
         except Exception as e:
-            logger.error(f"Error getting open positions: {e}")
+            logger.error("Error getting open positions: %s", e)
             return []
     
     def get_account_balance(self):
         """Get current account balance"""
         try:
-            # In a real implementation, this would call the HyperLiquid API
-            # For demonstration, we'll return an example value
-            return 10000.0  # Example balance
+            return self.get_account_state().balance
             
         except Exception as e:
-            logger.error(f"Error getting account balance: {e}")
+            logger.error("Error getting account balance: %s", e)
             return 0.0
     
-    def open_position(self, is_buy: bool, size: float, slippage: float = 0.05):
+    @timed("open_position_seconds", "Time to open a position")
+    def open_position(self, is_buy: bool, size: float, slippage: float = 0.05, asset: str = None):
         """Open a new position on the exchange"""
+        asset = asset or self.asset_name
         try:
             direction = "BUY" if is_buy else "SELL"
-            logger.info(f"Opening {direction} position for {self.asset_name}, size: {size}, slippage: {slippage}")
+            logger.debug("Opening %s position for %s, size: %s, slippage: %s", direction, asset, size, slippage)
             
             # Here we would normally call the exchange API to open a position
             # For now, we'll just simulate it
             
-            # Get current price (in real implementation from API)
-            current_price = 3500.0  # Example price for ETH
+            # Get current price from the market data cache
+            current_price = self.get_price(asset, fallback=3500.0)  # Example price for ETH without a feed
             
-            # Create position record
-            position = {
-                "asset": self.asset_name,
-                "size": size,
-                "direction": direction,
-                "entryPrice": current_price,
-                "currentPrice": current_price,
-                "pnl": 0.0
-            }
+            # Net the fill into the position book
+            self.positions.apply_fill(asset, direction, size, current_price)
+            self.account_cache.invalidate()
+            self._publish_positions()
             
-            # Add to positions list
-            self.positions.append(position)
-            
-            # In a real implementation, save trade to database
-            # self.db_manager.record_trade(self.asset_name, direction, size, current_price, 0.0)
-            
-            logger.info(f"Successfully opened {direction} position: {position}")
-            return True, position
+            logger.info("Opened %s %s position: size %s at %s", asset, direction, size, current_price)
+            return ActionResult(True, direction, asset, side=direction, size=size, price=current_price)
             
         except Exception as e:
-            logger.error(f"Error opening position: {e}")
-            return False, None
+            logger.error("Error opening position: %s", e)
+            return ActionResult.failed("BUY" if is_buy else "SELL", asset, f"Error: {str(e)}")
     
-    def close_position(self, size: float, entry_px: float, is_buy: bool, slippage: float = 0.05):
+    @timed("close_position_seconds", "Time to close a position")
+    def close_position(self, size: float, entry_px: float, is_buy: bool, slippage: float = 0.05, asset: str = None):
         """Close an existing position on the exchange"""
+        asset = asset or self.asset_name
         try:
             close_direction = "SELL" if is_buy else "BUY"
-            logger.info(f"Closing {close_direction} position for {self.asset_name}, size: {size}, entry_px: {entry_px}, slippage: {slippage}")
+            logger.debug("Closing %s position for %s, size: %s, entry_px: %s, slippage: %s", close_direction, asset, size, entry_px, slippage)
             
             # Here we would normally call the exchange API to close a position
             # For now, we'll just simulate it
             
-            # Get current price (in real implementation from API)
-            current_price = 3600.0  # Example price for ETH
+            # Get current price from the market data cache
+            current_price = self.get_price(asset, fallback=3600.0)  # Example price for ETH without a feed
             
             # Calculate PnL
             if is_buy:
@@ -123,71 +157,101 @@ class ExchangeManager:
             else:
                 pnl = (entry_px - current_price) * size
             
-            # In a real implementation, save trade to database with PnL
-            # self.db_manager.record_trade(self.asset_name, f"CLOSE_{close_direction}", size, current_price, pnl)
-            
-            # Remove from positions list (in real impl, this would be based on position ID)
-            if len(self.positions) > 0:
-                self.positions.pop(0)
+            # Reduce the closed side of the asset's position
+            self.positions.close(asset, side="BUY" if is_buy else "SELL", size=size)
+            self.account_cache.invalidate()
+            self._publish_positions()
             
-            logger.info(f"Successfully closed position: PnL = {pnl}")
-            return True, pnl
+            logger.info("Closed %s position: PnL = %s", asset, pnl)
+            return ActionResult(True, "CLOSE", asset, side="BUY" if is_buy else "SELL", size=size,
+                                price=current_price, pnl=pnl)
             
         except Exception as e:
-            logger.error(f"Error closing position: {e}")
-            return False, 0.0
+            logger.error("Error closing position: %s", e)
+            return ActionResult.failed("CLOSE", asset, f"Error: {str(e)}")
     
-    def handle_action(self, action: str, size=None, asset=None):
+    @timed("handle_action_seconds", "Time to execute one webhook action on the exchange")
+    def handle_action(self, action: str, size=None, asset=None) -> ActionResult:
         """Process trading actions received from webhooks"""
+        # The asset is passed through explicitly so concurrent actions for
+        # different assets never share mutable state
+        asset = asset or self.asset_name
+        action = str(action).upper()
         try:
-            logger.info(f"Processing action: {action}, size: {size}, asset: {asset}")
+            logger.debug("Processing action: %s, size: %s, asset: %s", action, size, asset)
             
-            # Override asset name if provided
-            if asset:
-                current_asset = self.asset_name
-                self.asset_name = asset
-                logger.info(f"Temporarily changing asset from {current_asset} to {asset}")
-            
-            if action.upper() == "BUY":
-                # Use provided size or calculate if not provided
-                if size is None:
-                    size = self.calculate_max_position_size()
-                else:
-                    size = float(size)  # Convert to float in case it's a string
-                
-                success, position = self.open_position(is_buy=True, size=size)
-                return success, f"Opened BUY position: {position}"
-                
-            elif action.upper() == "SELL":
+            if action in ("BUY", "SELL"):
                 # Use provided size or calculate if not provided
                 if size is None:
-                    size = self.calculate_max_position_size()
+                    size = self.calculate_max_position_size(asset)
+                    if size <= 0:
+                        return ActionResult.failed(action, asset, f"No room for a new {asset} position under the risk limits")
                 else:
                     size = float(size)  # Convert to float in case it's a string
                 
-                success, position = self.open_position(is_buy=False, size=size)
-                return success, f"Opened SELL position: {position}"
+                return self.open_position(is_buy=action == "BUY", size=size, asset=asset)
                 
-            elif action.upper() == "CLOSE":
-                # In a real implementation, we would get the position details from the exchange
-                positions = self.get_open_positions()
-                if len(positions) > 0:
-                    position = positions[0]
+            elif action == "CLOSE":
+                position = self.positions.get(asset)
+                if position is not None:
                     # Use provided size or use position's size
-                    close_size = float(size) if size is not None else position["size"]
+                    close_size = float(size) if size is not None else position.size
                     
-                    success, pnl = self.close_position(
+                    return self.close_position(
                         size=close_size,
-                        entry_px=position["entryPrice"],
-                        is_buy=(position["direction"] == "BUY")
+                        entry_px=position.entry_price,
+                        is_buy=position.is_buy,
+                        asset=asset
                     )
-                    return success, f"Closed position with PnL: {pnl}"
                 else:
-                    return False, "No open positions to close"
+                    return ActionResult.failed(action, asset, f"No open {asset} position to close")
                     
             else:
-                return False, f"Unknown action: {action}"
+                return ActionResult.failed(action, asset, f"Unknown action: {action}")
                 
         except Exception as e:
-            logger.error(f"Error handling action: {e}")
-            return False, f"Error: {str(e)}"
\ No newline at end of file
+            logger.error("Error handling action: %s", e)
+            return ActionResult.failed(action, asset, f"Error: {str(e)}")
+    
+    def validate_batch(self, orders):
+        """Normalize a list of {action, size, asset} dicts to (ACTION, size, asset) tuples
+        
+        Raises ValueError describing the first invalid order. An asset may
+        appear only once, since the orders of one batch execute together.
+        """
+        if not isinstance(orders, list) or not orders:
+            raise ValueError("'orders' must be a non-empty list")
+        if len(orders) > MAX_BATCH_ORDERS:
+            raise ValueError(f"Batch has {len(orders)} orders, the limit is {MAX_BATCH_ORDERS}")
+        
+        validated = []
+        seen = set()
+        for i, order in enumerate(orders):
+            if not isinstance(order, dict) or "action" not in order:
+                raise ValueError(f"Order {i}: missing 'action' field")
+            action = str(order["action"]).upper()
+            if action not in ("BUY", "SELL", "CLOSE"):
+                raise ValueError(f"Order {i}: unknown action {order['action']}")
+            size = order.get("size")
+            if size is not None:
+                try:
+                    size = float(size)
+                except (TypeError, ValueError):
+                    raise ValueError(f"Order {i}: invalid size {size!r}")
+                if size <= 0:
+                    raise ValueError(f"Order {i}: size must be positive")
+            asset = order.get("asset") or self.asset_name
+            if asset in seen:
+                raise ValueError(f"Order {i}: duplicate asset {asset} in batch")
+            seen.add(asset)
+            validated.append((action, size, asset))
+        return validated
+    
+    @timed("submit_batch_seconds", "Time to execute a batch of actions")
+    def submit_batch(self, orders):
+        """Execute a list of actions and return one ActionResult per order
+        
+        The demo exchange has no bulk endpoint, so orders run one after another.
+        """
+        return [self.handle_action(action, size=size, asset=asset)
+                for action, size, asset in self.validate_batch(orders)]
@@ -0,0 +1,180 @@
+import asyncio
+import contextvars
+import time
+from app.logger import logger
+from app.metrics import metrics
+
+
+class QueueFullError(Exception):
+    """Raised when an asset's order queue is at capacity"""
+
+
+class AssetQueue:
+    """FIFO of pending actions for one asset, drained by a single worker"""
+
+    def __init__(self, asset: str, maxsize: int):
+        self.asset = asset
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.worker = None
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait = metrics.histogram("executor_wait_seconds", "Time actions spend queued per asset", asset=asset)
+        self.execution = metrics.histogram("executor_exec_seconds", "Time to execute a queued action", asset=asset)
+        metrics.gauge("executor_queue_depth", self.queue.qsize, "Actions waiting per asset", asset=asset)
+
+    def unregister(self):
+        for name in ("executor_wait_seconds", "executor_exec_seconds", "executor_queue_depth"):
+            metrics.remove(name, asset=self.asset)
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.queue.qsize(),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "wait": self.wait.summary(),
+            "execution": self.execution.summary(),
+        }
+
+
+class OrderExecutor:
+    """Routes actions to per-asset queues: strict FIFO per asset, parallel across assets
+
+    Each asset gets a bounded queue and one worker task, created on first
+    use. ``submit`` raises QueueFullError instead of queueing without bound,
+    so callers can push back (HTTP 429) when an alert stream outruns the
+    exchange. A queue left empty for ``idle_timeout`` seconds is removed
+    with its worker and metrics, so unknown or one-off assets do not pile up.
+    """
+
+    def __init__(self, max_queue_size: int = 100, idle_timeout: float = 300.0):
+        self.max_queue_size = max_queue_size
+        self.idle_timeout = idle_timeout
+        self._queues = {}
+        self.reaped = 0
+
+    def _queue_for(self, asset: str) -> AssetQueue:
+        asset_queue = self._queues.get(asset)
+        if asset_queue is None:
+            asset_queue = self._queues[asset] = AssetQueue(asset, self.max_queue_size)
+        if asset_queue.worker is None or asset_queue.worker.done():
+            asset_queue.worker = asyncio.ensure_future(self._work(asset_queue))
+        return asset_queue
+
+    def _enqueue(self, asset_queue: AssetQueue, fn, args, kwargs):
+        future = asyncio.get_running_loop().create_future()
+        # The submitter's context travels with the action (e.g. its request ID)
+        context = contextvars.copy_context()
+        asset_queue.queue.put_nowait((fn, args, kwargs, context, future, time.monotonic()))
+        asset_queue.submitted += 1
+        return future
+
+    async def submit(self, asset: str, fn, /, *args, **kwargs):
+        """Run coroutine function fn(*args, **kwargs) in the asset's queue and return its result"""
+        asset_queue = self._queue_for(asset)
+        try:
+            future = self._enqueue(asset_queue, fn, args, kwargs)
+        except asyncio.QueueFull:
+            asset_queue.rejected += 1
+            raise QueueFullError(f"Order queue for {asset} is full ({self.max_queue_size} pending)")
+        return await future
+
+    async def submit_group(self, assets, fn, /, *args, **kwargs):
+        """Run coroutine function fn once, after earlier actions on every listed asset
+
+        A placeholder is queued on each asset at the same moment, so the group
+        keeps its FIFO position on every queue and two groups sharing assets
+        are always ordered the same way on all of them.
+        """
+        queues = [self._queue_for(asset) for asset in dict.fromkeys(assets)]
+        full = [q for q in queues if q.queue.full()]
+        if full:
+            for asset_queue in full:
+                asset_queue.rejected += 1
+            names = ", ".join(q.asset for q in full)
+            raise QueueFullError(f"Order queue for {names} is full ({self.max_queue_size} pending)")
+
+        released = asyncio.get_running_loop().create_future()
+        outcome = []
+        waiting = len(queues)
+
+        async def hold():
+            nonlocal waiting
+            waiting -= 1
+            if waiting:
+                await asyncio.shield(released)
+                return
+            # The last queue to reach the group runs it while the others stay held
+            try:
+                outcome.append(await fn(*args, **kwargs))
+            finally:
+                if not released.done():
+                    released.set_result(None)
+
+        holds = [self._enqueue(q, hold, (), {}) for q in queues]
+        try:
+            await asyncio.gather(*holds)
+        finally:
+            if not released.done():
+                released.set_result(None)
+        return outcome[0]
+
+    def _reap(self, asset_queue: AssetQueue):
+        if self._queues.get(asset_queue.asset) is asset_queue:
+            del self._queues[asset_queue.asset]
+        asset_queue.unregister()
+        self.reaped += 1
+
+    async def _work(self, asset_queue: AssetQueue):
+        while True:
+            try:
+                item = await asyncio.wait_for(asset_queue.queue.get(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                # Nothing can be enqueued between this check and the removal
+                if asset_queue.queue.empty():
+                    self._reap(asset_queue)
+                    return
+                continue
+            fn, args, kwargs, context, future, enqueued_at = item
+            started = time.monotonic()
+            asset_queue.wait.record(started - enqueued_at)
+            try:
+                if future.cancelled():
+                    continue
+                result = await asyncio.get_running_loop().create_task(fn(*args, **kwargs), context=context)
+                if not future.done():
+                    future.set_result(result)
+                asset_queue.completed += 1
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                asset_queue.failed += 1
+                logger.error("Error executing queued %s action: %s", asset_queue.asset, e)
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                asset_queue.execution.record(time.monotonic() - started)
+                asset_queue.queue.task_done()
+
+    def depth(self) -> int:
+        """Total actions waiting across all assets"""
+        return sum(q.queue.qsize() for q in self._queues.values())
+
+    async def stop(self):
+        workers = [q.worker for q in self._queues.values() if q.worker is not None]
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "max_queue_size": self.max_queue_size,
+            "depth": self.depth(),
+            "reaped": self.reaped,
+            "assets": {asset: q.stats() for asset, q in self._queues.items()},
+        }
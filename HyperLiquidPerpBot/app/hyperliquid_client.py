@@ -0,0 +1,153 @@
+import asyncio
+import json
+import httpx
+from app.config import settings
+from app.logger import logger
+from app.metrics import metrics, timer
+from app.rate_limit import ORDER, RequestScheduler, exchange_priority, exchange_weight, info_weight, read_priority
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Transport errors raised before a request left the client
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class HyperliquidAPIError(Exception):
+    """Raised when the HyperLiquid API returns an error response"""
+
+
+class OrderInDoubtError(HyperliquidAPIError):
+    """Raised when an /exchange request may have been executed but no answer arrived"""
+
+
+def _maybe_processed(error) -> bool:
+    """Whether a failed request may still have been acted on by the exchange"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return not isinstance(error, UNSENT_ERRORS)
+    # 429 is returned before the action is processed; 5xx leaves it unknown
+    return response.status_code >= 500
+
+
+class ExchangeBackend:
+    """Interface AsyncExchangeManager trades through
+
+    ``info`` and ``exchange`` take and return the HyperLiquid REST payloads,
+    so a backend can be the real API (HyperliquidClient) or a simulator
+    (PaperExchange). ``exchange`` returns the ``response`` object of an
+    accepted action and raises HyperliquidAPIError when it is rejected.
+    """
+
+    base_url = None
+    # Paper backends do not check signatures, so no private key is required
+    paper = False
+
+    async def info(self, payload):
+        raise NotImplementedError
+
+    async def exchange(self, action, nonce, signature, vault_address=None):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class HyperliquidClient(ExchangeBackend):
+    """Async HyperLiquid REST client backed by a keep-alive connection pool
+
+    Every request is paced by a RequestScheduler holding the IP's weight
+    budget; identical info requests in flight at once are sent only once.
+    """
+
+    def __init__(self, base_url=None, timeout=None, max_connections=None,
+                 max_keepalive=None, retries=None, retry_backoff=None, scheduler=None):
+        self.base_url = (base_url or settings.hyperliquid_api_url).rstrip("/")
+        self.timeout = timeout if timeout is not None else settings.http_timeout
+        self.max_connections = max_connections or settings.http_max_connections
+        self.max_keepalive = max_keepalive or settings.http_max_keepalive
+        self.retries = retries if retries is not None else settings.http_retries
+        self.retry_backoff = retry_backoff if retry_backoff is not None else settings.http_retry_backoff
+        self.scheduler = scheduler or RequestScheduler()
+        self._client = None
+
+    @property
+    def client(self):
+        # Created lazily so the pool binds to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive,
+                ),
+                headers={"Content-Type": "application/json"},
+            )
+        return self._client
+
+    async def post(self, path, payload, weight=1, priority=ORDER, key=None):
+        """POST a JSON payload once the scheduler grants its weight
+
+        Transport errors and retryable statuses are retried, each attempt
+        spending weight again. An /exchange request is only resent when it
+        never reached the exchange (connection failures, 429): once sent it
+        may have placed the order, and the exchange would reject the resent
+        nonce. Such failures raise OrderInDoubtError instead.
+        """
+        async def send():
+            with timer(metrics.histogram("exchange_request_seconds", "HyperLiquid REST round-trip including retries", path=path)):
+                return await self._post(path, payload, weight, priority)
+
+        return await self.scheduler.run(weight, priority, send, key)
+
+    async def _post(self, path, payload, weight, priority):
+        attempt = 0
+        while True:
+            try:
+                if attempt:
+                    await self.scheduler.acquire(weight, priority)
+                response = await self.client.post(path, json=payload)
+                if response.status_code == 429:
+                    self.scheduler.throttle()
+                if response.status_code in RETRYABLE_STATUS and attempt < self.retries:
+                    raise httpx.HTTPStatusError(
+                        f"Retryable status {response.status_code}",
+                        request=response.request,
+                        response=response,
+                    )
+                response.raise_for_status()
+                return response.json()
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                status = getattr(getattr(e, "response", None), "status_code", None)
+                in_doubt = path == "/exchange" and _maybe_processed(e)
+                if attempt >= self.retries or in_doubt or (status is not None and status not in RETRYABLE_STATUS):
+                    metrics.counter("exchange_request_errors_total", "Failed HyperLiquid REST requests", path=path).inc()
+                    if in_doubt:
+                        raise OrderInDoubtError(f"{path} request may have been executed: {e}") from e
+                    raise HyperliquidAPIError(f"{path} request failed: {e}") from e
+                delay = self.retry_backoff * (2 ** attempt)
+                attempt += 1
+                metrics.counter("exchange_request_retries_total", "Retried HyperLiquid REST requests", path=path).inc()
+                logger.warning("%s request failed (%s), retry %s/%s in %.2fs", path, e, attempt, self.retries, delay)
+                await asyncio.sleep(delay)
+
+    async def info(self, payload):
+        key = json.dumps(payload, sort_keys=True)
+        return await self.post("/info", payload, info_weight(payload), read_priority.get(), key)
+
+    async def exchange(self, action, nonce, signature, vault_address=None):
+        result = await self.post("/exchange", {
+            "action": action,
+            "nonce": nonce,
+            "signature": signature,
+            "vaultAddress": vault_address,
+        }, exchange_weight(action), exchange_priority(action))
+        if result.get("status") != "ok":
+            raise HyperliquidAPIError(f"Exchange rejected action: {result.get('response')}")
+        return result["response"]
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
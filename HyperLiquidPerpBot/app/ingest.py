@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from fastapi import HTTPException
+from pydantic import ValidationError
+from app.logger import logger
+from app.models import WebhookPayload, describe_error
+
+# Payload fields that carry an explicit idempotency key, in priority order
+KEY_FIELDS = ("idempotency_key", "alert_id", "id")
+
+
+class AlertIngest:
+    """Idempotency stage in front of the webhook handler
+
+    Each alert gets a key: an explicit ``idempotency_key``/``alert_id``/``id``
+    field, or a hash of the canonical payload plus a ``window``-second time
+    bucket. Responses are kept in a bounded in-memory LRU, so a repeated alert
+    is answered from memory without touching the exchange. Only ``error``
+    responses, which never reached the exchange, are forgotten so the
+    sender may retry; ``in_doubt`` orders may have executed and are
+    remembered like ``success`` and ``partial``. Keys are also
+    persisted (via the write-behind queue) and reloaded on start, so
+    duplicates are still caught across restarts. An alert identical to one
+    still executing waits for that result instead of running twice.
+    """
+
+    def __init__(self, db_manager, db_writer, capacity: int = 10000, window: float = 60.0,
+                 retention: float = 86400.0):
+        self.db_manager = db_manager
+        self.db_writer = db_writer
+        self.capacity = capacity
+        self.window = window
+        self.retention = retention
+        self._recent = OrderedDict()  # key -> cached response
+        self._pending = {}  # key -> asyncio.Future
+        self.accepted = 0
+        self.deduped = 0
+        self.rejected = 0
+
+    def load(self):
+        """Warm the LRU from persisted keys and drop those past the retention window"""
+        since_ts = int((time.time() - self.retention) * 1000)
+        self.db_manager.prune_alerts(since_ts)
+        for key, response in self.db_manager.load_recent_alerts(since_ts, self.capacity):
+            response = json.loads(response)
+            if response.get("status") != "error":
+                self._recent[key] = response
+        logger.info("Loaded %s recent alert keys", len(self._recent))
+
+    def keys_for(self, payload):
+        """Candidate keys for a payload model: the current key first, then the previous bucket's"""
+        for field in KEY_FIELDS:
+            value = getattr(payload, field)
+            if value is not None:
+                return [f"id:{value}"]
+
+        canonical = json.dumps(payload.model_dump(exclude_none=True), sort_keys=True, separators=(",", ":"))
+        bucket = int(time.time() // self.window)
+        # Checking the previous bucket too catches retries that straddle a boundary
+        return [
+            "h:" + hashlib.sha256(f"{canonical}|{b}".encode()).hexdigest()
+            for b in (bucket, bucket - 1)
+        ]
+
+    def _remember(self, key: str, response: dict):
+        self._recent[key] = response
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.capacity:
+            self._recent.popitem(last=False)
+        self.db_writer.record_alert(key, json.dumps(response))
+
+    def parse(self, raw: bytes, model=WebhookPayload):
+        """Decode and validate the raw body in one pass, straight from bytes"""
+        try:
+            return model.model_validate_json(raw)
+        except ValidationError as e:
+            self.rejected += 1
+            raise HTTPException(status_code=400, detail=describe_error(e))
+
+    async def process(self, raw: bytes, handler, model=WebhookPayload):
+        """Run handler(payload) once per idempotency key and return its response"""
+        payload = self.parse(raw, model)
+        keys = self.keys_for(payload)
+
+        for key in keys:
+            cached = self._recent.get(key)
+            if cached is not None:
+                self._recent.move_to_end(key)
+                self.deduped += 1
+                logger.info("Duplicate alert suppressed: %s", key)
+                return {**cached, "duplicate": True}
+
+        key = keys[0]
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.deduped += 1
+            return {**(await asyncio.shield(pending)), "duplicate": True}
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            response = await handler(payload)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            # Failed executions are not cached, so the sender may retry
+            if isinstance(e, HTTPException) and e.status_code < 500:
+                self.rejected += 1
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody was waiting
+            raise
+        else:
+            self.accepted += 1
+            # Failed executions are not cached either
+            if response.get("status") != "error":
+                self._remember(key, response)
+            future.set_result(response)
+            return response
+        finally:
+            del self._pending[key]
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> dict:
+        return {
+            "accepted": self.accepted,
+            "deduped": self.deduped,
+            "rejected": self.rejected,
+            "cached_keys": len(self._recent),
+            "in_flight": self.in_flight,
+        }
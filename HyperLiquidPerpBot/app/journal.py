@@ -0,0 +1,317 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from app.logger import logger
+from app.metrics import metrics
+
+# Order states recorded before the exchange has answered
+INTENT = "intent"
+SUBMITTED = "submitted"
+ACKED = "acked"
+
+
+_decode = json.JSONDecoder().raw_decode
+
+
+def _encode(record: dict) -> bytes:
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode()
+
+
+class OrderJournal:
+    """Append-only, fsync-batched journal of orders and position changes
+
+    Orders are journaled as ``intent`` (built), ``submitted`` (given a nonce;
+    durable before the request goes out), ``acked`` (answered
+    without a fill) and ``filled``. Every change to the attached position
+    book is journaled as the asset's complete state, so replaying a
+    ``position`` record is idempotent.
+
+    A background thread writes whatever has been appended since its last
+    write and fsyncs it in one go, so concurrent orders share a sync (group
+    commit). Every ``snapshot_every`` records the book and pending orders are
+    written to a snapshot that atomically replaces the previous one, and the
+    journal starts over; ``restore`` loads the snapshot and replays only
+    the records after it.
+    """
+
+    def __init__(self, directory: str, name: str = "main", snapshot_every: int = 2000):
+        os.makedirs(directory, exist_ok=True)
+        self.name = name
+        self.path = os.path.join(directory, f"{name}.journal")
+        self.snapshot_path = os.path.join(directory, f"{name}.snapshot.json")
+        self.snapshot_every = snapshot_every
+        self.book = None
+        self.pending = {}  # order id -> order with its latest state
+        self.seq = 0
+        self.durable_seq = 0
+        self._buffer = []
+        self._since_snapshot = 0
+        self._restoring = False
+        self._replayed = {}  # asset -> sides of its latest position record during a restore
+        self._closed = False
+        self._waiters = []  # (seq, loop, future) awaiting durability
+        self._cond = threading.Condition()
+        self._file = None
+        self._thread = None
+        self.records_written = 0
+        self.syncs = 0
+        self.snapshots = 0
+        self.sync_seconds = metrics.histogram("journal_sync_seconds", "Order journal write and fsync per batch", account=name)
+
+    def attach(self, book):
+        """Journal every change to a position book"""
+        self.book = book
+        book.add_listener(self._on_position)
+
+    def _on_position(self, asset, size):
+        if self._restoring:
+            return
+        sides = {}
+        for side in ("BUY", "SELL"):
+            p = self.book.get(asset, side)
+            if p is not None:
+                sides[side] = [p.size, p.entry_price, p.current_price]
+        self.append("position", asset=asset, sides=sides)
+
+    # Appending
+
+    def append(self, event: str, **fields) -> int:
+        """Queue a record for the writer thread and return its sequence number"""
+        with self._cond:
+            self.seq += 1
+            record = {"seq": self.seq, "ts": time.time(), "event": event, **fields}
+            self._apply(record)
+            self._buffer.append(_encode(record))
+            self._cond.notify()
+            return self.seq
+
+    def intent(self, orders: list) -> list:
+        """Record orders about to be signed; returns their ids"""
+        with self._cond:
+            # Ids derive from the intent record's own sequence number
+            base = self.seq + 1
+            orders = [dict(order, id=f"{base}-{i}") for i, order in enumerate(orders)]
+            self.append(INTENT, orders=orders)
+        return [order["id"] for order in orders]
+
+    def submitted(self, ids: list, nonce: int) -> int:
+        """Record the nonce orders are sent with; ``sync`` on the result before sending"""
+        return self.append(SUBMITTED, ids=ids, nonce=nonce)
+
+    def answered(self, ids: list, statuses: list):
+        """Record the exchange's per-order statuses"""
+        for order_id, status in zip(ids, statuses):
+            filled = status.get("filled") if isinstance(status, dict) else None
+            if filled is not None:
+                self.append("filled", id=order_id, size=float(filled["totalSz"]), price=float(filled["avgPx"]))
+            else:
+                self.append(ACKED, id=order_id, status=status)
+
+    def failed(self, ids: list, error: str):
+        self.append("failed", ids=ids, error=error)
+
+    def resolved(self, order_id: str, outcome: str, **fields):
+        """Close an in-doubt order with what the exchange reported"""
+        self.append("resolved", id=order_id, outcome=outcome, **fields)
+
+    def _apply(self, record: dict):
+        """Update the pending orders (and during a restore, the book) from one record"""
+        event = record["event"]
+        if event == INTENT:
+            for order in record["orders"]:
+                self.pending[order["id"]] = dict(order, state=INTENT, ts=record["ts"])
+        elif event == SUBMITTED:
+            for order_id in record["ids"]:
+                if order_id in self.pending:
+                    self.pending[order_id].update(state=SUBMITTED, nonce=record["nonce"], ts=record["ts"])
+        elif event == ACKED:
+            resting = record["status"].get("resting") if isinstance(record["status"], dict) else None
+            if resting is not None and record["id"] in self.pending:
+                self.pending[record["id"]].update(state=ACKED, oid=resting.get("oid"))
+            else:
+                self.pending.pop(record["id"], None)
+        elif event in ("filled", "resolved"):
+            self.pending.pop(record["id"], None)
+        elif event == "failed":
+            for order_id in record["ids"]:
+                self.pending.pop(order_id, None)
+        elif event == "position" and self._restoring:
+            # Each record holds the asset's full state; only the last one is applied
+            self._replayed[record["asset"]] = record["sides"]
+
+    # Durability
+
+    async def sync(self, seq: int = None):
+        """Wait until every record up to ``seq`` (default: all appended) is fsynced"""
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            seq = self.seq if seq is None else seq
+            if self.durable_seq >= seq or self._thread is None:
+                return
+            future = loop.create_future()
+            self._waiters.append((seq, loop, future))
+        await future
+
+    def flush(self):
+        """Block until every appended record is fsynced"""
+        with self._cond:
+            seq = self.seq
+            while self.durable_seq < seq and self._thread is not None and self._thread.is_alive():
+                self._cond.wait(0.1)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._buffer and not self._closed:
+                    self._cond.wait()
+                if not self._buffer:
+                    break
+                batch, self._buffer = self._buffer, []
+                seq = self.seq
+            started = time.perf_counter()
+            try:
+                self._file.write(b"".join(batch))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                logger.error("Error writing the %s order journal: %s", self.name, e)
+            self.sync_seconds.record(time.perf_counter() - started)
+            self.records_written += len(batch)
+            self.syncs += 1
+            self._since_snapshot += len(batch)
+            self._mark_durable(seq)
+            if self._since_snapshot >= self.snapshot_every:
+                self._snapshot()
+
+    def _mark_durable(self, seq: int):
+        with self._cond:
+            self.durable_seq = max(self.durable_seq, seq)
+            ready = [w for w in self._waiters if w[0] <= self.durable_seq]
+            self._waiters = [w for w in self._waiters if w[0] > self.durable_seq]
+            self._cond.notify_all()
+        for _, loop, future in ready:
+            loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+
+    # Snapshots and replay
+
+    def _snapshot(self):
+        """Write the book and pending orders atomically, then start an empty journal"""
+        with self._cond:
+            seq = self.seq
+            pending = [dict(order) for order in self.pending.values()]
+        positions = self.book.positions() if self.book is not None else []
+        state = {
+            "seq": seq,
+            "ts": time.time(),
+            "positions": [[p.asset, p.side, p.size, p.entry_price, p.current_price] for p in positions],
+            "pending": pending,
+        }
+        tmp = self.snapshot_path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(state, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_path)
+            # Records up to seq are in the snapshot; later ones are still buffered
+            self._file.truncate(0)
+            self._file.seek(0)
+            os.fsync(self._file.fileno())
+        except OSError as e:
+            logger.error("Error writing the %s journal snapshot: %s", self.name, e)
+            return
+        self._since_snapshot = 0
+        self.snapshots += 1
+
+    def restore(self, book=None) -> dict:
+        """Load the snapshot, replay the journal after it and start the writer
+
+        Returns what was restored. A torn last line from a crash mid-write is
+        dropped.
+        """
+        if book is not None:
+            self.attach(book)
+        started = time.perf_counter()
+        self._restoring = True
+        snapshot_seq = replayed = 0
+        try:
+            if os.path.exists(self.snapshot_path):
+                with open(self.snapshot_path) as f:
+                    state = json.load(f)
+                snapshot_seq = self.seq = state["seq"]
+                self.pending = {order["id"]: order for order in state["pending"]}
+                if self.book is not None:
+                    self.book.clear()
+                    for asset, side, size, entry_price, current_price in state["positions"]:
+                        self.book.set_position(asset, side, size, entry_price)
+                        self.book.mark(asset, current_price)
+
+            good = 0
+            if os.path.exists(self.path):
+                with open(self.path, "rb") as f:
+                    for line in f:
+                        try:
+                            if not line.endswith(b"\n"):
+                                raise ValueError("unterminated record")
+                            record = _decode(line.decode())[0]
+                        except ValueError:
+                            logger.warning("Dropping a torn record at the end of the %s journal", self.name)
+                            break
+                        good += len(line)
+                        if record["seq"] <= snapshot_seq:
+                            continue
+                        self.seq = record["seq"]
+                        self._apply(record)
+                        replayed += 1
+
+            if self.book is not None:
+                for asset, sides in self._replayed.items():
+                    for side in ("BUY", "SELL"):
+                        size, entry_price, current_price = sides.get(side) or (0.0, 0.0, 0.0)
+                        self.book.set_position(asset, side, size, entry_price)
+                        if size:
+                            self.book.mark(asset, current_price)
+        finally:
+            self._restoring = False
+            self._replayed = {}
+
+        self._file = open(self.path, "ab")
+        self._file.truncate(good)
+        self.durable_seq = self.seq
+        self._since_snapshot = replayed
+        self._thread = threading.Thread(target=self._run, name=f"journal-{self.name}", daemon=True)
+        self._thread.start()
+
+        restored = {
+            "snapshot_seq": snapshot_seq,
+            "replayed": replayed,
+            "positions": len(self.book) if self.book is not None else 0,
+            "pending": len(self.pending),
+            "ms": (time.perf_counter() - started) * 1000,
+        }
+        logger.info("Restored the %s order journal: %s", self.name, restored)
+        return restored
+
+    def close(self):
+        """Write everything queued, snapshot and stop the writer"""
+        if self._thread is None or self._closed:
+            return
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self._snapshot()
+        self._file.close()
+
+    def stats(self) -> dict:
+        return {
+            "seq": self.seq,
+            "durable_seq": self.durable_seq,
+            "pending": len(self.pending),
+            "records_written": self.records_written,
+            "syncs": self.syncs,
+            "snapshots": self.snapshots,
+            "sync": self.sync_seconds.summary(),
+        }
@@ -1,40 +1,168 @@
-import os
-import logging
+import atexit
+import contextvars
 import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import uuid
+from app.config import settings
 
 # Set up the logger with basic configuration
 logger = logging.getLogger("hyperliquid_perp_bot")
 
+# Request ID of the webhook/API call being handled, "-" outside a request
+request_id_var = contextvars.ContextVar("request_id", default="-")
+
+# LogRecord attributes that are not user-supplied ``extra`` fields
+_RESERVED = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "request_id"}
+
+_listener = None
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def bind_request_id(request_id: str = None):
+    """Set the current request ID (generated when None); returns a token for reset_request_id"""
+    return request_id_var.set(request_id or new_request_id())
+
+
+def reset_request_id(token):
+    request_id_var.reset(token)
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the request ID of the context that logged them"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Pass one in ``rate`` DEBUG records per call site; other levels always pass"""
+
+    def __init__(self, rate: int):
+        super().__init__()
+        self.rate = max(1, rate)
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate == 1:
+            return True
+        site = (record.pathname, record.lineno)
+        with self._lock:
+            count = self._counts.get(site, 0)
+            self._counts[site] = count + 1
+        return count % self.rate == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including request_id and any ``extra`` fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+# Argument types that cannot change between logging and formatting
+_IMMUTABLE_ARGS = frozenset({str, int, float, bool, bytes, type(None)})
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread
+
+    The stock handler renders the message before queueing; records here stay
+    in-process, so when every argument is an immutable scalar msg % args is
+    only evaluated by the listener. Records with other arguments (models,
+    dicts, lists) are rendered now, so the line shows their state when it
+    was logged.
+    """
+
+    def prepare(self, record):
+        args = record.args
+        if args and not (isinstance(args, tuple) and all(type(arg) in _IMMUTABLE_ARGS for arg in args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
 def setup_logger():
-    """Configure the application logger"""
-    global logger
-    
+    """Configure the application logger
+
+    Records are handed to a queue on the calling thread and written to the
+    console and a daily-rotated JSON file by a background listener thread.
+    """
+    global logger, _listener
+
+    if _listener is not None:
+        return logger
+
     # Create logs directory if it doesn't exist
-    log_dir = "logs"
+    log_dir = settings.log_dir
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
-    
+
     # Set up logging level
-    logger.setLevel(logging.INFO)
-    
-    # Create a formatter
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    
-    # Create a file handler
-    today = datetime.datetime.now().strftime("%Y-%m-%d")
-    file_handler = logging.FileHandler(os.path.join(log_dir, f"{today}.log"))
-    file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(formatter)
-    
+    level = getattr(logging, settings.log_level.upper(), logging.INFO)
+    logger.setLevel(level)
+    # Records are handled here only; the root handler would print them twice
+    logger.propagate = False
+
+    # File handler rotates at midnight even if the process runs for weeks
+    file_handler = logging.handlers.TimedRotatingFileHandler(
+        os.path.join(log_dir, "bot.log"),
+        when="midnight",
+        backupCount=settings.log_backup_count,
+        encoding="utf-8",
+    )
+    if settings.log_json:
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
+        ))
+
     # Create a console handler
     console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(formatter)
-    
-    # Add handlers to logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
+    console_handler.setFormatter(logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
+    ))
+
+    # Callers only enqueue; the listener thread formats and writes
+    queue_handler = DeferredQueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(SamplingFilter(settings.log_debug_sample_rate))
+    logger.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(queue_handler.queue, file_handler, console_handler)
+    _listener.start()
+    atexit.register(stop_logger)
+
     logger.info("Logger initialized")
-    
-    return logger
\ No newline at end of file
+
+    return logger
+
+
+def stop_logger():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
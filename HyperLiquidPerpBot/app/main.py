@@ -2,14 +2,44 @@ import asyncio
 import os
 import logging
 from app.config import settings
+from app.accounts import AccountRegistry, load_account_configs
 from app.exchange_manager import ExchangeManager
+from app.async_exchange_manager import AsyncExchangeManager
+from app.market_data import MarketDataFeed, price_cache, replay_connector
+from app.paper_exchange import PaperExchange
 from app.webhook import app as webhook_app, exchange_manager, webhook_handler
 from app.logger import setup_logger, logger
 
 # Import UI components
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from ui.server import start_ui_server
+from ui.server import app as ui_app, init_ui
+
+def create_exchange_manager(backend, private_key=None, account_address=None, client=None):
+    """Exchange manager for one account on the given backend
+
+    ``client`` shares an existing live HTTP client instead of opening a new pool.
+    """
+    if backend == "live":
+        if client is not None:
+            return AsyncExchangeManager(client, private_key, account_address, close_client=False)
+        return AsyncExchangeManager(private_key=private_key, account_address=account_address)
+    if backend == "paper":
+        # Each account trades against its own paper exchange
+        paper = PaperExchange(latency=settings.paper_latency_ms / 1000.0)
+        return AsyncExchangeManager(paper, private_key, account_address)
+    return ExchangeManager(private_key=private_key, account_address=account_address)
+
+def create_accounts(backend, main_manager):
+    """Registry of the main account plus any accounts listed in ACCOUNTS_FILE"""
+    accounts = AccountRegistry(main_manager)
+    if settings.accounts_file:
+        client = main_manager.client if backend == "live" else None
+        for config in load_account_configs(settings.accounts_file):
+            manager = create_exchange_manager(backend, config.private_key, config.account_address, client)
+            accounts.add(config.name, manager, config.size_multiplier, config.assets)
+        logger.info("Fanning alerts out to %s accounts", len(accounts))
+    return accounts
 
 def create_app():
     # Initialize the logger
@@ -17,43 +47,73 @@ def create_app():
     
     logger.info("Initializing HyperLiquidPerpBot")
     
-    # Create the exchange manager
+    # Create the exchange manager: live trading goes through the async REST
+    # client, paper trading through the same manager against the in-process
+    # simulator, demo mode keeps the simulated manager
     global exchange_manager
-    exchange_manager = ExchangeManager()
+    backend = settings.exchange_backend.lower()
+    if backend == "auto":
+        has_keys = settings.hyperliquid_private_key and settings.hyperliquid_account_address
+        backend = "live" if has_keys else "demo"
+    exchange_manager = create_exchange_manager(backend)
+    logger.info("Using %s exchange backend", backend)
     
     # Initialize the webhook handler
     global webhook_handler
     from app.webhook import WebhookHandler
-    webhook_handler = WebhookHandler(exchange_manager)
+    webhook_handler = WebhookHandler(exchange_manager, create_accounts(backend, exchange_manager))
+    
+    # Create the market data feed (started with the webhook server); demo
+    # mode makes no network calls unless it is enabled explicitly
+    market_feed = None
+    market_data_enabled = settings.market_data_enabled
+    if market_data_enabled is None:
+        market_data_enabled = backend != "demo" or bool(settings.market_data_replay_file)
+    if market_data_enabled:
+        assets = [a.strip() for a in settings.market_data_assets.split(",") if a.strip()] or [settings.asset_name]
+        connect = None
+        if settings.market_data_replay_file:
+            connect = replay_connector(settings.market_data_replay_file, loop=settings.market_data_replay_loop)
+        market_feed = MarketDataFeed(price_cache, assets=assets, connect=connect)
     
     # Set up globals in the webhook module
     import app.webhook as webhook_module
     webhook_module.exchange_manager = exchange_manager
     webhook_module.webhook_handler = webhook_handler
+    webhook_module.market_feed = market_feed
+    
+    # The dashboard shares the exchange manager and database with the webhook handler
+    init_ui(exchange_manager, webhook_handler.db_manager)
     
     logger.info("HyperLiquidPerpBot initialized")
     
     return webhook_app
 
+def create_servers(app):
+    """uvicorn servers for the webhook API and the dashboard, run together on one event loop"""
+    import uvicorn
+    return [
+        uvicorn.Server(uvicorn.Config(app, host=settings.api_host, port=settings.api_port)),
+        uvicorn.Server(uvicorn.Config(ui_app, host=settings.ui_host, port=settings.ui_port)),
+    ]
+
+async def serve(servers):
+    """Run the servers on the current loop; when one exits the others are stopped too"""
+    tasks = [asyncio.ensure_future(server.serve()) for server in servers]
+    await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    for server in servers:
+        server.should_exit = True
+    await asyncio.gather(*tasks)
+
 def main():
     # Create the FastAPI app
     app = create_app()
     
-    # Start the UI server
-    ui_host = settings.ui_host
-    ui_port = settings.ui_port
-    ui_thread = start_ui_server(exchange_manager, host=ui_host, port=ui_port)
-    
-    # Start the webhook server
-    import uvicorn
-    host = settings.api_host
-    port = settings.api_port
-    
-    logger.info(f"Starting webhook server on {host}:{port}")
-    logger.info(f"UI server running on http://{ui_host}:{ui_port}")
+    logger.info("Starting webhook server on %s:%s", settings.api_host, settings.api_port)
+    logger.info("UI server running on http://%s:%s", settings.ui_host, settings.ui_port)
     
-    # Run the FastAPI app
-    uvicorn.run(app, host=host, port=port)
+    # Both apps are served by one process on one event loop
+    asyncio.run(serve(create_servers(app)))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
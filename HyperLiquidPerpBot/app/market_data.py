@@ -0,0 +1,292 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from app.config import settings
+from app.logger import logger
+
+
+class BookTop:
+    """Best bid/ask for one asset"""
+
+    __slots__ = ("bid_px", "bid_sz", "ask_px", "ask_sz", "updated_at")
+
+    def __init__(self, bid_px, bid_sz, ask_px, ask_sz, updated_at):
+        self.bid_px = bid_px
+        self.bid_sz = bid_sz
+        self.ask_px = ask_px
+        self.ask_sz = ask_sz
+        self.updated_at = updated_at
+
+    @property
+    def mid(self):
+        if self.bid_px is None or self.ask_px is None:
+            return self.bid_px or self.ask_px
+        return (self.bid_px + self.ask_px) / 2
+
+    def to_dict(self):
+        return {
+            "bid": self.bid_px,
+            "bidSize": self.bid_sz,
+            "ask": self.ask_px,
+            "askSize": self.ask_sz,
+        }
+
+
+class PriceCache:
+    """In-memory per-asset mid price and top-of-book cache
+
+    Written by the market data feed and read from any thread. Lookups never
+    touch the network; prices older than ``stale_after`` seconds are treated
+    as missing so callers fall back instead of trading on a frozen feed.
+    """
+
+    def __init__(self, stale_after: float = 10.0):
+        self.stale_after = stale_after
+        self._mids = {}  # asset -> (price, monotonic time)
+        self._books = {}  # asset -> BookTop
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback):
+        """Register callback(asset, mid) invoked on every mid update"""
+        self._listeners.append(callback)
+
+    def _notify(self, asset, mid):
+        for callback in self._listeners:
+            try:
+                callback(asset, mid)
+            except Exception as e:
+                logger.error("Price listener error for %s: %s", asset, e)
+
+    def update_mids(self, mids: dict):
+        now = time.monotonic()
+        parsed = {asset: float(px) for asset, px in mids.items()}
+        with self._lock:
+            for asset, px in parsed.items():
+                self._mids[asset] = (px, now)
+        for asset, px in parsed.items():
+            self._notify(asset, px)
+
+    def update_book(self, asset: str, levels):
+        """Store the top of an l2Book snapshot: levels is [bids, asks]"""
+        bids, asks = levels
+        top = BookTop(
+            float(bids[0]["px"]) if bids else None,
+            float(bids[0]["sz"]) if bids else None,
+            float(asks[0]["px"]) if asks else None,
+            float(asks[0]["sz"]) if asks else None,
+            time.monotonic(),
+        )
+        with self._lock:
+            self._books[asset] = top
+
+    def get_mid(self, asset: str, max_age: float = None):
+        """Latest mid for an asset, or None if unknown or stale"""
+        max_age = self.stale_after if max_age is None else max_age
+        entry = self._mids.get(asset)
+        if entry is None:
+            top = self._books.get(asset)
+            if top is None or time.monotonic() - top.updated_at > max_age:
+                return None
+            return top.mid
+        px, updated_at = entry
+        if time.monotonic() - updated_at > max_age:
+            return None
+        return px
+
+    def get_price(self, asset: str, fallback: float = None):
+        mid = self.get_mid(asset)
+        return fallback if mid is None else mid
+
+    def get_top(self, asset: str):
+        """Top of book for an asset, or None if unknown or stale"""
+        top = self._books.get(asset)
+        if top is None or time.monotonic() - top.updated_at > self.stale_after:
+            return None
+        return top
+
+    def is_stale(self, asset: str) -> bool:
+        return self.get_mid(asset) is None
+
+    def last_update_age(self):
+        """Seconds since the most recent update of any asset, or None"""
+        with self._lock:
+            times = [t for _, t in self._mids.values()] + [b.updated_at for b in self._books.values()]
+        return time.monotonic() - max(times) if times else None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {asset: px for asset, (px, _) in self._mids.items()}
+
+
+# Shared cache served to ExchangeManager and the UI
+price_cache = PriceCache(stale_after=settings.market_data_stale_after)
+
+
+class ReplayConnection:
+    """Websocket stand-in that replays recorded feed messages from a file
+
+    The file holds one raw JSON message per line, as written by
+    MarketDataFeed(record_path=...). ``speed`` scales the recorded gaps
+    (0 replays as fast as possible). At the end of the file the replay is
+    ``finished`` and the feed stops, so prices go stale; with ``loop`` it
+    starts over from the first line instead.
+    """
+
+    def __init__(self, path: str, speed: float = 0.0, loop: bool = False):
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.finished = False
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    async def close(self):
+        pass
+
+    async def __aiter__(self):
+        while True:
+            previous = None
+            with open(self.path) as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    if self.speed > 0:
+                        recorded_at = json.loads(line).get("_recv", None)
+                        if previous is not None and recorded_at is not None:
+                            await asyncio.sleep(max(0.0, (recorded_at - previous) / self.speed))
+                        previous = recorded_at
+                    yield line
+                    await asyncio.sleep(0)
+            if not self.loop:
+                self.finished = True
+                return
+
+
+def replay_connector(path: str, speed: float = 0.0, loop: bool = False):
+    """Connect factory for MarketDataFeed that replays a recorded file"""
+    async def connect(url):
+        return ReplayConnection(path, speed, loop)
+    return connect
+
+
+async def websocket_connector(url):
+    import websockets
+    return await websockets.connect(url, ping_interval=20, max_size=2 ** 22)
+
+
+class MarketDataFeed:
+    """Background allMids/l2Book subscription feeding a PriceCache
+
+    Reconnects with jittered exponential backoff, and forces a reconnect
+    when no message has arrived for ``stale_after`` seconds.
+    """
+
+    def __init__(self, cache: PriceCache = None, url: str = None, assets=None, connect=None,
+                 stale_after: float = None, max_backoff: float = 30.0, record_path: str = None):
+        self.cache = cache or price_cache
+        self.url = url or settings.hyperliquid_ws_url
+        self.assets = list(assets or [])
+        self.connect = connect or websocket_connector
+        self.stale_after = stale_after or settings.market_data_stale_after
+        self.max_backoff = max_backoff
+        self.record_path = record_path
+        self.connected = False
+        self.reconnects = 0
+        self.messages = 0
+        self._task = None
+        self._record_file = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._record_file is not None:
+            self._record_file.close()
+            self._record_file = None
+
+    def _subscriptions(self):
+        yield {"type": "allMids"}
+        for asset in self.assets:
+            yield {"type": "l2Book", "coin": asset}
+
+    def handle_message(self, raw):
+        message = json.loads(raw)
+        channel = message.get("channel")
+        data = message.get("data")
+        logger.debug("Feed message on %s", channel)
+        if channel == "allMids":
+            self.cache.update_mids(data["mids"])
+        elif channel == "l2Book":
+            self.cache.update_book(data["coin"], data["levels"])
+        self.messages += 1
+
+        if self.record_path:
+            if self._record_file is None:
+                self._record_file = open(self.record_path, "a")
+            message["_recv"] = time.time()
+            self._record_file.write(json.dumps(message) + "\n")
+
+    async def _consume(self, connection):
+        iterator = connection.__aiter__()
+        while True:
+            raw = await asyncio.wait_for(iterator.__anext__(), timeout=self.stale_after)
+            self.handle_message(raw)
+
+    async def _run(self):
+        backoff = 1.0
+        while True:
+            connection = None
+            try:
+                connection = await self.connect(self.url)
+                for subscription in self._subscriptions():
+                    await connection.send(json.dumps({"method": "subscribe", "subscription": subscription}))
+                self.connected = True
+                backoff = 1.0
+                logger.info("Market data feed connected to %s", self.url)
+                await self._consume(connection)
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                logger.warning("Market data feed silent for %ss, reconnecting", self.stale_after)
+            except StopAsyncIteration:
+                if getattr(connection, "finished", False):
+                    logger.info("Market data replay finished")
+                    return
+                logger.warning("Market data feed closed by server, reconnecting")
+            except Exception as e:
+                logger.warning("Market data feed error: %s", e)
+            finally:
+                self.connected = False
+                if connection is not None:
+                    try:
+                        await connection.close()
+                    except Exception:
+                        pass
+
+            self.reconnects += 1
+            delay = backoff * (0.5 + random.random() / 2)
+            backoff = min(backoff * 2, self.max_backoff)
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        return {
+            "connected": self.connected,
+            "reconnects": self.reconnects,
+            "messages": self.messages,
+            "last_update_age": self.cache.last_update_age(),
+        }
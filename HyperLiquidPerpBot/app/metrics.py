@@ -0,0 +1,229 @@
+import asyncio
+import functools
+import math
+import threading
+import time
+from app.logger import logger
+
+# Quantiles exported for every histogram
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Histogram:
+    """Log-linear latency histogram in the style of HdrHistogram
+
+    Each power of two between ``lowest`` and ``highest`` seconds is split into
+    ``sub_buckets`` linear buckets, so recording is O(1) and percentiles are
+    accurate to within 1/sub_buckets of the value, whatever the range.
+    """
+
+    def __init__(self, lowest: float = 1e-6, highest: float = 100.0, sub_buckets: int = 16):
+        self.lowest = lowest
+        self.sub_buckets = sub_buckets
+        octaves = math.ceil(math.log2(highest / lowest)) + 1
+        self._counts = [0] * (octaves * sub_buckets)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def _index(self, value: float) -> int:
+        if value <= self.lowest:
+            return 0
+        mantissa, exponent = math.frexp(value / self.lowest)  # mantissa in [0.5, 1)
+        index = (exponent - 1) * self.sub_buckets + int((mantissa * 2 - 1) * self.sub_buckets)
+        return min(index, len(self._counts) - 1)
+
+    def _upper_bound(self, index: int) -> float:
+        octave, sub = divmod(index, self.sub_buckets)
+        return self.lowest * 2 ** octave * (1 + (sub + 1) / self.sub_buckets)
+
+    def record(self, seconds: float):
+        index = self._index(seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket holding the pct-th percentile, in seconds"""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = max(1, math.ceil(self.count * pct / 100))
+            seen = 0
+            for index, bucket in enumerate(self._counts):
+                seen += bucket
+                if seen >= target:
+                    return min(self._upper_bound(index), self.max)
+            return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "p50_ms": self.percentile(50) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        with self._lock:
+            self.value += amount
+
+
+class _Family:
+    __slots__ = ("kind", "help", "children")
+
+    def __init__(self, kind: str, help: str):
+        self.kind = kind
+        self.help = help
+        self.children = {}  # sorted label items -> metric (or gauge callback)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(items, extra=()) -> str:
+    pairs = list(items) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+class MetricsRegistry:
+    """Process-wide histograms, counters and gauges rendered in Prometheus text format"""
+
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _child(self, kind: str, name: str, help: str, labels: dict, factory):
+        key = tuple(sorted(labels.items()))
+        family = self._families.get(name)
+        if family is not None:
+            child = family.children.get(key)
+            if child is not None:
+                return child
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = _Family(kind, help)
+            elif family.kind != kind:
+                raise ValueError(f"Metric {name} is already registered as a {family.kind}")
+            if help and not family.help:
+                family.help = help
+            if key not in family.children:
+                family.children[key] = factory()
+            return family.children[key]
+
+    def histogram(self, name: str, help: str = "", **labels) -> Histogram:
+        return self._child("summary", name, help, labels, Histogram)
+
+    def counter(self, name: str, help: str = "", **labels) -> Counter:
+        return self._child("counter", name, help, labels, Counter)
+
+    def gauge(self, name: str, fn, help: str = "", **labels):
+        """Register fn() as the gauge's value, read at scrape time (replaces a previous fn)"""
+        self._child("gauge", name, help, labels, lambda: fn)
+        self._families[name].children[tuple(sorted(labels.items()))] = fn
+
+    def remove(self, name: str, **labels):
+        """Drop one labelled series, e.g. of a queue that no longer exists"""
+        with self._lock:
+            family = self._families.get(name)
+            if family is not None:
+                family.children.pop(tuple(sorted(labels.items())), None)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            families = sorted(self._families.items())
+        for name, family in families:
+            if family.help:
+                lines.append(f"# HELP {name} {family.help}")
+            lines.append(f"# TYPE {name} {family.kind}")
+            for key, child in list(family.children.items()):
+                if family.kind == "summary":
+                    for quantile in QUANTILES:
+                        value = child.percentile(quantile * 100)
+                        lines.append(f"{name}{_labels(key, [('quantile', quantile)])} {value:.9g}")
+                    lines.append(f"{name}_sum{_labels(key)} {child.sum:.9g}")
+                    lines.append(f"{name}_count{_labels(key)} {child.count}")
+                elif family.kind == "counter":
+                    lines.append(f"{name}{_labels(key)} {child.value}")
+                else:
+                    try:
+                        value = child()
+                    except Exception as e:
+                        logger.error("Error reading gauge %s: %s", name, e)
+                        continue
+                    if value is not None:
+                        lines.append(f"{name}{_labels(key)} {value:.9g}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared registry exported on /metrics
+metrics = MetricsRegistry()
+
+
+class timer:
+    """Context manager recording the elapsed monotonic time into a histogram"""
+
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.record(time.perf_counter() - self.started)
+        return False
+
+
+def timed(name: str, help: str = "", **labels):
+    """Decorator timing a function (sync or async) into histogram ``name``
+
+    Exceptions are also counted in ``<name without _seconds>_errors_total``.
+    """
+    def decorator(fn):
+        histogram = metrics.histogram(name, help, **labels)
+        errors = metrics.counter(name.removesuffix("_seconds") + "_errors_total", **labels)
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception:
+                    errors.inc()
+                    raise
+                finally:
+                    histogram.record(time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                histogram.record(time.perf_counter() - started)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,100 @@
+from typing import List, Literal, Optional, Union
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+
+
+class Order(BaseModel):
+    """One action on one asset, as sent in a webhook or a batch"""
+
+    model_config = ConfigDict(extra="allow")
+
+    action: Literal["BUY", "SELL", "CLOSE"]
+    size: Optional[float] = Field(default=None, gt=0)
+    asset: Optional[str] = None
+
+    @field_validator("action", mode="before")
+    @classmethod
+    def _upper(cls, value):
+        return value.upper() if isinstance(value, str) else value
+
+
+class Alert(BaseModel):
+    """Fields shared by every webhook body: the optional idempotency keys"""
+
+    model_config = ConfigDict(extra="allow")
+
+    idempotency_key: Optional[Union[str, int]] = None
+    alert_id: Optional[Union[str, int]] = None
+    id: Optional[Union[str, int]] = None
+
+
+class WebhookPayload(Alert, Order):
+    """Body of POST /webhook"""
+
+
+class BatchPayload(Alert):
+    """Body of POST /webhook/batch"""
+
+    orders: List[Order]
+
+
+def describe_error(error: ValidationError) -> str:
+    """Short client-facing message for the first validation error"""
+    first = error.errors()[0]
+    kind = first["type"]
+    loc = ".".join(str(part) for part in first["loc"])
+    if kind == "json_invalid":
+        return "Invalid JSON payload"
+    if kind in ("model_type", "model_attributes_type") and not loc:
+        return "Payload must be a JSON object"
+    if kind == "missing":
+        return f"Missing '{loc}' field in payload"
+    return f"Invalid '{loc}': {first['msg']}"
+
+
+class ActionResult:
+    """Outcome of one action, carrying the fill it produced
+
+    ``size``/``price`` are the filled size and average fill price (the exit
+    price for CLOSE), ``side`` the side of the position opened or closed.
+    ``in_doubt`` marks a failure after the order was sent, which may still
+    have executed.
+    """
+
+    __slots__ = ("success", "action", "asset", "side", "size", "price", "pnl", "error", "in_doubt")
+
+    def __init__(self, success: bool, action: str, asset: str, side: str = None, size: float = 0.0,
+                 price: float = 0.0, pnl: float = 0.0, error: str = None, in_doubt: bool = False):
+        self.success = success
+        self.action = action
+        self.asset = asset
+        self.side = side
+        self.size = size
+        self.price = price
+        self.pnl = pnl
+        self.error = error
+        self.in_doubt = in_doubt
+
+    @classmethod
+    def failed(cls, action: str, asset: str, error: str, in_doubt: bool = False) -> "ActionResult":
+        return cls(False, action, asset, error=error, in_doubt=in_doubt)
+
+    @property
+    def message(self) -> str:
+        if not self.success:
+            return self.error
+        if self.action == "CLOSE":
+            return f"Closed {self.side} {self.asset} position: {self.size} at {self.price}, PnL: {self.pnl}"
+        return f"Opened {self.side} {self.asset} position: {self.size} at {self.price}"
+
+    def to_dict(self) -> dict:
+        return {
+            "action": self.action,
+            "asset": self.asset,
+            "side": self.side,
+            "size": self.size,
+            "price": self.price,
+            "pnl": self.pnl,
+        }
+
+    def __repr__(self):
+        return f"ActionResult({self.message})"
@@ -0,0 +1,505 @@
+"""
+In-process paper exchange speaking the HyperLiquid REST payloads.
+
+PaperExchange is an ExchangeBackend, so AsyncExchangeManager trades against
+it exactly as it does against the real API: orders are built, priced and
+signed on the normal path, and only the network hop is replaced by a
+function call. Each asset gets a synthetic order book around the reference
+price from the local market data cache; orders walk that book up to their
+limit price, and the account tracks margin, fees and liquidations per the
+configured leverage and cross/isolated mode.
+"""
+
+import asyncio
+import collections
+import itertools
+import math
+import threading
+import time
+from bisect import insort
+from app.config import settings
+from app.hyperliquid_client import ExchangeBackend, HyperliquidAPIError
+from app.logger import logger
+from app.market_data import price_cache
+
+# HyperLiquid rejects orders priced further than this from the reference price
+MAX_PRICE_DEVIATION = 0.8
+# Maintenance margin as a fraction of the initial margin
+MAINTENANCE_FRACTION = 0.5
+# Sizes below this are treated as zero
+EPSILON = 1e-12
+
+
+def sz_decimals_for(price: float) -> int:
+    """Size decimals for an asset first priced at ``price`` (BTC 5, ETH 4, $10 coins 2)"""
+    return max(0, min(5, int(math.floor(math.log10(price))) + 1))
+
+
+def _wire(x: float) -> str:
+    text = f"{x:.8f}".rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+
+class PaperBook:
+    """Synthetic depth for one asset, rebuilt lazily around each reference price
+
+    Liquidity taken by an order stays gone until the next price update, so
+    bursts of orders between updates see progressively worse prices.
+    """
+
+    __slots__ = ("mid", "bids", "asks", "levels", "level_notional", "half_spread", "step", "_dirty")
+
+    def __init__(self, mid: float, levels: int, level_notional: float, spread_bps: float, step_bps: float):
+        self.levels = levels
+        self.level_notional = level_notional
+        self.half_spread = spread_bps / 20000
+        self.step = step_bps / 10000
+        self.bids = []  # [px, size], best first
+        self.asks = []
+        self.update(mid)
+
+    def update(self, mid: float):
+        self.mid = mid
+        self._dirty = True
+
+    def _rebuild(self):
+        bid = self.mid * (1 - self.half_spread)
+        ask = self.mid * (1 + self.half_spread)
+        self.bids = []
+        self.asks = []
+        for i in range(self.levels):
+            bid_px = bid * (1 - i * self.step)
+            ask_px = ask * (1 + i * self.step)
+            self.bids.append([bid_px, self.level_notional / bid_px])
+            self.asks.append([ask_px, self.level_notional / ask_px])
+        self._dirty = False
+
+    def best(self, is_buy: bool):
+        """Best opposing price for an order on this side, or None if the book is empty"""
+        if self._dirty:
+            self._rebuild()
+        side = self.asks if is_buy else self.bids
+        return side[0][0] if side else None
+
+    def take(self, is_buy: bool, size: float, limit_px: float):
+        """Consume liquidity up to limit_px and return (filled size, notional)"""
+        if self._dirty:
+            self._rebuild()
+        side = self.asks if is_buy else self.bids
+        filled = notional = 0.0
+        used = 0
+        for level in side:
+            px, available = level
+            if (px > limit_px) if is_buy else (px < limit_px):
+                break
+            take = min(available, size - filled)
+            filled += take
+            notional += take * px
+            if take >= available - EPSILON:
+                used += 1
+            else:
+                level[1] -= take
+            if size - filled <= EPSILON:
+                break
+        del side[:used]
+        return filled, notional
+
+
+class PaperPosition:
+    """Signed position, entry price and margin mode for one asset"""
+
+    __slots__ = ("szi", "entry_px", "leverage", "is_cross", "margin")
+
+    def __init__(self, leverage: int, is_cross: bool):
+        self.szi = 0.0
+        self.entry_px = 0.0
+        self.leverage = leverage
+        self.is_cross = is_cross
+        self.margin = 0.0  # collateral posted to an isolated position
+
+    def margin_used(self, mark: float) -> float:
+        if self.is_cross:
+            return abs(self.szi) * mark / self.leverage
+        return self.margin
+
+    def unrealized(self, mark: float) -> float:
+        return (mark - self.entry_px) * self.szi
+
+
+class PaperOrder:
+    __slots__ = ("oid", "asset", "is_buy", "px", "size", "reduce_only")
+
+    def __init__(self, oid, asset, is_buy, px, size, reduce_only):
+        self.oid = oid
+        self.asset = asset
+        self.is_buy = is_buy
+        self.px = px
+        self.size = size
+        self.reduce_only = reduce_only
+
+
+class PaperExchange(ExchangeBackend):
+    """Simulated HyperLiquid account and matching engine
+
+    Supports the ``order`` (Ioc, Gtc and Alo limit orders, reduce-only),
+    ``cancel`` and ``updateLeverage`` actions and the ``meta``, ``allMids``,
+    ``clearinghouseState``, ``openOrders`` and ``userFillsByTime`` info
+    requests. Signatures are not checked. Resting orders fill at their limit
+    price as maker once the reference price moves through them. All state
+    sits behind one lock, and an order costs a few microseconds, so the
+    simulator is never the bottleneck of a load test.
+    """
+
+    base_url = "paper://local"
+    paper = True
+
+    def __init__(self, market_data=None, balance: float = None, leverage: int = None, is_cross: bool = None,
+                 taker_fee_bps: float = None, maker_fee_bps: float = None, levels: int = 20,
+                 level_notional: float = None, spread_bps: float = 1.0, step_bps: float = 1.0,
+                 latency: float = 0.0, universe=None):
+        self.market_data = market_data or price_cache
+        self.cash = settings.paper_balance if balance is None else balance
+        self.leverage = leverage or settings.leverage
+        self.is_cross = settings.is_cross if is_cross is None else is_cross
+        self.taker_fee = (settings.paper_taker_fee_bps if taker_fee_bps is None else taker_fee_bps) / 10000
+        self.maker_fee = (settings.paper_maker_fee_bps if maker_fee_bps is None else maker_fee_bps) / 10000
+        self.book_params = (levels, level_notional or settings.paper_level_notional, spread_bps, step_bps)
+        self.latency = latency
+
+        self.universe = []  # meta universe: {"name", "szDecimals"}
+        self._index = {}  # asset name -> universe index
+        self.books = {}  # asset -> PaperBook
+        self.positions = {}  # asset -> PaperPosition
+        self.margin_modes = {}  # asset -> (leverage, is_cross) set by updateLeverage
+        self.orders = {}  # oid -> resting PaperOrder
+        self._resting = {}  # asset -> ([(-px, oid)] bids, [(px, oid)] asks)
+        self._oids = itertools.count(1)
+        self._lock = threading.RLock()
+
+        self.counts = {"orders": 0, "fills": 0, "rejected": 0, "cancels": 0, "liquidations": 0}
+        self.fills = collections.deque(maxlen=10000)  # recent fills in the userFills format
+        self.volume = 0.0
+        self.fees = 0.0
+        self.realized = 0.0
+
+        for asset in universe or []:
+            self._add_asset(asset["name"], asset["szDecimals"])
+        for asset, mid in self.market_data.snapshot().items():
+            self.set_mid(asset, mid)
+        self.market_data.add_listener(self.set_mid)
+
+    def _add_asset(self, asset: str, sz_decimals: int):
+        self._index[asset] = len(self.universe)
+        self.universe.append({"name": asset, "szDecimals": sz_decimals})
+
+    def set_mid(self, asset: str, mid: float):
+        """Move an asset's reference price, filling crossed resting orders and checking liquidations"""
+        if not mid or mid <= 0:
+            return
+        with self._lock:
+            if asset not in self._index:
+                self._add_asset(asset, sz_decimals_for(mid))
+            book = self.books.get(asset)
+            if book is None:
+                self.books[asset] = PaperBook(mid, *self.book_params)
+            else:
+                book.update(mid)
+            if asset in self._resting:
+                self._match_resting(asset)
+            if self.positions:
+                self._check_liquidations()
+
+    # ----- account -----
+
+    def _mark(self, asset: str) -> float:
+        return self.books[asset].mid
+
+    def account_value(self) -> float:
+        return self.cash + sum(p.unrealized(self._mark(a)) for a, p in self.positions.items())
+
+    def margin_used(self) -> float:
+        return sum(p.margin_used(self._mark(a)) for a, p in self.positions.items())
+
+    def _margin_mode(self, asset: str):
+        return self.margin_modes.get(asset, (self.leverage, self.is_cross))
+
+    def _fill(self, asset: str, is_buy: bool, size: float, px: float, fee_rate: float):
+        position = self.positions.get(asset)
+        if position is None:
+            position = self.positions[asset] = PaperPosition(*self._margin_mode(asset))
+
+        fee = px * size * fee_rate
+        self.cash -= fee
+        self.fees += fee
+        self.volume += px * size
+        self.counts["fills"] += 1
+        self.fills.append({
+            "coin": asset, "px": _wire(px), "sz": _wire(size), "side": "B" if is_buy else "A",
+            "time": int(time.time() * 1000),
+        })
+
+        szi = position.szi
+        signed = size if is_buy else -size
+        new_szi = szi + signed
+        if abs(szi) <= EPSILON or (szi > 0) == is_buy:
+            position.entry_px = (abs(szi) * position.entry_px + size * px) / abs(new_szi)
+            position.margin += size * px / position.leverage
+        else:
+            closed = min(abs(szi), size)
+            pnl = (px - position.entry_px) * closed * (1 if szi > 0 else -1)
+            self.cash += pnl
+            self.realized += pnl
+            position.margin *= 1 - closed / abs(szi)
+            if abs(new_szi) > EPSILON and (new_szi > 0) != (szi > 0):
+                # Flipped through zero: the remainder opens at the fill price
+                position.entry_px = px
+                position.margin = abs(new_szi) * px / position.leverage
+
+        if abs(new_szi) <= EPSILON:
+            del self.positions[asset]
+        else:
+            position.szi = new_szi
+
+    def _check_liquidations(self):
+        for asset, position in list(self.positions.items()):
+            if position.is_cross:
+                continue
+            mark = self._mark(asset)
+            if position.margin + position.unrealized(mark) < position.margin_used(mark) * MAINTENANCE_FRACTION:
+                self._liquidate(asset, position)
+
+        cross = [(a, p) for a, p in self.positions.items() if p.is_cross]
+        if not cross:
+            return
+        isolated_equity = sum(p.margin + p.unrealized(self._mark(a)) for a, p in self.positions.items() if not p.is_cross)
+        maintenance = sum(p.margin_used(self._mark(a)) for a, p in cross) * MAINTENANCE_FRACTION
+        if self.account_value() - isolated_equity < maintenance:
+            for asset, position in cross:
+                self._liquidate(asset, position)
+
+    def _liquidate(self, asset: str, position: PaperPosition):
+        logger.warning("Paper exchange liquidating %s position of %s at %s", asset, position.szi, self._mark(asset))
+        self.counts["liquidations"] += 1
+        self._fill(asset, position.szi < 0, abs(position.szi), self._mark(asset), self.taker_fee)
+
+    # ----- orders -----
+
+    def _asset_name(self, index: int) -> str:
+        if not 0 <= index < len(self.universe):
+            raise HyperliquidAPIError(f"Unknown asset index {index}")
+        return self.universe[index]["name"]
+
+    def _increase(self, asset: str, is_buy: bool, size: float) -> float:
+        """Part of an order that adds to the position rather than reducing it"""
+        position = self.positions.get(asset)
+        if position is None or (position.szi > 0) == is_buy:
+            return size
+        return max(0.0, size - abs(position.szi))
+
+    def _place(self, wire: dict) -> dict:
+        index = wire["a"]
+        asset = self._asset_name(index)
+        is_buy = bool(wire["b"])
+        limit_px = float(wire["p"])
+        size = float(wire["s"])
+        reduce_only = bool(wire.get("r", False))
+        tif = wire.get("t", {}).get("limit", {}).get("tif", "Gtc")
+        book = self.books.get(asset)
+        self.counts["orders"] += 1
+
+        if book is None:
+            return self._reject(f"No reference price for {asset}")
+        if size <= EPSILON:
+            return self._reject("Order has zero size.")
+        if abs(limit_px - book.mid) > MAX_PRICE_DEVIATION * book.mid:
+            return self._reject("Order price cannot be more than 80% away from the reference price")
+
+        if reduce_only:
+            position = self.positions.get(asset)
+            if position is None or (position.szi > 0) == is_buy:
+                return self._reject("Reduce only order would increase position.")
+            size = min(size, abs(position.szi))
+        else:
+            leverage = self._margin_mode(asset)[0]
+            required = self._increase(asset, is_buy, size) * limit_px / leverage
+            if required > self.account_value() - self.margin_used():
+                return self._reject(f"Insufficient margin to place order. asset={index}")
+
+        best = book.best(is_buy)
+        crosses = best is not None and (best <= limit_px if is_buy else best >= limit_px)
+        if tif == "Alo" and crosses:
+            return self._reject(f"Post only order would have immediately matched, bbo was {_wire(best)}. asset={index}")
+
+        filled = notional = 0.0
+        if crosses:
+            filled, notional = book.take(is_buy, size, limit_px)
+            if filled > EPSILON:
+                self._fill(asset, is_buy, filled, notional / filled, self.taker_fee)
+
+        oid = next(self._oids)
+        remaining = size - filled
+        if tif != "Ioc" and remaining > EPSILON:
+            self._rest(PaperOrder(oid, asset, is_buy, limit_px, remaining, reduce_only))
+            if filled <= EPSILON:
+                return {"resting": {"oid": oid}}
+        if filled <= EPSILON:
+            return self._reject(f"Order could not immediately match against any resting orders. asset={index}")
+        return {"filled": {"totalSz": _wire(filled), "avgPx": _wire(notional / filled), "oid": oid}}
+
+    def _reject(self, message: str) -> dict:
+        self.counts["rejected"] += 1
+        return {"error": message}
+
+    def _rest(self, order: PaperOrder):
+        self.orders[order.oid] = order
+        bids, asks = self._resting.setdefault(order.asset, ([], []))
+        if order.is_buy:
+            insort(bids, (-order.px, order.oid))
+        else:
+            insort(asks, (order.px, order.oid))
+
+    def _match_resting(self, asset: str):
+        """Fill resting orders the new reference price has moved through"""
+        book = self.books[asset]
+        for is_buy, queue in zip((True, False), self._resting[asset]):
+            best = book.best(is_buy)
+            while queue and best is not None:
+                key, oid = queue[0]
+                order = self.orders.get(oid)
+                if order is None:
+                    queue.pop(0)  # cancelled
+                    continue
+                if (order.px < best) if is_buy else (order.px > best):
+                    break
+                queue.pop(0)
+                del self.orders[oid]
+                size = order.size
+                if order.reduce_only:
+                    size = min(size, abs(self.positions[asset].szi)) if asset in self.positions else 0.0
+                    if size <= EPSILON or self._increase(asset, is_buy, size) > EPSILON:
+                        continue
+                else:
+                    required = self._increase(asset, is_buy, size) * order.px / self._margin_mode(asset)[0]
+                    if required > self.account_value() - self.margin_used():
+                        logger.warning("Paper exchange cancelled order %s: insufficient margin", oid)
+                        self.counts["cancels"] += 1
+                        continue
+                self._fill(asset, is_buy, size, order.px, self.maker_fee)
+        bids, asks = self._resting[asset]
+        if not bids and not asks:
+            del self._resting[asset]
+
+    def _cancel(self, cancel: dict):
+        order = self.orders.get(cancel["o"])
+        if order is None or self._index.get(order.asset) != cancel["a"]:
+            return {"error": "Order was never placed, already canceled, or filled."}
+        del self.orders[order.oid]
+        self.counts["cancels"] += 1
+        return "success"
+
+    def _update_leverage(self, action: dict):
+        asset = self._asset_name(action["asset"])
+        leverage, is_cross = int(action["leverage"]), bool(action["isCross"])
+        if leverage < 1:
+            raise HyperliquidAPIError("Invalid leverage value")
+        position = self.positions.get(asset)
+        if position is not None:
+            if position.is_cross != is_cross:
+                raise HyperliquidAPIError("Cannot switch leverage type with open position.")
+            previous = position.leverage, position.margin
+            position.leverage = leverage
+            position.margin = abs(position.szi) * position.entry_px / leverage
+            if self.account_value() < self.margin_used():
+                position.leverage, position.margin = previous
+                raise HyperliquidAPIError("Insufficient margin for leverage update")
+        self.margin_modes[asset] = (leverage, is_cross)
+
+    # ----- ExchangeBackend -----
+
+    async def exchange(self, action, nonce, signature, vault_address=None):
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        kind = action.get("type")
+        with self._lock:
+            if kind == "order":
+                statuses = []
+                for wire in action["orders"]:
+                    try:
+                        statuses.append(self._place(wire))
+                    except HyperliquidAPIError as e:
+                        statuses.append(self._reject(str(e)))
+                return {"type": "order", "data": {"statuses": statuses}}
+            if kind == "cancel":
+                return {"type": "cancel", "data": {"statuses": [self._cancel(c) for c in action["cancels"]]}}
+            if kind == "updateLeverage":
+                self._update_leverage(action)
+                return {"type": "default"}
+        raise HyperliquidAPIError(f"Exchange rejected action: unsupported action {kind}")
+
+    async def info(self, payload):
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        kind = payload.get("type")
+        with self._lock:
+            if kind == "meta":
+                return {"universe": [dict(asset) for asset in self.universe]}
+            if kind == "allMids":
+                return {asset: _wire(book.mid) for asset, book in self.books.items()}
+            if kind == "clearinghouseState":
+                return self.clearinghouse_state()
+            if kind == "openOrders":
+                return [
+                    {"coin": o.asset, "side": "B" if o.is_buy else "A", "limitPx": _wire(o.px), "sz": _wire(o.size), "oid": o.oid}
+                    for o in self.orders.values()
+                ]
+            if kind == "userFillsByTime":
+                start = payload.get("startTime", 0)
+                return [dict(fill) for fill in self.fills if fill["time"] >= start]
+            if kind == "candleSnapshot":
+                # No price history is simulated; sizing builds candles from ticks
+                return []
+        raise HyperliquidAPIError(f"/info request failed: unsupported info type {kind}")
+
+    def clearinghouse_state(self) -> dict:
+        with self._lock:
+            asset_positions = []
+            notional = 0.0
+            for asset, position in self.positions.items():
+                mark = self._mark(asset)
+                notional += abs(position.szi) * mark
+                asset_positions.append({
+                    "type": "oneWay",
+                    "position": {
+                        "coin": asset,
+                        "szi": _wire(position.szi),
+                        "entryPx": _wire(position.entry_px),
+                        "positionValue": _wire(abs(position.szi) * mark),
+                        "unrealizedPnl": _wire(position.unrealized(mark)),
+                        "marginUsed": _wire(position.margin_used(mark)),
+                        "leverage": {"type": "cross" if position.is_cross else "isolated", "value": position.leverage},
+                    },
+                })
+            account_value = self.account_value()
+            margin_used = self.margin_used()
+            return {
+                "marginSummary": {
+                    "accountValue": _wire(account_value),
+                    "totalNtlPos": _wire(notional),
+                    "totalMarginUsed": _wire(margin_used),
+                },
+                "withdrawable": _wire(max(0.0, account_value - margin_used)),
+                "assetPositions": asset_positions,
+            }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.counts,
+                "resting": len(self.orders),
+                "positions": len(self.positions),
+                "accountValue": self.account_value(),
+                "marginUsed": self.margin_used(),
+                "realizedPnl": self.realized,
+                "fees": self.fees,
+                "volume": self.volume,
+            }
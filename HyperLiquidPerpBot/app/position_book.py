@@ -0,0 +1,208 @@
+import threading
+
+BUY = "BUY"
+SELL = "SELL"
+
+
+class Position:
+    """A net open position for one asset and side"""
+
+    __slots__ = ("asset", "side", "size", "entry_price", "current_price", "pnl")
+
+    def __init__(self, asset: str, side: str, size: float, entry_price: float):
+        self.asset = asset
+        self.side = side
+        self.size = size
+        self.entry_price = entry_price
+        self.current_price = entry_price
+        self.pnl = 0.0
+
+    @property
+    def is_buy(self) -> bool:
+        return self.side == BUY
+
+    def mark(self, price: float):
+        self.current_price = price
+        direction = 1.0 if self.is_buy else -1.0
+        self.pnl = (price - self.entry_price) * self.size * direction
+
+    def copy(self) -> "Position":
+        position = Position(self.asset, self.side, self.size, self.entry_price)
+        position.current_price = self.current_price
+        position.pnl = self.pnl
+        return position
+
+    def to_dict(self) -> dict:
+        """Position in the format served to the dashboard"""
+        return {
+            "asset": self.asset,
+            "size": self.size,
+            "direction": self.side,
+            "entryPrice": self.entry_price,
+            "currentPrice": self.current_price,
+            "pnl": self.pnl,
+        }
+
+    def __repr__(self):
+        return f"Position({self.asset} {self.side} {self.size} @ {self.entry_price})"
+
+
+class PositionBook:
+    """Open positions keyed by asset and side with O(1) lookup
+
+    Same-side fills are netted into one position at the size-weighted entry
+    price. In hedge mode (the demo default) each asset can hold a BUY and a
+    SELL position at once; in one-way mode, matching HyperLiquid's netting,
+    an opposite fill reduces the existing position first.
+
+    All methods take an internal lock and never block, so the book can be
+    shared between the webhook event loop and the UI thread. Listeners are
+    called with (asset, gross open size) after every change to an asset, and
+    ``version`` counts those changes.
+    """
+
+    def __init__(self, hedge_mode: bool = True):
+        self.hedge_mode = hedge_mode
+        self._positions = {}  # asset -> {side: Position}
+        self._lock = threading.RLock()
+        self._listeners = []
+        self.version = 0
+
+    def add_listener(self, callback):
+        """Register callback(asset, gross size) invoked after fills, closes and clears"""
+        self._listeners.append(callback)
+
+    def _notify(self, asset: str):
+        if not self._listeners:
+            return
+        with self._lock:
+            size = sum(p.size for p in self._positions.get(asset, {}).values())
+        for callback in self._listeners:
+            callback(asset, size)
+
+    def apply_fill(self, asset: str, side: str, size: float, price: float) -> Position:
+        """Add a fill to the book and return a snapshot of the resulting position"""
+        try:
+            return self._apply_fill(asset, side, size, price)
+        finally:
+            self._notify(asset)
+
+    def _apply_fill(self, asset: str, side: str, size: float, price: float) -> Position:
+        with self._lock:
+            self.version += 1
+            sides = self._positions.setdefault(asset, {})
+
+            if not self.hedge_mode:
+                opposite = SELL if side == BUY else BUY
+                existing = sides.get(opposite)
+                if existing is not None:
+                    reduced = min(existing.size, size)
+                    self._reduce(asset, opposite, reduced)
+                    size -= reduced
+                    if size <= 0:
+                        remaining = self._positions.get(asset, {}).get(opposite)
+                        return remaining.copy() if remaining else Position(asset, opposite, 0.0, price)
+                    sides = self._positions.setdefault(asset, {})
+
+            position = sides.get(side)
+            if position is None:
+                position = Position(asset, side, size, price)
+                sides[side] = position
+            else:
+                total = position.size + size
+                position.entry_price = (position.entry_price * position.size + price * size) / total
+                position.size = total
+            position.mark(price)
+            return position.copy()
+
+    def _reduce(self, asset: str, side: str, size: float):
+        sides = self._positions[asset]
+        position = sides[side]
+        position.size -= size
+        if position.size <= 1e-12:
+            del sides[side]
+            if not sides:
+                del self._positions[asset]
+        else:
+            position.mark(position.current_price)
+
+    def get(self, asset: str, side: str = None):
+        """Snapshot of the position for an asset (either side if not given), or None"""
+        with self._lock:
+            sides = self._positions.get(asset)
+            if not sides:
+                return None
+            if side is not None:
+                position = sides.get(side)
+            else:
+                position = next(iter(sides.values()))
+            return position.copy() if position else None
+
+    def close(self, asset: str, side: str = None, size: float = None):
+        """Reduce or remove a position and return a snapshot of the closed part"""
+        with self._lock:
+            sides = self._positions.get(asset)
+            if not sides:
+                return None
+            if side is None:
+                side = next(iter(sides))
+            position = sides.get(side)
+            if position is None:
+                return None
+
+            closed = position.copy()
+            closed.size = position.size if size is None else min(size, position.size)
+            self._reduce(asset, side, closed.size)
+            self.version += 1
+        self._notify(asset)
+        return closed
+
+    def mark(self, asset: str, price: float):
+        """Update current price and unrealized PnL for an asset"""
+        with self._lock:
+            for position in self._positions.get(asset, {}).values():
+                position.mark(price)
+
+    def set_position(self, asset: str, side: str, size: float, entry_price: float):
+        """Overwrite one side of an asset, e.g. with the exchange's view; size 0 removes it"""
+        with self._lock:
+            sides = self._positions.setdefault(asset, {})
+            if size > 0:
+                current = sides.get(side)
+                position = Position(asset, side, size, entry_price)
+                position.mark(current.current_price if current else entry_price)
+                sides[side] = position
+            else:
+                sides.pop(side, None)
+            if not sides:
+                del self._positions[asset]
+            self.version += 1
+        self._notify(asset)
+
+    def clear(self):
+        with self._lock:
+            assets = list(self._positions)
+            self._positions.clear()
+            self.version += 1
+        for asset in assets:
+            self._notify(asset)
+
+    def positions(self) -> list:
+        """Snapshots of every open position"""
+        with self._lock:
+            return [p.copy() for sides in self._positions.values() for p in sides.values()]
+
+    def to_list(self) -> list:
+        with self._lock:
+            return [p.to_dict() for sides in self._positions.values() for p in sides.values()]
+
+    def assets(self) -> list:
+        with self._lock:
+            return list(self._positions)
+
+    def __contains__(self, asset: str) -> bool:
+        return asset in self._positions
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(sides) for sides in self._positions.values())
@@ -0,0 +1,220 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import time
+from app.config import settings
+from app.metrics import metrics
+
+# Priority classes, most urgent first
+ORDER = 0
+CANCEL = 1
+ACCOUNT_READ = 2
+UI_READ = 3
+PRIORITY_NAMES = ("order", "cancel", "account", "ui")
+
+# Share of the bucket each class has to leave untouched, so account and
+# dashboard reads cannot spend the budget an incoming order needs
+RESERVE = (0.0, 0.0, 0.1, 0.3)
+
+# Info requests weighted 2; userRole is 60 and every other type 20
+LIGHT_INFO_TYPES = frozenset({
+    "l2Book", "allMids", "clearinghouseState", "orderStatus", "spotClearinghouseState", "exchangeStatus",
+})
+CANCEL_ACTIONS = frozenset({"cancel", "cancelByCloid", "scheduleCancel"})
+
+# Priority of info requests made from the current context; the dashboard
+# binds UI_READ and order paths bind ORDER for their price lookups
+read_priority = contextvars.ContextVar("read_priority", default=ACCOUNT_READ)
+
+
+def info_weight(payload: dict) -> int:
+    kind = payload.get("type")
+    if kind in LIGHT_INFO_TYPES:
+        return 2
+    return 60 if kind == "userRole" else 20
+
+
+def exchange_weight(action: dict) -> int:
+    """1 per action plus 1 for every 40 orders or cancels batched into it"""
+    return 1 + len(action.get("orders") or action.get("cancels") or ()) // 40
+
+
+def exchange_priority(action: dict) -> int:
+    return CANCEL if action.get("type") in CANCEL_ACTIONS else ORDER
+
+
+class _Ticket:
+    """A request waiting for budget"""
+
+    __slots__ = ("weight", "priority", "future")
+
+    def __init__(self, weight: float, priority: int):
+        self.weight = weight
+        self.priority = priority
+        self.future = None
+
+
+class RequestScheduler:
+    """Token bucket over the exchange's request weight budget
+
+    HyperLiquid allows ``limit`` request weight per IP over a rolling
+    ``window`` (1200 per minute). The bucket holds ``burst`` weight and
+    refills at ``(limit - burst) / window`` per second, so no window ever
+    spends more than the limit. Requests that find the bucket short wait in
+    priority order (orders, cancels, account reads, dashboard reads), and
+    reads may not dip into the share RESERVE keeps for the classes above them.
+
+    ``run`` with a ``key`` coalesces identical reads: callers arriving while
+    one is queued or in flight share its result without spending budget, and
+    an urgent caller promotes a queued read to its own priority.
+    """
+
+    def __init__(self, limit: float = None, burst: float = None, window: float = 60.0, enabled: bool = None):
+        limit = limit or settings.rate_limit_weight_per_minute
+        self.enabled = settings.rate_limit_enabled if enabled is None else enabled
+        self.capacity = float(min(burst or settings.rate_limit_burst, limit))
+        self.rate = max(limit - self.capacity, 1.0) / window
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._queue = []  # (priority, seq, ticket); stale after a promotion
+        self._seq = itertools.count()
+        self._timer = None
+        self._inflight = {}  # key -> (ticket, task)
+        self.granted = [0] * len(PRIORITY_NAMES)
+        self.weight = [0] * len(PRIORITY_NAMES)
+        self.coalesced = 0
+        self.throttled = 0
+        self._waits = [
+            metrics.histogram("rate_limit_wait_seconds", "Time requests waited for exchange weight budget", priority=name)
+            for name in PRIORITY_NAMES
+        ]
+        metrics.gauge("rate_limit_budget_used", lambda: 1.0 - self.available() / self.capacity,
+                      "Share of the exchange weight bucket currently spent")
+        metrics.gauge("rate_limit_queue_depth", lambda: self.depth, "Requests waiting for exchange weight budget")
+
+    def available(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return self.tokens
+
+    def _needed(self, ticket: _Ticket) -> float:
+        # A request heavier than the bucket waits for a full bucket and runs into debt
+        return min(ticket.weight + RESERVE[ticket.priority] * self.capacity, self.capacity)
+
+    def _take(self, ticket: _Ticket) -> bool:
+        if self.available() < self._needed(ticket):
+            return False
+        self.tokens -= ticket.weight
+        self.granted[ticket.priority] += 1
+        self.weight[ticket.priority] += ticket.weight
+        metrics.counter("rate_limit_weight_total", "Exchange request weight spent by priority",
+                        priority=PRIORITY_NAMES[ticket.priority]).inc(ticket.weight)
+        return True
+
+    def _head(self):
+        while self._queue:
+            priority, _, ticket = self._queue[0]
+            if priority == ticket.priority and not ticket.future.done():
+                return ticket
+            heapq.heappop(self._queue)
+        return None
+
+    def _dispatch(self):
+        """Grant queued tickets in priority order while the bucket allows"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        ticket = self._head()
+        while ticket is not None and self._take(ticket):
+            heapq.heappop(self._queue)
+            ticket.future.set_result(None)
+            ticket = self._head()
+        if ticket is not None:
+            delay = (self._needed(ticket) - self.tokens) / self.rate
+            self._timer = asyncio.get_running_loop().call_later(max(delay, 0.001), self._dispatch)
+
+    async def _wait(self, ticket: _Ticket):
+        head = self._head()
+        if (head is None or ticket.priority < head.priority) and self._take(ticket):
+            self._waits[ticket.priority].record(0.0)
+            return
+        started = time.perf_counter()
+        ticket.future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (ticket.priority, next(self._seq), ticket))
+        self._dispatch()
+        try:
+            await ticket.future
+        finally:
+            self._waits[ticket.priority].record(time.perf_counter() - started)
+
+    def _promote(self, ticket: _Ticket, priority: int):
+        ticket.priority = priority
+        if ticket.future is not None and not ticket.future.done():
+            heapq.heappush(self._queue, (priority, next(self._seq), ticket))
+            self._dispatch()
+
+    async def acquire(self, weight: float, priority: int):
+        """Wait until ``weight`` can be spent at ``priority``"""
+        if self.enabled:
+            await self._wait(_Ticket(weight, priority))
+
+    async def run(self, weight: float, priority: int, send, key=None):
+        """Await ``send()`` once its weight is granted; calls sharing a ``key`` share one request"""
+        if not self.enabled:
+            return await send()
+        if key is None:
+            await self._wait(_Ticket(weight, priority))
+            return await send()
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            ticket = _Ticket(weight, priority)
+
+            async def request():
+                await self._wait(ticket)
+                return await send()
+
+            task = asyncio.ensure_future(request())
+            flight = self._inflight[key] = (ticket, task)
+            task.add_done_callback(lambda done: self._finish(key, flight))
+        else:
+            self.coalesced += 1
+            metrics.counter("rate_limit_coalesced_total", "Identical exchange reads served by one request").inc()
+            if priority < flight[0].priority:
+                self._promote(flight[0], priority)
+        return await asyncio.shield(flight[1])
+
+    def _finish(self, key, flight):
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        task = flight[1]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every caller went away
+
+    def throttle(self):
+        """The exchange answered 429: stop spending until the bucket has refilled"""
+        self.throttled += 1
+        metrics.counter("rate_limit_throttled_total", "Requests the exchange rejected with HTTP 429").inc()
+        self.available()
+        self.tokens = min(self.tokens, 0.0)
+
+    @property
+    def depth(self) -> int:
+        return sum(1 for priority, _, ticket in self._queue if priority == ticket.priority and not ticket.future.done())
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "available": round(self.available(), 2),
+            "capacity": self.capacity,
+            "refill_per_second": self.rate,
+            "queue_depth": self.depth,
+            "coalesced": self.coalesced,
+            "throttled": self.throttled,
+            "priorities": {
+                name: {"granted": self.granted[i], "weight": self.weight[i], "wait": self._waits[i].summary()}
+                for i, name in enumerate(PRIORITY_NAMES)
+            },
+        }
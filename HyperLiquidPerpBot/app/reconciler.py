@@ -0,0 +1,209 @@
+import asyncio
+import time
+from app.config import settings
+from app.events import event_bus
+from app.logger import logger
+from app.metrics import metrics
+
+# Relative size difference tolerated between the book and the exchange
+# (exchange sizes are rounded to the asset's size decimals)
+SIZE_TOLERANCE = 1e-6
+
+
+class Drift:
+    """One difference between the local position book and the exchange"""
+
+    __slots__ = ("kind", "asset", "side", "local_size", "exchange_size")
+
+    def __init__(self, kind: str, asset: str, side: str, local_size: float, exchange_size: float):
+        self.kind = kind
+        self.asset = asset
+        self.side = side
+        self.local_size = local_size
+        self.exchange_size = exchange_size
+
+    def to_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "asset": self.asset,
+            "side": self.side,
+            "localSize": self.local_size,
+            "exchangeSize": self.exchange_size,
+        }
+
+    def __repr__(self):
+        return f"Drift({self.kind} {self.asset} {self.side}: local {self.local_size}, exchange {self.exchange_size})"
+
+
+def diff_positions(local: dict, remote: dict) -> list:
+    """Drifts between two {(asset, side): (size, entry price)} maps"""
+    drifts = []
+    for key in local.keys() | remote.keys():
+        local_size = local[key][0] if key in local else 0.0
+        remote_size = remote[key][0] if key in remote else 0.0
+        if abs(local_size - remote_size) <= SIZE_TOLERANCE * max(local_size, remote_size, 1.0):
+            continue
+        if not local_size:
+            kind = "missing_local"
+        elif not remote_size:
+            kind = "missing_exchange"
+        else:
+            kind = "size"
+        drifts.append(Drift(kind, key[0], key[1], local_size, remote_size))
+    return drifts
+
+
+class Reconciler:
+    """Background loop that diffs an account's position book against the exchange
+
+    Each pass fetches the exchange's positions and open orders, compares them
+    with the book by (asset, side) and overwrites drifted entries with the
+    exchange's view, publishing a ``drift`` event. The interval adapts: it
+    drops to ``min_interval`` after fills of our own and after drift, then
+    doubles on every clean pass up to ``max_interval``. A pass whose fetch
+    overlapped a local fill is not trusted and is retried shortly after.
+    """
+
+    def __init__(self, manager, name: str = "main", min_interval: float = None, max_interval: float = None):
+        self.manager = manager
+        self.name = name
+        self.min_interval = min_interval or settings.reconcile_min_interval
+        self.max_interval = max_interval or settings.reconcile_max_interval
+        self.interval = self.min_interval
+        self.open_orders = 0
+        self.runs = 0
+        self.drifts = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_run = None
+        self._deadline = 0.0
+        self._activity = False
+        self._repairing = False
+        self._wake = None
+        self._loop = None
+        self._task = None
+        self.seconds = metrics.histogram("reconcile_seconds", "Time for one reconciliation pass", account=name)
+        manager.positions.add_listener(self._on_position)
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _on_position(self, asset, size):
+        # Our own fills; the repairs made by this reconciler do not count
+        if self._loop is not None and not self._repairing:
+            self._loop.call_soon_threadsafe(self._note_activity)
+
+    def _note_activity(self):
+        self._activity = True
+        self.interval = self.min_interval
+        deadline = self._loop.time() + self.min_interval
+        if deadline < self._deadline:
+            self._deadline = deadline
+            self._wake.set()
+
+    async def _run(self):
+        while True:
+            delay = self._deadline - self._loop.time()
+            if delay > 0:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._activity = False
+            try:
+                drifts = await self.reconcile()
+            except Exception as e:
+                self.errors += 1
+                metrics.counter("reconcile_runs_total", "Reconciliation passes by outcome",
+                                account=self.name, outcome="error").inc()
+                logger.error("Reconciliation failed for %s: %s", self.name, e)
+                drifts = None
+
+            if drifts or self._activity:
+                self.interval = self.min_interval
+            elif drifts is not None:
+                self.interval = min(self.interval * 2, self.max_interval)
+            self._deadline = self._loop.time() + self.interval
+
+    async def reconcile(self) -> list:
+        """Run one pass; returns the drifts found and repaired (None if the pass was skipped)"""
+        started = time.perf_counter()
+        book = self.manager.positions
+        version = book.version
+
+        # A fresh snapshot; it also refreshes the cache other callers read
+        self.manager.account_cache.invalidate()
+        snapshot, orders = await asyncio.gather(self.manager.get_account_state(), self.manager.get_open_orders())
+
+        if book.version != version:
+            # A fill landed while fetching; the snapshot may predate it
+            self.skipped += 1
+            self._activity = True
+            metrics.counter("reconcile_runs_total", account=self.name, outcome="skipped").inc()
+            return None
+
+        local = {(p.asset, p.side): (p.size, p.entry_price) for p in book.positions()}
+        remote = {(p["asset"], p["direction"]): (p["size"], p["entryPrice"]) for p in snapshot.positions}
+        drifts = diff_positions(local, remote)
+
+        if orders is not None and len(orders) != self.open_orders:
+            # The bot only sends IOC orders, so anything resting was placed elsewhere
+            self.open_orders = len(orders)
+            if self.open_orders:
+                logger.warning("%s has %d resting orders on the exchange", self.name, self.open_orders)
+
+        if drifts:
+            self._repair(drifts, remote)
+
+        self.runs += 1
+        self.last_run = time.time()
+        self.seconds.record(time.perf_counter() - started)
+        metrics.counter("reconcile_runs_total", "Reconciliation passes by outcome",
+                        account=self.name, outcome="drift" if drifts else "clean").inc()
+        return drifts
+
+    def _repair(self, drifts, remote: dict):
+        book = self.manager.positions
+        self._repairing = True
+        try:
+            for drift in drifts:
+                size, entry_price = remote.get((drift.asset, drift.side), (0.0, 0.0))
+                book.set_position(drift.asset, drift.side, size, entry_price)
+                metrics.counter("reconcile_drift_total", "Positions repaired from the exchange's state",
+                                account=self.name, kind=drift.kind).inc()
+                logger.warning("Position drift on %s: %s", self.name, drift)
+        finally:
+            self._repairing = False
+        self.drifts += len(drifts)
+        self.manager._publish_positions()
+        event_bus.publish("drift", {
+            "account": self.name,
+            "openOrders": self.open_orders,
+            "drifts": [drift.to_dict() for drift in drifts],
+        })
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "runs": self.runs,
+            "drifts": self.drifts,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "open_orders": self.open_orders,
+            "last_run": self.last_run,
+            "seconds": self.seconds.summary(),
+        }
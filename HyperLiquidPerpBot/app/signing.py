@@ -0,0 +1,173 @@
+import asyncio
+import math
+import threading
+import time
+import msgpack
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from eth_account import Account
+from eth_account.messages import encode_typed_data
+from eth_utils import keccak, to_hex
+from app.metrics import metrics
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+L1_CHAIN_ID = 1337
+
+
+def float_to_wire(x: float) -> str:
+    """Format a price or size the way the exchange hashes it"""
+    rounded = f"{x:.8f}"
+    if abs(float(rounded) - x) >= 1e-12:
+        raise ValueError(f"float_to_wire causes rounding: {x}")
+    if rounded == "-0.00000000":
+        rounded = "0.00000000"
+    normalized = Decimal(rounded).normalize()
+    return f"{normalized:f}"
+
+
+def round_price(px: float, sz_decimals: int) -> float:
+    """Round a price to 5 significant figures and the asset's allowed decimals"""
+    return round(float(f"{px:.5g}"), 6 - sz_decimals)
+
+
+def floor_size(size: float, sz_decimals: int) -> float:
+    """Round a size down to the asset's size decimals, never past what was asked"""
+    step = 10 ** sz_decimals
+    # The epsilon keeps an exact multiple from flooring a step below itself
+    return math.floor(size * step + 1e-9) / step
+
+
+def order_wire(asset_index: int, is_buy: bool, size: float, limit_px: float,
+               reduce_only: bool = False, tif: str = "Ioc") -> dict:
+    return {
+        "a": asset_index,
+        "b": is_buy,
+        "p": float_to_wire(limit_px),
+        "s": float_to_wire(size),
+        "r": reduce_only,
+        "t": {"limit": {"tif": tif}},
+    }
+
+
+def order_action(order_wires: list) -> dict:
+    return {"type": "order", "orders": order_wires, "grouping": "na"}
+
+
+def action_hash(action: dict, vault_address, nonce: int) -> bytes:
+    data = msgpack.packb(action)
+    data += nonce.to_bytes(8, "big")
+    if vault_address is None:
+        data += b"\x00"
+    else:
+        data += b"\x01" + bytes.fromhex(vault_address[2:] if vault_address.startswith("0x") else vault_address)
+    return keccak(data)
+
+
+def l1_payload(connection_id: bytes, is_mainnet: bool) -> dict:
+    return {
+        "domain": {
+            "chainId": L1_CHAIN_ID,
+            "name": "Exchange",
+            "verifyingContract": ZERO_ADDRESS,
+            "version": "1",
+        },
+        "types": {
+            "Agent": [
+                {"name": "source", "type": "string"},
+                {"name": "connectionId", "type": "bytes32"},
+            ],
+            "EIP712Domain": [
+                {"name": "name", "type": "string"},
+                {"name": "version", "type": "string"},
+                {"name": "chainId", "type": "uint256"},
+                {"name": "verifyingContract", "type": "address"},
+            ],
+        },
+        "primaryType": "Agent",
+        "message": {"source": "a" if is_mainnet else "b", "connectionId": connection_id},
+    }
+
+
+def sign_l1_action(wallet, action: dict, vault_address, nonce: int, is_mainnet: bool) -> dict:
+    """Sign an exchange action with the phantom-agent EIP-712 scheme"""
+    connection_id = action_hash(action, vault_address, nonce)
+    signable = encode_typed_data(full_message=l1_payload(connection_id, is_mainnet))
+    signed = wallet.sign_message(signable)
+    return {"r": to_hex(signed.r), "s": to_hex(signed.s), "v": signed.v}
+
+
+# EIP-712 hashes that are identical for every L1 action, computed once
+DOMAIN_TYPEHASH = keccak(b"EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)")
+AGENT_TYPEHASH = keccak(b"Agent(string source,bytes32 connectionId)")
+DOMAIN_SEPARATOR = keccak(
+    DOMAIN_TYPEHASH
+    + keccak(b"Exchange")
+    + keccak(b"1")
+    + L1_CHAIN_ID.to_bytes(32, "big")
+    + bytes.fromhex(ZERO_ADDRESS[2:]).rjust(32, b"\x00")
+)
+SOURCE_HASHES = {True: keccak(b"a"), False: keccak(b"b")}
+
+
+class Signer:
+    """L1 action signer for one private key
+
+    The key is parsed into a LocalAccount once, the EIP-712 domain separator
+    and type hashes are module constants, and each worker thread reuses its
+    own msgpack Packer. ``sign_async`` runs signing in a small thread pool so
+    the ECDSA work never blocks the event loop.
+    """
+
+    def __init__(self, private_key: str, is_mainnet: bool, threads: int = 2):
+        self.account = Account.from_key(private_key)
+        self.address = self.account.address
+        self.is_mainnet = is_mainnet
+        self._source_hash = SOURCE_HASHES[is_mainnet]
+        # eth-account < 0.13 only has the older signHash name
+        self._sign_hash = getattr(self.account, "unsafe_sign_hash", None) or self.account.signHash
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="signer")
+        self.signatures = 0
+        self.sign_time = metrics.histogram("order_sign_seconds", "Time to sign one L1 action")
+
+    def action_hash(self, action: dict, vault_address, nonce: int) -> bytes:
+        packer = getattr(self._local, "packer", None)
+        if packer is None:
+            packer = self._local.packer = msgpack.Packer()
+        data = packer.pack(action) + nonce.to_bytes(8, "big")
+        if vault_address is None:
+            data += b"\x00"
+        else:
+            data += b"\x01" + bytes.fromhex(vault_address[2:] if vault_address.startswith("0x") else vault_address)
+        return keccak(data)
+
+    def digest(self, action: dict, vault_address, nonce: int) -> bytes:
+        """EIP-712 digest of the phantom agent for an action"""
+        connection_id = self.action_hash(action, vault_address, nonce)
+        struct_hash = keccak(AGENT_TYPEHASH + self._source_hash + connection_id)
+        return keccak(b"\x19\x01" + DOMAIN_SEPARATOR + struct_hash)
+
+    def sign(self, action: dict, vault_address=None, nonce: int = 0) -> dict:
+        started = time.perf_counter()
+        signed = self._sign_hash(self.digest(action, vault_address, nonce))
+        self.sign_time.record(time.perf_counter() - started)
+        self.signatures += 1
+        return {"r": to_hex(signed.r), "s": to_hex(signed.s), "v": signed.v}
+
+    async def sign_async(self, action: dict, vault_address=None, nonce: int = 0) -> dict:
+        """Sign in the signer thread pool"""
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, self.sign, action, vault_address, nonce)
+        except RuntimeError:
+            # Pool closed by a key update while this order was in flight
+            return await asyncio.to_thread(self.sign, action, vault_address, nonce)
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            "address": self.address,
+            "signatures": self.signatures,
+            "sign_time": self.sign_time.summary(),
+        }
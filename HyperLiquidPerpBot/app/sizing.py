@@ -0,0 +1,227 @@
+import math
+import threading
+import time
+from app.config import settings
+from app.signing import floor_size
+
+# Candle intervals understood by the exchange's candleSnapshot request
+INTERVAL_SECONDS = {"1m": 60, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600, "4h": 14400, "1d": 86400}
+
+
+class AtrTracker:
+    """Builds candles from price ticks and keeps a Wilder-smoothed ATR
+
+    Each tick only updates the open candle's high/low/close; the ATR moves
+    once per completed candle, so it costs O(1) per tick and per candle.
+    """
+
+    __slots__ = ("interval", "period", "bucket", "high", "low", "close", "prev_close", "atr", "samples")
+
+    def __init__(self, interval: float, period: int):
+        self.interval = interval
+        self.period = period
+        self.bucket = None
+        self.high = self.low = self.close = None
+        self.prev_close = None
+        self.atr = None  # None until ``period`` candles have completed
+        self.samples = []  # true ranges collected before the first ATR
+
+    def _complete(self, high, low, close):
+        if self.prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        if self.atr is not None:
+            self.atr = (self.atr * (self.period - 1) + true_range) / self.period
+        else:
+            self.samples.append(true_range)
+            if len(self.samples) >= self.period:
+                self.atr = sum(self.samples) / len(self.samples)
+                self.samples = []
+
+    def update(self, price: float, ts: float) -> bool:
+        """Add a tick; returns True when it completed a candle (the ATR may have changed)"""
+        bucket = int(ts // self.interval)
+        if bucket == self.bucket:
+            if price > self.high:
+                self.high = price
+            elif price < self.low:
+                self.low = price
+            self.close = price
+            return False
+        completed = self.bucket is not None
+        if completed:
+            self._complete(self.high, self.low, self.close)
+        self.bucket = bucket
+        self.high = self.low = self.close = price
+        return completed
+
+    def seed(self, candles):
+        """Replay completed (open time seconds, high, low, close) candles, oldest first
+
+        Only candles older than the one being built from ticks are used, and
+        only while no candle has completed from ticks yet.
+        """
+        if self.prev_close is not None:
+            return
+        for open_ts, high, low, close in candles:
+            if self.bucket is not None and int(open_ts // self.interval) >= self.bucket:
+                break
+            self._complete(high, low, close)
+
+
+class _AssetRisk:
+    __slots__ = ("price", "size", "notional", "atr", "version", "cached_key", "cached_size")
+
+    def __init__(self, atr: AtrTracker):
+        self.price = None
+        self.size = 0.0  # gross open size, both sides
+        self.notional = 0.0
+        self.atr = atr
+        self.version = 0
+        self.cached_key = None
+        self.cached_size = None
+
+
+class PositionSizer:
+    """Risk-based order size per asset
+
+    The size is the smallest of:
+    - the size whose stop (``atr_multiple`` x ATR away, or ``default_stop``
+      x price before the ATR has warmed up) loses ``risk_per_trade`` of equity;
+    - what the free margin allows at the configured leverage, both from the
+      account snapshot's withdrawable margin and from equity less the open
+      notional tracked since;
+    - the room left under the gross exposure limit (``max_gross_exposure``
+      x equity) and the per-asset limit (``max_asset_exposure`` x equity).
+
+    The result is rounded down to the asset's size decimals once
+    ``set_size_decimals`` has been given the exchange's metadata.
+
+    Price ticks and fills update the per-asset state and the gross notional
+    incrementally. Sizes are cached per asset until an input changes, so
+    max_size is a dict lookup on the order hot path.
+    """
+
+    def __init__(self, account_cache, leverage: int, risk_per_trade: float = None, atr_multiple: float = None,
+                 atr_period: int = None, candle_interval: str = None, default_stop: float = None,
+                 max_gross_exposure: float = None, max_asset_exposure: float = None, fallback_size: float = None):
+        self.account_cache = account_cache
+        self.leverage = leverage
+        self.risk_per_trade = settings.sizing_risk_per_trade if risk_per_trade is None else risk_per_trade
+        self.atr_multiple = atr_multiple or settings.sizing_atr_multiple
+        self.atr_period = atr_period or settings.sizing_atr_period
+        self.candle_interval = candle_interval or settings.sizing_candle_interval
+        self.default_stop = default_stop or settings.sizing_default_stop
+        self.max_gross_exposure = max_gross_exposure or settings.sizing_max_gross_exposure
+        self.max_asset_exposure = max_asset_exposure or settings.sizing_max_asset_exposure
+        self.fallback_size = settings.sizing_fallback_size if fallback_size is None else fallback_size
+        if self.candle_interval not in INTERVAL_SECONDS:
+            raise ValueError(f"Unknown candle interval {self.candle_interval}")
+
+        self._assets = {}
+        self._size_decimals = {}  # asset -> szDecimals from the exchange metadata
+        self._gross = 0.0  # total open notional across assets
+        self._generation = 0  # bumped whenever gross exposure changes
+        self._lock = threading.Lock()
+        self.computed = 0
+        self.cache_hits = 0
+
+    def _asset(self, asset: str) -> _AssetRisk:
+        state = self._assets.get(asset)
+        if state is None:
+            interval = INTERVAL_SECONDS[self.candle_interval]
+            state = self._assets[asset] = _AssetRisk(AtrTracker(interval, self.atr_period))
+        return state
+
+    def on_price(self, asset: str, price: float, ts: float = None):
+        """Price tick: roll the asset's candle and re-mark its exposure"""
+        with self._lock:
+            state = self._asset(asset)
+            state.atr.update(price, time.time() if ts is None else ts)
+            state.price = price
+            state.version += 1
+            if state.size:
+                notional = state.size * price
+                self._gross += notional - state.notional
+                state.notional = notional
+                self._generation += 1
+
+    def on_position(self, asset: str, size: float):
+        """Fill or sync: the asset's gross open size is now ``size``"""
+        with self._lock:
+            state = self._asset(asset)
+            state.size = size
+            notional = size * state.price if state.price else 0.0
+            self._gross += notional - state.notional
+            state.notional = notional
+            state.version += 1
+            self._generation += 1
+
+    def set_size_decimals(self, decimals: dict):
+        """Asset -> number of decimals the exchange accepts in an order size"""
+        with self._lock:
+            self._size_decimals = dict(decimals)
+            self._generation += 1
+
+    def seed_candles(self, asset: str, candles):
+        """Warm the ATR from completed historical candles, oldest first"""
+        with self._lock:
+            state = self._asset(asset)
+            state.atr.seed(candles)
+            state.version += 1
+
+    def price(self, asset: str):
+        state = self._assets.get(asset)
+        return state.price if state is not None else None
+
+    def atr(self, asset: str):
+        state = self._assets.get(asset)
+        return state.atr.atr if state is not None else None
+
+    def max_size(self, asset: str) -> float:
+        """Largest order size for an asset under the risk and exposure limits"""
+        snapshot = self.account_cache.latest
+        state = self._assets.get(asset)
+        if snapshot is None or state is None or not state.price:
+            # Nothing to size against yet (no account state or no price)
+            return self.fallback_size
+
+        key = (self._generation, state.version, snapshot)
+        if state.cached_key == key:
+            self.cache_hits += 1
+            return state.cached_size
+
+        price = state.price
+        equity = snapshot.balance
+        atr = state.atr.atr
+        stop = atr * self.atr_multiple if atr else price * self.default_stop
+        size = min(
+            equity * self.risk_per_trade / stop,
+            snapshot.withdrawable * self.leverage / price,
+            (equity * self.leverage - self._gross) / price,
+            (equity * self.max_gross_exposure - self._gross) / price,
+            (equity * self.max_asset_exposure - state.notional) / price,
+        )
+        size = max(0.0, size) if math.isfinite(size) else 0.0
+        decimals = self._size_decimals.get(asset)
+        if decimals is not None:
+            # Round down so the order never exceeds the limits
+            size = floor_size(size, decimals)
+
+        state.cached_key = key
+        state.cached_size = size
+        self.computed += 1
+        return size
+
+    def stats(self) -> dict:
+        return {
+            "gross_notional": self._gross,
+            "computed": self.computed,
+            "cache_hits": self.cache_hits,
+            "assets": {
+                asset: {"price": s.price, "atr": s.atr.atr, "notional": s.notional, "size": s.cached_size}
+                for asset, s in list(self._assets.items())
+            },
+        }
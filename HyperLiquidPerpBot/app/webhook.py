@@ -1,123 +1,377 @@
 from fastapi import FastAPI, HTTPException, Request
-from pydantic import BaseModel
-import json
-import logging
+from fastapi.responses import PlainTextResponse
+import asyncio
 from app.exchange_manager import ExchangeManager
-from app.logger import logger
+from app.logger import bind_request_id, logger, request_id_var, reset_request_id
+from app.ingest import AlertIngest
+from app.accounts import AccountRegistry
+from app.reconciler import Reconciler
+from app.journal import OrderJournal
+from app.models import ActionResult, BatchPayload, WebhookPayload
+from app.executor import OrderExecutor, QueueFullError
+from app.config import settings
+from app.events import event_bus
+from app.metrics import metrics, timed
 
 # Import the database manager
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from ui.database import DatabaseManager
+from ui.write_behind import WriteBehindQueue
 
 class WebhookHandler:
-    def __init__(self, exchange_manager: ExchangeManager):
+    def __init__(self, exchange_manager: ExchangeManager, accounts: AccountRegistry = None):
         self.exchange_manager = exchange_manager
+        # Every alert is copied to each account that follows its asset
+        self.accounts = accounts or AccountRegistry(exchange_manager)
         self.db_manager = DatabaseManager()
+        # Trade/balance/status writes are batched off the request path
+        self.db_writer = WriteBehindQueue(self.db_manager)
+        
+        # Duplicate-alert suppression in front of handle_payload
+        self.ingest = AlertIngest(self.db_manager, self.db_writer)
+        
+        # Actions run in order per account and asset, in parallel across both
+        self.executor = OrderExecutor(max_queue_size=settings.executor_max_queue_size,
+                                      idle_timeout=settings.executor_idle_timeout)
+        
+        # Position book repair against the exchange, started with the handler
+        self.reconcilers = {}
+        # Per-account order journals, restored on start
+        self.journals = {}
+        
+        metrics.gauge("write_behind_queue_depth", lambda: self.db_writer.depth, "Database writes waiting to be flushed")
+        metrics.gauge("alerts_in_flight", lambda: self.ingest.in_flight, "Alerts currently executing")
+        metrics.gauge("event_bus_subscribers", lambda: event_bus.subscriber_count, "Connected dashboard streams")
         
         # Initialize the bot status
-        self.db_manager.update_status("INITIALIZED")
+        self.db_writer.update_status("INITIALIZED")
+    
+    async def call_exchange(self, method, *args, **kwargs):
+        """Await an exchange call without blocking the event loop
+        
+        Coroutine methods (AsyncExchangeManager) are awaited directly; blocking
+        ones run in a worker thread.
+        """
+        if asyncio.iscoroutinefunction(method):
+            return await method(*args, **kwargs)
+        return await asyncio.to_thread(method, *args, **kwargs)
+    
+    async def start(self):
+        """Restore the journals, start the exchange connection and record the initial balance"""
+        self.ingest.load()
+        self.restore_journals()
         
-        # Record initial balance
-        initial_balance = self.exchange_manager.get_account_balance()
-        self.db_manager.record_balance(initial_balance)
+        if hasattr(self.exchange_manager, "start"):
+            await self.exchange_manager.start()
+        await self.accounts.start()
+        await self.resolve_pending_orders()
+        self.start_reconcilers()
+        
+        initial_balance = await self.call_exchange(self.exchange_manager.get_account_balance)
+        self.db_writer.record_balance(initial_balance)
+    
+    def restore_journals(self):
+        """Rebuild each account's position book and pending orders from its journal
+
+        Only accounts that trade through the exchange API are journaled, not
+        demo mode.
+        """
+        if not settings.journal_enabled:
+            return
+        for account in self.accounts:
+            if account.name in self.journals or not hasattr(account.manager, "resolve_pending_orders"):
+                continue
+            journal = self.journals[account.name] = OrderJournal(
+                settings.journal_dir, account.name, settings.journal_snapshot_every
+            )
+            journal.restore(account.manager.positions)
+            account.manager.journal = journal
+            account.manager._publish_positions()
+    
+    async def resolve_pending_orders(self):
+        """Settle orders left in doubt by the previous run before trading resumes"""
+        accounts = [a for a in self.accounts if a.manager.journal is not None and hasattr(a.manager, "resolve_pending_orders")]
+        results = await asyncio.gather(*(a.manager.resolve_pending_orders() for a in accounts), return_exceptions=True)
+        for account, result in zip(accounts, results):
+            if isinstance(result, Exception):
+                logger.error("Error resolving pending orders for %s: %s", account.name, result)
+    
+    def start_reconcilers(self):
+        """Reconcile every account that trades through the exchange API (not demo mode)"""
+        if not settings.reconcile_enabled:
+            return
+        for account in self.accounts:
+            if account.name in self.reconcilers or not hasattr(account.manager, "get_open_orders"):
+                continue
+            reconciler = self.reconcilers[account.name] = Reconciler(account.manager, account.name)
+            reconciler.start()
+    
+    async def close(self):
+        """Close the exchange connection and flush pending database writes"""
+        await asyncio.gather(*(reconciler.stop() for reconciler in self.reconcilers.values()))
+        await self.executor.stop()
+        if hasattr(self.exchange_manager, "stop"):
+            await self.exchange_manager.stop()
+        await self.accounts.stop()
+        for journal in self.journals.values():
+            journal.close()
+        self.db_writer.close()
+        self.db_manager.close()
     
+    @timed("webhook_seconds", "Webhook receipt to response", endpoint="webhook")
     async def handle_webhook(self, request: Request):
+        """Process a webhook request through the idempotency stage"""
+        raw = await request.body()
+        return await self.ingest.process(raw, self.handle_payload)
+    
+    def record_result(self, result: ActionResult, account: str = None):
+        """Record the fill of a successful action"""
+        self.db_writer.record_trade(
+            asset=result.asset,
+            trade_type="CLOSE" if result.action == "CLOSE" else result.side,
+            size=result.size,
+            price=result.price,
+            pnl=result.pnl,
+            account=account
+        )
+    
+    def collect(self, account, result: ActionResult) -> dict:
+        """Count and record one account's result and return its response entry"""
+        metrics.counter("webhook_actions_total", "Executed webhook actions by outcome",
+                        action=result.action, status=self.result_status(result)).inc()
+        if result.success:
+            logger.info("Action executed for %s: %s", account.name, result)
+            self.record_result(result, account.name)
+            return {"status": "success", "result": result.message, "fill": result.to_dict()}
+        logger.error("Action failed for %s: %s", account.name, result.message)
+        return {"status": self.result_status(result), "message": result.message}
+    
+    @staticmethod
+    def result_status(result: ActionResult) -> str:
+        """success, error, or in_doubt when the order was sent and may have executed"""
+        if result.success:
+            return "success"
+        return "in_doubt" if result.in_doubt else "error"
+    
+    @staticmethod
+    def overall_status(statuses) -> str:
+        succeeded = sum(1 for status in statuses if status == "success")
+        if succeeded == len(statuses):
+            return "success"
+        if succeeded:
+            return "partial"
+        return "in_doubt" if "in_doubt" in statuses else "error"
+    
+    async def record_main_balance(self):
+        current_balance = await self.call_exchange(self.exchange_manager.get_account_balance)
+        self.db_writer.record_balance(current_balance)
+    
+    async def fan_out(self, accounts, submit):
+        """Run submit(account) for every account concurrently
+        
+        A full queue or an unexpected error fails only that account.
+        """
+        outcomes = await asyncio.gather(*(submit(account) for account in accounts), return_exceptions=True)
+        for account, outcome in zip(accounts, outcomes):
+            if isinstance(outcome, BaseException) and not isinstance(outcome, Exception):
+                raise outcome
+            if isinstance(outcome, QueueFullError):
+                logger.warning("%s: %s", account.name, outcome)
+            elif isinstance(outcome, Exception):
+                logger.error("Error executing for account %s: %s", account.name, outcome)
+        return outcomes
+    
+    @timed("webhook_seconds", endpoint="batch")
+    async def handle_batch_webhook(self, request: Request):
+        """Process a batch webhook request through the idempotency stage"""
+        raw = await request.body()
+        return await self.ingest.process(raw, self.handle_batch_payload, model=BatchPayload)
+    
+    async def handle_batch_payload(self, payload: BatchPayload):
         try:
-            # Parse the incoming webhook payload
-            payload = await request.json()
-            logger.info(f"Received webhook: {payload}")
+            logger.info("Received batch webhook with %d orders", len(payload.orders))
+            logger.debug("Batch payload: %s", payload)
             
-            # Extract the action from the payload
-            if "action" not in payload:
-                raise HTTPException(status_code=400, detail="Missing 'action' field in payload")
+            try:
+                validated = self.exchange_manager.validate_batch(
+                    [{"action": o.action, "size": o.size, "asset": o.asset} for o in payload.orders]
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
             
-            action = payload["action"]
-            size = payload.get("size", None)  # Get size if provided
-            asset = payload.get("asset", None)  # Get asset if provided
+            async def submit(account):
+                legs = [(action, size, asset) for action, size, asset in validated if account.follows(asset)]
+                orders = [{"action": action, "size": account.scale(size), "asset": asset} for action, size, asset in legs]
+                # The batch waits behind the account's earlier actions for every asset it touches
+                results = await self.executor.submit_group(
+                    [account.queue_key(asset) for _, _, asset in legs],
+                    self.call_exchange, account.manager.submit_batch, orders
+                )
+                return legs, results
             
-            # Execute the action on the exchange - note this is synchronous
-            success, result = self.exchange_manager.handle_action(action, size=size, asset=asset)
+            accounts = [a for a in self.accounts if any(a.follows(asset) for _, _, asset in validated)]
+            if len(accounts) == 1:
+                try:
+                    outcomes = [await submit(accounts[0])]
+                except QueueFullError as e:
+                    logger.warning(str(e))
+                    raise HTTPException(status_code=429, detail=str(e))
+            else:
+                outcomes = await self.fan_out(accounts, submit)
             
-            if success:
-                logger.info(f"Action executed successfully: {result}")
-                
-                # Update the database with trade information
-                # For BUY and SELL actions, record the trade
-                if action.upper() in ["BUY", "SELL"]:
-                    # Extract position info from the result
-                    # This assumes the result is in a specific format
-                    # In a real implementation, you would parse the result properly
-                    if isinstance(result, str) and "position" in result:
-                        try:
-                            # Extract position data - in a real implementation, 
-                            # this would be a proper object
-                            position_str = result.split("position: ")[1].strip("}")
-                            # Clean up the string to ensure it's valid JSON
-                            position_str = position_str.replace("'", "\"")
-                            position_data = json.loads(position_str + "}")
-                            
-                            self.db_manager.record_trade(
-                                asset=position_data["asset"],
-                                trade_type=position_data["direction"],
-                                size=position_data["size"],
-                                price=position_data["entryPrice"],
-                                pnl=position_data["pnl"]
-                            )
-                        except Exception as e:
-                            logger.error(f"Error recording trade: {e}")
-                
-                # For CLOSE actions, record the closing trade with PnL
-                elif action.upper() == "CLOSE":
-                    if isinstance(result, str) and "PnL" in result:
-                        try:
-                            # Extract PnL value
-                            pnl = float(result.split("PnL: ")[1])
-                            
-                            # Get the position data - we know the position has just been closed
-                            # So we need to use the last known position data
-                            asset = self.exchange_manager.asset_name
-                            
-                            self.db_manager.record_trade(
-                                asset=asset,
-                                trade_type="CLOSE",
-                                size=0.1,  # using default value since real size is unknown
-                                price=3500.0,  # using a placeholder since real price is unknown
-                                pnl=pnl
-                            )
-                            logger.info(f"Recorded CLOSE trade with PnL: {pnl}")
-                        except Exception as e:
-                            logger.error(f"Error recording close trade: {e}")
-                
-                # Update the account balance after any action
-                current_balance = self.exchange_manager.get_account_balance()
-                self.db_manager.record_balance(current_balance)
+            per_account = {}
+            for account, outcome in zip(accounts, outcomes):
+                if isinstance(outcome, Exception):
+                    per_account[account.name] = {"status": "error", "message": str(outcome), "results": []}
+                    continue
+                responses = [self.collect(account, result) for result in outcome[1]]
+                per_account[account.name] = {
+                    "status": self.overall_status([r["status"] for r in responses]),
+                    "results": responses,
+                }
+            
+            main = per_account[self.accounts.main.name]
+            if main["status"] != "error":
+                await self.record_main_balance()
+            
+            if len(accounts) == 1:
+                return {"status": main["status"], "results": main["results"]}
+            return {
+                "status": self.overall_status([entry["status"] for entry in per_account.values()]),
+                "accounts": per_account,
+            }
+        
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error("Error handling batch webhook: %s", e)
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    async def handle_payload(self, payload: WebhookPayload):
+        try:
+            action, size = payload.action, payload.size
+            asset = payload.asset or self.exchange_manager.asset_name
+            logger.info("Received webhook: action=%s asset=%s size=%s", action, asset, size)
+            logger.debug("Webhook payload: %s", payload)
+            
+            def submit(account):
+                # Queued behind the account's earlier actions for the same asset
+                return self.executor.submit(
+                    account.queue_key(asset),
+                    self.call_exchange, account.manager.handle_action, action, size=account.scale(size), asset=asset
+                )
+            
+            accounts = self.accounts.following(asset)
+            if len(accounts) == 1:
+                try:
+                    result = await submit(accounts[0])
+                except QueueFullError as e:
+                    logger.warning(str(e))
+                    raise HTTPException(status_code=429, detail=str(e))
                 
-                return {"status": "success", "result": result}
-            else:
-                logger.error(f"Action failed: {result}")
-                return {"status": "error", "message": result}
+                response = self.collect(accounts[0], result)
+                if result.success:
+                    # Update the account balance after any action
+                    await self.record_main_balance()
+                return response
+            
+            outcomes = await self.fan_out(accounts, submit)
+            per_account = {}
+            for account, outcome in zip(accounts, outcomes):
+                if isinstance(outcome, Exception):
+                    outcome = ActionResult.failed(action, asset, str(outcome))
+                per_account[account.name] = self.collect(account, outcome)
+            
+            if per_account[self.accounts.main.name]["status"] == "success":
+                await self.record_main_balance()
+            return {
+                "status": self.overall_status([entry["status"] for entry in per_account.values()]),
+                "accounts": per_account,
+            }
                 
+        except HTTPException:
+            raise
         except Exception as e:
-            logger.error(f"Error handling webhook: {e}")
+            logger.error("Error handling webhook: %s", e)
             raise HTTPException(status_code=500, detail=str(e))
 
 # FastAPI routes
 app = FastAPI()
 
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """Tag every log line of a request with its X-Request-ID (generated if absent)"""
+    token = bind_request_id(request.headers.get("X-Request-ID"))
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id_var.get()
+        return response
+    finally:
+        reset_request_id(token)
+
 # Global variables
 exchange_manager = None
 webhook_handler = None
+market_feed = None
+
+@app.on_event("startup")
+async def startup():
+    if market_feed is not None:
+        market_feed.start()
+        metrics.gauge("market_data_age_seconds", market_feed.cache.last_update_age, "Seconds since the last price update")
+    if webhook_handler is not None:
+        await webhook_handler.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    if market_feed is not None:
+        await market_feed.stop()
+    if webhook_handler is not None:
+        await webhook_handler.close()
 
 @app.get("/")
 async def root():
     return {"status": "HyperLiquidPerpBot webhook server is running"}
 
+@app.get("/stats")
+async def stats():
+    if webhook_handler is None:
+        raise HTTPException(status_code=500, detail="Webhook handler not initialized")
+    
+    signer = getattr(webhook_handler.exchange_manager, "signer", None)
+    client = getattr(webhook_handler.exchange_manager, "client", None)
+    return {
+        "market_data": market_feed.stats() if market_feed is not None else None,
+        "write_behind": webhook_handler.db_writer.stats(),
+        "account_cache": webhook_handler.exchange_manager.account_cache.stats(),
+        "sizer": webhook_handler.exchange_manager.sizer.stats(),
+        "ingest": webhook_handler.ingest.stats(),
+        "executor": webhook_handler.executor.stats(),
+        "accounts": webhook_handler.accounts.stats(),
+        "reconcilers": {name: r.stats() for name, r in webhook_handler.reconcilers.items()},
+        "journals": {name: j.stats() for name, j in webhook_handler.journals.items()},
+        "signer": signer.stats() if signer is not None else None,
+        "paper_exchange": client.stats() if getattr(client, "paper", False) else None,
+        "rate_limit": client.scheduler.stats() if hasattr(client, "scheduler") else None,
+    }
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/webhook")
 async def webhook_endpoint(request: Request):
     if webhook_handler is None:
         raise HTTPException(status_code=500, detail="Webhook handler not initialized")
     
     result = await webhook_handler.handle_webhook(request)
-    return result
\ No newline at end of file
+    return result
+
+@app.post("/webhook/batch")
+async def webhook_batch_endpoint(request: Request):
+    if webhook_handler is None:
+        raise HTTPException(status_code=500, detail="Webhook handler not initialized")
+    
+    return await webhook_handler.handle_batch_webhook(request)
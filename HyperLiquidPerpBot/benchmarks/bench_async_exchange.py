@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark webhook order throughput on the async exchange path.
+
+Starts the stub exchange and the webhook server (live mode, pointed at the
+stub) and fires BUY/SELL alerts at increasing concurrency levels.
+
+    python benchmarks/bench_async_exchange.py --orders 200 --latency-ms 20
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+import uvicorn
+from eth_account import Account
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from stub_exchange import run_stub_server
+
+
+async def fire(url, orders, concurrency):
+    # A unique alert_id per request, so duplicate suppression does not answer from cache
+    run_id = uuid.uuid4().hex[:8]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(timeout=30.0, limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def one(i):
+            async with semaphore:
+                t0 = time.perf_counter()
+                response = await client.post(url, json={
+                    "action": "BUY" if i % 2 == 0 else "SELL", "size": 0.01, "alert_id": f"bench-{run_id}-{i}",
+                })
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - t0)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(orders)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return orders / elapsed, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99) - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Async exchange webhook throughput")
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="simulated exchange round-trip")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--stub-port", type=int, default=8100)
+    parser.add_argument("--port", type=int, default=8101)
+    args = parser.parse_args()
+
+    run_stub_server(port=args.stub_port, latency=args.latency_ms / 1000.0)
+
+    from app.config import settings
+    settings.hyperliquid_api_url = f"http://127.0.0.1:{args.stub_port}"
+    # Stay offline: mids come from the stub's allMids instead of the websocket feed
+    settings.market_data_enabled = False
+    # Measures the bot, not HyperLiquid's weight budget (see bench_rate_limit.py)
+    settings.rate_limit_enabled = False
+    settings.hyperliquid_private_key = Account.create().key.hex()
+    settings.hyperliquid_account_address = "0x" + "00" * 20
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        from app.main import create_app
+        import logging
+        app = create_app()
+        logging.getLogger("hyperliquid_perp_bot").setLevel(logging.WARNING)
+
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+        import threading
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.01)
+
+        url = f"http://127.0.0.1:{args.port}/webhook"
+        print(f"exchange latency {args.latency_ms:.0f}ms, {args.orders} orders per run")
+        print(f"{'concurrency':>11} {'orders/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+        for concurrency in args.concurrency:
+            rate, p50, p99 = asyncio.run(fire(url, args.orders, concurrency))
+            print(f"{concurrency:>11} {rate:>10.1f} {p50:>8.1f} {p99:>8.1f}")
+
+        server.should_exit = True
+        time.sleep(0.5)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark the backtest engine on synthetic minute data.
+
+Writes one CSV of random-walk minute closes per asset plus a file of
+alerts, then replays them through app.backtest and reports rows/sec.
+
+    python benchmarks/bench_backtest.py --days 365 --assets BTC ETH SOL
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.backtest import Backtest, FillModel, read_alerts, read_prices
+
+START_PRICES = {"BTC": 60000.0, "ETH": 3500.0, "SOL": 150.0}
+
+
+def write_prices(directory, assets, days, seed):
+    rng = random.Random(seed)
+    start = 1_700_000_000 - 1_700_000_000 % 60
+    paths = []
+    for asset in assets:
+        path = os.path.join(directory, f"{asset}.csv")
+        price = START_PRICES.get(asset, 100.0)
+        with open(path, "w") as f:
+            f.write("ts,close,funding\n")
+            lines = []
+            for minute in range(days * 1440):
+                price *= 1 + rng.gauss(0, 0.0008)
+                lines.append(f"{start + minute * 60},{price:.4f},0.0000125\n")
+                if len(lines) >= 100000:
+                    f.writelines(lines)
+                    lines.clear()
+            f.writelines(lines)
+        paths.append(path)
+    return start, paths
+
+
+def write_alerts(directory, assets, start, days, per_day, seed):
+    rng = random.Random(seed)
+    path = os.path.join(directory, "alerts.jsonl")
+    count = days * per_day
+    with open(path, "w") as f:
+        for ts in sorted(rng.uniform(start + 60, start + days * 86400) for _ in range(count)):
+            action = rng.choice(("BUY", "SELL", "CLOSE", "CLOSE"))
+            f.write(json.dumps({"ts": ts, "action": action, "asset": rng.choice(assets), "size": 0.1}) + "\n")
+    return path, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest replay throughput")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--assets", nargs="+", default=["BTC", "ETH", "SOL"])
+    parser.add_argument("--alerts-per-day", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        start, price_paths = write_prices(tmp, args.assets, args.days, args.seed)
+        alerts_path, alert_count = write_alerts(tmp, args.assets, start, args.days, args.alerts_per_day, args.seed)
+        generated = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        results = Backtest(read_alerts(alerts_path), read_prices(price_paths), FillModel(funding_rate=0.0000125)).run()
+        elapsed = time.perf_counter() - t0
+
+    rows = results["price_rows"]
+    print(f"{args.days} days x {len(args.assets)} assets of minute data, {alert_count} alerts "
+          f"(generated in {generated:.1f}s)")
+    print(f"replayed {rows} rows in {elapsed:.2f}s: {rows / elapsed:,.0f} rows/s")
+    print(f"fills {results['fills']}, pnl {results['total_pnl']:.2f}, fees {results['fees']:.2f}, "
+          f"funding {results['funding']:.2f}, max drawdown {results['max_drawdown_pct']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
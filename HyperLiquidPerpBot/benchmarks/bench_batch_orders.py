@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark bulk order submission against N sequential single orders.
+
+Runs AsyncExchangeManager against the stub exchange and times a rebalance of
+N assets, first as N separately signed orders, then as one submit_batch call
+(one signature, one request).
+
+    python benchmarks/bench_batch_orders.py --orders 20 --latency-ms 20
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+from eth_account import Account
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from stub_exchange import UNIVERSE, run_stub_server
+
+
+async def run(args):
+    from app.async_exchange_manager import AsyncExchangeManager
+    from app.hyperliquid_client import HyperliquidClient
+
+    manager = AsyncExchangeManager(HyperliquidClient(base_url=f"http://127.0.0.1:{args.stub_port}"))
+    await manager.start()
+    await manager.get_mid_price("BTC")  # warm the price cache for every asset
+
+    assets = [asset["name"] for asset in UNIVERSE[:args.orders]]
+    orders = [{"action": "BUY" if i % 2 == 0 else "SELL", "size": 1, "asset": asset}
+              for i, asset in enumerate(assets)]
+
+    sequential, batched = [], []
+    for _ in range(args.rounds):
+        start = time.perf_counter()
+        for order in orders:
+            result = await manager.handle_action(order["action"], size=order["size"], asset=order["asset"])
+            assert result.success
+        sequential.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        results = await manager.submit_batch(orders)
+        assert all(result.success for result in results)
+        batched.append(time.perf_counter() - start)
+
+    await manager.stop()
+    return min(sequential), min(batched)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch vs sequential order submission")
+    parser.add_argument("--orders", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="simulated exchange round-trip")
+    parser.add_argument("--stub-port", type=int, default=8100)
+    args = parser.parse_args()
+    if args.orders > len(UNIVERSE):
+        parser.error(f"the stub lists {len(UNIVERSE)} assets")
+
+    logging.getLogger("hyperliquid_perp_bot").setLevel(logging.WARNING)
+    run_stub_server(port=args.stub_port, latency=args.latency_ms / 1000.0)
+
+    from app.config import settings
+    settings.hyperliquid_private_key = Account.create().key.hex()
+    settings.hyperliquid_account_address = "0x" + "00" * 20
+
+    sequential, batched = asyncio.run(run(args))
+    print(f"exchange latency {args.latency_ms:.0f}ms, {args.orders} orders, best of {args.rounds}")
+    print(f"{'mode':>10} {'total ms':>9} {'ms/order':>9}")
+    print(f"{'sequential':>10} {sequential * 1000:>9.1f} {sequential * 1000 / args.orders:>9.2f}")
+    print(f"{'batch':>10} {batched * 1000:>9.1f} {batched * 1000 / args.orders:>9.2f}")
+    print(f"speedup {sequential / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark the SQLite persistence layer.
+
+Compares the previous connect-per-call access pattern with the pooled WAL
+DatabaseManager: insert throughput and read latency percentiles.
+
+    python benchmarks/bench_database.py --inserts 2000 --reads 500
+"""
+
+import argparse
+import datetime
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ui.database import DatabaseManager
+
+
+class LegacyDatabaseManager(DatabaseManager):
+    """Reproduces the original open/commit/close on every call"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.init_database()
+
+    def record_trade(self, asset, trade_type, size, price, pnl):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            "INSERT INTO trades (timestamp, asset, type, size, price, pnl) VALUES (?, ?, ?, ?, ?, ?)",
+            (datetime.datetime.now().isoformat(), asset, trade_type, size, price, pnl)
+        )
+        conn.commit()
+        conn.close()
+
+    def get_trades(self, limit=50):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        rows = [dict(r) for r in conn.execute("SELECT * FROM trades ORDER BY timestamp DESC LIMIT ?", (limit,))]
+        conn.close()
+        return rows
+
+    def close(self):
+        pass
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(manager, inserts, reads):
+    start = time.perf_counter()
+    for i in range(inserts):
+        manager.record_trade("ETH", "BUY", 0.1, 3500.0 + i, 0.0)
+    insert_elapsed = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(reads):
+        t0 = time.perf_counter()
+        manager.get_trades(limit=50)
+        latencies.append(time.perf_counter() - t0)
+
+    return {
+        "inserts_per_sec": inserts / insert_elapsed,
+        "read_p50_ms": percentile(latencies, 50) * 1000,
+        "read_p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--inserts", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for name, factory in (("legacy", LegacyDatabaseManager), ("pooled", DatabaseManager)):
+            manager = factory(os.path.join(tmp, f"{name}.db"))
+            try:
+                results[name] = run(manager, args.inserts, args.reads)
+            finally:
+                manager.close()
+
+    print(f"{'mode':<8} {'inserts/s':>12} {'read p50 ms':>12} {'read p99 ms':>12}")
+    for name, r in results.items():
+        print(f"{name:<8} {r['inserts_per_sec']:>12.0f} {r['read_p50_ms']:>12.3f} {r['read_p99_ms']:>12.3f}")
+    print(f"insert speedup: {results['pooled']['inserts_per_sec'] / results['legacy']['inserts_per_sec']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
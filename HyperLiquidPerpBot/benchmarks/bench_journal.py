@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark the order journal: group-committed writes and restart time.
+
+Journals a stream of orders (intent, durable submitted, filled, position
+change) in concurrent groups, the way overlapping webhooks would, and
+reports the journaling rate and fsyncs per order. It then times a restore,
+first replaying the whole journal without snapshots and then from the
+latest snapshot plus the records after it.
+
+    python benchmarks/bench_journal.py --orders 50000 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ASSETS = ["BTC", "ETH", "SOL"] + [f"ALT{i}" for i in range(1, 21)]
+
+
+def stop_without_snapshot(journal):
+    """Stop the writer as a crash would, leaving the journal unsnapshotted"""
+    journal._closed = True
+    with journal._cond:
+        journal._cond.notify()
+    journal._thread.join()
+    journal._file.close()
+
+
+async def write(directory, orders, concurrency, snapshot_every):
+    from app.journal import OrderJournal
+    from app.position_book import PositionBook
+
+    book = PositionBook(hedge_mode=False)
+    journal = OrderJournal(directory, "bench", snapshot_every=snapshot_every)
+    journal.restore(book)
+
+    async def order(i):
+        asset = ASSETS[i % len(ASSETS)]
+        side = "BUY" if (i // len(ASSETS)) % 3 else "SELL"
+        ids = journal.intent([{"asset": asset, "side": side, "size": 0.1, "px": 100.0, "reduce_only": False}])
+        await journal.sync(journal.submitted(ids, i))
+        journal.answered(ids, [{"filled": {"totalSz": "0.1", "avgPx": "100.0", "oid": i}}])
+        book.apply_fill(asset, side, 0.1, 100.0 + i % 7)
+
+    start = time.perf_counter()
+    for first in range(0, orders, concurrency):
+        await asyncio.gather(*(order(i) for i in range(first, min(first + concurrency, orders))))
+    await journal.sync()
+    elapsed = time.perf_counter() - start
+    stats = journal.stats()
+    stop_without_snapshot(journal)
+    return elapsed, stats, book.to_list()
+
+
+def restore(directory):
+    from app.journal import OrderJournal
+    from app.position_book import PositionBook
+
+    book = PositionBook(hedge_mode=False)
+    journal = OrderJournal(directory, "bench")
+    restored = journal.restore(book)
+    stop_without_snapshot(journal)
+    return restored, book.to_list()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Order journal write rate and restart time")
+    parser.add_argument("--orders", type=int, default=50000)
+    parser.add_argument("--concurrency", type=int, default=32, help="orders journaled together")
+    parser.add_argument("--snapshot-every", type=int, default=2000)
+    args = parser.parse_args()
+
+    logging.getLogger("hyperliquid_perp_bot").setLevel(logging.WARNING)
+    print(f"{args.orders} orders, {args.concurrency} at a time")
+    print(f"{'mode':>14} {'orders/s':>9} {'fsyncs':>7} {'journal MB':>10} {'restore ms':>10} {'replayed':>9}")
+    for label, snapshot_every in (("full replay", 10 ** 12), ("snapshot+tail", args.snapshot_every)):
+        with tempfile.TemporaryDirectory(prefix="bench_journal_") as directory:
+            elapsed, stats, book = asyncio.run(write(directory, args.orders, args.concurrency, snapshot_every))
+            size = os.path.getsize(os.path.join(directory, "bench.journal")) / 1e6
+            restored, restored_book = restore(directory)
+            assert restored_book == book, "restored book differs"
+            print(f"{label:>14} {args.orders / elapsed:>9.0f} {stats['syncs']:>7} {size:>10.1f} "
+                  f"{restored['ms']:>10.1f} {restored['replayed']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark the in-process paper exchange.
+
+Measures raw matching throughput (pre-built IOC orders sent straight to
+PaperExchange.exchange while the reference price moves), then orders/sec
+through AsyncExchangeManager, which adds order building and signing.
+
+    python benchmarks/bench_paper_exchange.py --orders 50000 --actions 500
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ASSETS = {"BTC": 60000.0, "ETH": 3500.0, "SOL": 150.0}
+
+
+async def run(args):
+    from app.async_exchange_manager import AsyncExchangeManager
+    from app.market_data import PriceCache
+    from app.paper_exchange import PaperExchange
+    from app.signing import order_action, order_wire
+
+    cache = PriceCache()
+    cache.update_mids(ASSETS)
+    exchange = PaperExchange(market_data=cache, balance=1e9)
+    names = list(ASSETS)
+
+    actions = []
+    for i in range(args.orders):
+        asset = names[i % len(names)]
+        mid = ASSETS[asset]
+        is_buy = (i // len(names)) % 2 == 0
+        px = mid * 1.01 if is_buy else mid * 0.99
+        actions.append(order_action([order_wire(exchange._index[asset], is_buy, 0.01, round(px, 1))]))
+
+    start = time.perf_counter()
+    for i, action in enumerate(actions):
+        if i % args.tick_every == 0:
+            asset = names[(i // args.tick_every) % len(names)]
+            exchange.set_mid(asset, ASSETS[asset] * (1 + (i % 13 - 6) / 10000))
+        await exchange.exchange(action, i, None)
+    raw = time.perf_counter() - start
+    stats = exchange.stats()
+
+    manager = AsyncExchangeManager(exchange)
+    await manager.start()
+    start = time.perf_counter()
+    for i in range(args.actions):
+        action = "BUY" if i % 2 == 0 else "SELL"
+        result = await manager.handle_action(action, size=0.01, asset=names[i % len(names)])
+        assert result.success
+    managed = time.perf_counter() - start
+    await manager.stop()
+    return raw, managed, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paper exchange throughput")
+    parser.add_argument("--orders", type=int, default=50000, help="orders sent straight to the matching engine")
+    parser.add_argument("--actions", type=int, default=500, help="actions sent through AsyncExchangeManager")
+    parser.add_argument("--tick-every", type=int, default=100, help="orders between reference price updates")
+    args = parser.parse_args()
+
+    logging.getLogger("hyperliquid_perp_bot").setLevel(logging.WARNING)
+    raw, managed, stats = asyncio.run(run(args))
+    print(f"{'path':>14} {'orders':>8} {'orders/s':>10} {'us/order':>9}")
+    print(f"{'matching':>14} {args.orders:>8} {args.orders / raw:>10.0f} {raw * 1e6 / args.orders:>9.1f}")
+    print(f"{'manager+sign':>14} {args.actions:>8} {args.actions / managed:>10.0f} {managed * 1e6 / args.actions:>9.1f}")
+    print(f"fills {stats['fills']}, rejected {stats['rejected']}, volume {stats['volume']:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark the request scheduler against a stub exchange that enforces a weight limit.
+
+Starts the stub with a rolling-window weight limit and drives one client
+with dashboard pollers (UI reads), an account poller (account reads) and
+a steady stream of orders, first with the RequestScheduler disabled and
+then enabled. Without it the pollers spend the budget and orders get
+HTTP 429; with it orders go first, reads are paced and identical reads are
+coalesced. The window is scaled down from HyperLiquid's minute so a run
+takes seconds.
+
+    python benchmarks/bench_rate_limit.py --limit 120 --window 6 --seconds 12
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from stub_exchange import run_stub_server
+
+
+async def run(url, limit, window, seconds, pollers, enabled):
+    from app.hyperliquid_client import HyperliquidAPIError, HyperliquidClient
+    from app.rate_limit import UI_READ, RequestScheduler, read_priority
+    from app.signing import order_action, order_wire
+
+    scheduler = RequestScheduler(limit=limit, burst=limit / 6, window=window, enabled=enabled)
+    client = HyperliquidClient(base_url=url, retries=0, scheduler=scheduler)
+    deadline = time.monotonic() + seconds
+    counts = {"ui": 0, "ui_failed": 0, "account": 0, "account_failed": 0, "orders_failed": 0}
+    order_latencies = []
+
+    async def read(kind, payload, interval):
+        while time.monotonic() < deadline:
+            try:
+                await client.info(payload)
+                counts[kind] += 1
+            except HyperliquidAPIError:
+                counts[kind + "_failed"] += 1
+            await asyncio.sleep(interval)
+
+    async def dashboard():
+        read_priority.set(UI_READ)
+        await asyncio.gather(
+            read("ui", {"type": "clearinghouseState", "user": "0x" + "00" * 20}, 0.05),
+            read("ui", {"type": "openOrders", "user": "0x" + "00" * 20}, 0.2),
+        )
+
+    async def orders():
+        i = 0
+        while time.monotonic() < deadline:
+            action = order_action([order_wire(1, i % 2 == 0, 0.01, 3500.0)])
+            start = time.perf_counter()
+            try:
+                await client.exchange(action, int(time.time() * 1000) + i, {"r": "0x0", "s": "0x0", "v": 27})
+                order_latencies.append(time.perf_counter() - start)
+            except HyperliquidAPIError:
+                counts["orders_failed"] += 1
+            i += 1
+            await asyncio.sleep(0.1)
+
+    await asyncio.gather(
+        *(dashboard() for _ in range(pollers)),
+        read("account", {"type": "clearinghouseState", "user": "0x" + "11" * 20}, 0.1),
+        orders(),
+    )
+    await client.close()
+    order_latencies.sort()
+    counts["orders"] = len(order_latencies)
+    counts["order_p50"] = order_latencies[len(order_latencies) // 2] if order_latencies else 0.0
+    counts["order_p99"] = order_latencies[int(len(order_latencies) * 0.99)] if order_latencies else 0.0
+    counts["coalesced"] = scheduler.coalesced
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request scheduler under a weight limit")
+    parser.add_argument("--limit", type=int, default=120, help="weight allowed per window")
+    parser.add_argument("--window", type=float, default=6.0, help="window in seconds (60 on HyperLiquid)")
+    parser.add_argument("--seconds", type=float, default=12.0)
+    parser.add_argument("--pollers", type=int, default=4, help="dashboard tabs polling the account")
+    parser.add_argument("--stub-port", type=int, default=8100)
+    args = parser.parse_args()
+
+    logging.getLogger("hyperliquid_perp_bot").setLevel(logging.CRITICAL)
+    url = f"http://127.0.0.1:{args.stub_port}"
+    server, _ = run_stub_server(port=args.stub_port, weight_limit=args.limit, window=args.window)
+    stub = server.config.app.state
+
+    print(f"{'scheduler':>9} {'orders':>7} {'failed':>7} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'ui reads':>9} {'account':>8} {'coalesced':>9} {'429s':>6}")
+    for enabled in (False, True):
+        rejected = stub.limit.rejected
+        # Start each run with an empty window
+        time.sleep(args.window)
+        counts = asyncio.run(run(url, args.limit, args.window, args.seconds, args.pollers, enabled))
+        print(f"{'on' if enabled else 'off':>9} {counts['orders']:>7} {counts['orders_failed']:>7} "
+              f"{counts['order_p50'] * 1000:>8.1f} {counts['order_p99'] * 1000:>8.1f} "
+              f"{counts['ui']:>9} {counts['account']:>8} {counts['coalesced']:>9} {stub.limit.rejected - rejected:>6}")
+
+
+if __name__ == "__main__":
+    main()
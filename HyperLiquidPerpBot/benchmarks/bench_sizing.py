@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark the risk-based position sizer.
+
+Measures the cost of a price tick (candle/ATR update and exposure re-mark),
+of max_size when nothing changed since the last call (cache hit), and of
+max_size right after a tick (full recomputation).
+
+    python benchmarks/bench_sizing.py --iterations 200000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ASSETS = {"BTC": 60000.0, "ETH": 3500.0, "SOL": 150.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Position sizer cost per call")
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+
+    from app.account_cache import AccountSnapshot, AccountStateCache
+    from app.sizing import PositionSizer
+
+    cache = AccountStateCache(lambda: AccountSnapshot(balance=100000.0), ttl=3600)
+    cache.get()
+    sizer = PositionSizer(cache, leverage=5)
+    names = list(ASSETS)
+    ts = 1.7e9
+    # Warm the ATR with a day of one-minute ticks and open a position per asset
+    for i in range(1440 * len(names)):
+        asset = names[i % len(names)]
+        sizer.on_price(asset, ASSETS[asset] * (1 + (i % 17 - 8) / 2000), ts + i * 60 / len(names))
+    for asset in names:
+        sizer.on_position(asset, 10000.0 / ASSETS[asset])
+    ts += 1440 * 60
+    n = args.iterations
+
+    start = time.perf_counter()
+    for i in range(n):
+        asset = names[i % 3]
+        sizer.on_price(asset, ASSETS[asset] * (1 + (i % 17 - 8) / 2000), ts + i * 0.1)
+    tick = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(n):
+        sizer.max_size(names[i % 3])
+    cached = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(n):
+        asset = names[i % 3]
+        sizer.on_price(asset, ASSETS[asset] * (1 + (i % 17 - 8) / 2000), ts + i * 0.1)
+        sizer.max_size(asset)
+    uncached = time.perf_counter() - start - tick
+
+    print(f"{'operation':>18} {'calls':>8} {'us/call':>8}")
+    print(f"{'on_price':>18} {n:>8} {tick * 1e6 / n:>8.3f}")
+    print(f"{'max_size cached':>18} {n:>8} {cached * 1e6 / n:>8.3f}")
+    print(f"{'max_size uncached':>18} {n:>8} {uncached * 1e6 / n:>8.3f}")
+    for asset in names:
+        print(f"{asset}: atr {sizer.atr(asset):.2f}, max size {sizer.max_size(asset):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Load test for the webhook and dashboard servers.
+
+Starts an exchange backend (the HTTP stub or the in-process paper exchange),
+then the app from create_app() and the dashboard against a temporary SQLite
+file. It drives them with an open-loop alert rate plus polling dashboard
+clients and SSE streams.
+
+It reports:
+- throughput and latency percentiles, measured from each alert's scheduled
+  send time so a stalled server is not hidden by a slowed client;
+- event-loop lag of the webhook server;
+- server-side stage latencies;
+- database growth.
+
+Results are written as JSON. With --baseline, the run is compared against
+an earlier result and exits non-zero if a key metric regressed by more than
+--tolerance.
+
+    python benchmarks/load_test.py --rate 100 --duration 20 --pollers 4 --output results.json
+    python benchmarks/load_test.py --backend paper --rate 200 --baseline results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+
+import httpx
+import uvicorn
+from eth_account import Account
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from stub_exchange import DEFAULT_MIDS, run_stub_server
+
+POLL_ENDPOINTS = ["/api/status", "/api/open_positions", "/api/trade_history", "/api/balance_history"]
+
+# (result path, higher is better) checked against --baseline
+REGRESSION_CHECKS = [
+    ("alerts.throughput", True),
+    ("alerts.latency.p50_ms", False),
+    ("alerts.latency.p99_ms", False),
+    ("dashboard.latency.p99_ms", False),
+    ("event_loop_lag.p99_ms", False),
+    ("database.bytes_per_alert", False),
+]
+# Latency changes smaller than this are noise, whatever the relative change
+MIN_LATENCY_DELTA_MS = 1.0
+
+
+def summarize(histogram) -> dict:
+    return {
+        "count": histogram.count,
+        "p50_ms": histogram.percentile(50) * 1000,
+        "p90_ms": histogram.percentile(90) * 1000,
+        "p99_ms": histogram.percentile(99) * 1000,
+        "max_ms": histogram.max * 1000,
+    }
+
+
+class LoopLagProbe:
+    """Measures how late the webhook server's event loop wakes from a short sleep"""
+
+    def __init__(self, interval: float = 0.01):
+        from app.metrics import Histogram
+        self.interval = interval
+        self.histogram = Histogram()
+        self.task = None
+
+    async def start(self):
+        self.task = asyncio.ensure_future(self._run())
+
+    def reset(self):
+        from app.metrics import Histogram
+        self.histogram = Histogram()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.histogram.record(max(0.0, loop.time() - expected))
+
+
+def alert_payload(i: int, run_id: str, assets: list, size: float, close_every: int) -> dict:
+    asset = assets[i % len(assets)]
+    turn = i // len(assets)
+    if close_every and turn % close_every == close_every - 1:
+        action = "CLOSE"
+    else:
+        action = "BUY" if turn % 2 == 0 else "SELL"
+    return {"action": action, "size": size, "asset": asset, "alert_id": f"load-{run_id}-{i}"}
+
+
+async def drive_alerts(url: str, args, run_id: str) -> dict:
+    from app.metrics import Histogram
+    latency = Histogram()
+    statuses = Counter()
+    count = int(args.rate * args.duration)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(timeout=30.0, limits=limits) as client:
+        start = time.perf_counter()
+
+        async def one(i):
+            scheduled = start + i / args.rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            async with semaphore:
+                payload = alert_payload(i, run_id, args.assets, args.size, args.close_every)
+                try:
+                    response = await client.post(url, json=payload)
+                    status = str(response.status_code)
+                except httpx.HTTPError:
+                    status = "error"
+            latency.record(time.perf_counter() - scheduled)
+            statuses[status] += 1
+
+        await asyncio.gather(*(one(i) for i in range(count)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "sent": count,
+        "target_rate": args.rate,
+        "elapsed_s": elapsed,
+        "throughput": count / elapsed,
+        "statuses": dict(statuses),
+        "latency": summarize(latency),
+    }
+
+
+async def poll_dashboard(base_url: str, args, stop: asyncio.Event) -> dict:
+    from app.metrics import Histogram
+    overall = Histogram()
+    endpoints = {endpoint: Histogram() for endpoint in POLL_ENDPOINTS}
+    errors = Counter()
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+        async def poller():
+            while not stop.is_set():
+                for endpoint in POLL_ENDPOINTS:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.get(endpoint)
+                        if response.status_code >= 400:
+                            errors[endpoint] += 1
+                    except httpx.HTTPError:
+                        errors[endpoint] += 1
+                    elapsed = time.perf_counter() - started
+                    endpoints[endpoint].record(elapsed)
+                    overall.record(elapsed)
+                try:
+                    await asyncio.wait_for(stop.wait(), args.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+        start = time.perf_counter()
+        await asyncio.gather(*(poller() for _ in range(args.pollers)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "pollers": args.pollers,
+        "requests": overall.count,
+        "throughput": overall.count / elapsed if elapsed else 0.0,
+        "errors": dict(errors),
+        "latency": summarize(overall),
+        "endpoints": {endpoint: summarize(h) for endpoint, h in endpoints.items()},
+    }
+
+
+async def watch_streams(base_url: str, clients: int, stop: asyncio.Event) -> dict:
+    events = Counter()
+
+    async def stream(client):
+        try:
+            async with client.stream("GET", "/api/stream") as response:
+                async for line in response.aiter_lines():
+                    if line.startswith("event:"):
+                        events[line[6:].strip()] += 1
+                    if stop.is_set():
+                        return
+        except httpx.HTTPError:
+            events["error"] += 1
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=httpx.Timeout(30.0, read=None)) as client:
+        tasks = [asyncio.ensure_future(stream(client)) for _ in range(clients)]
+        await stop.wait()
+        await asyncio.sleep(0.5)  # let the last deltas arrive
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return {"clients": clients, "events": dict(events)}
+
+
+async def run_load(args, run_id: str) -> dict:
+    stop = asyncio.Event()
+    webhook_url = f"http://127.0.0.1:{args.port}/webhook"
+    ui_url = f"http://127.0.0.1:{args.ui_port}"
+
+    streams = asyncio.ensure_future(watch_streams(ui_url, args.streams, stop)) if args.streams else None
+    pollers = asyncio.ensure_future(poll_dashboard(ui_url, args, stop)) if args.pollers else None
+    alerts = await drive_alerts(webhook_url, args, run_id)
+    stop.set()
+
+    return {
+        "alerts": alerts,
+        "dashboard": await pollers if pollers else None,
+        "streams": await streams if streams else None,
+    }
+
+
+def database_size(path: str) -> int:
+    """Bytes on disk after folding the WAL back into the database file"""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+def row_counts(path: str) -> dict:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("trades", "balance_history", "bot_status", "webhook_alerts")
+        }
+    finally:
+        conn.close()
+
+
+def server_summaries() -> dict:
+    from app.metrics import metrics
+    return {
+        "webhook": summarize(metrics.histogram("webhook_seconds", endpoint="webhook")),
+        "handle_action": summarize(metrics.histogram("handle_action_seconds")),
+        "order_sign": summarize(metrics.histogram("order_sign_seconds")),
+        "exchange_request": summarize(metrics.histogram("exchange_request_seconds", path="/exchange")),
+        "db_write": summarize(metrics.histogram("db_write_seconds")),
+        "db_query": summarize(metrics.histogram("db_query_seconds")),
+    }
+
+
+def configure_backend(args):
+    """Point the settings at the chosen exchange backend before create_app() runs"""
+    from app.config import settings
+    from app.market_data import price_cache
+
+    settings.market_data_enabled = False
+    # Measures the bot, not HyperLiquid's weight budget (see bench_rate_limit.py)
+    settings.rate_limit_enabled = False
+    settings.hyperliquid_private_key = Account.create().key.hex()
+    settings.hyperliquid_account_address = "0x" + "00" * 20
+    if args.backend == "stub":
+        run_stub_server(port=args.stub_port, latency=args.latency_ms / 1000.0)
+        settings.hyperliquid_api_url = f"http://127.0.0.1:{args.stub_port}"
+        settings.exchange_backend = "live"
+    else:
+        settings.exchange_backend = "paper"
+        settings.paper_balance = 1e9
+        settings.paper_latency_ms = args.latency_ms
+        price_cache.update_mids(DEFAULT_MIDS)
+
+
+def start_servers(args, probe: LoopLagProbe):
+    """Serve the webhook and dashboard apps on one event loop in a background thread"""
+    from app.config import settings
+    from app.main import create_app, create_servers, serve
+
+    settings.api_host = settings.ui_host = "127.0.0.1"
+    settings.api_port = args.port
+    settings.ui_port = args.ui_port
+    app = create_app()
+    app.router.add_event_handler("startup", probe.start)
+    logging.getLogger("hyperliquid_perp_bot").setLevel(logging.WARNING)
+
+    servers = create_servers(app)
+    for name in ("uvicorn.error", "uvicorn.access"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    thread = threading.Thread(target=asyncio.run, args=(serve(servers),), daemon=True)
+    thread.start()
+
+    deadline = time.monotonic() + 10
+    while not all(server.started for server in servers):
+        if time.monotonic() > deadline:
+            raise RuntimeError("Servers failed to start")
+        time.sleep(0.01)
+    return servers[0], thread
+
+
+def lookup(results: dict, path: str):
+    value = results
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Descriptions of the checks that regressed by more than tolerance"""
+    regressions = []
+    for path, higher_is_better in REGRESSION_CHECKS:
+        current, previous = lookup(results, path), lookup(baseline, path)
+        if current is None or previous is None or previous == 0:
+            continue
+        change = (current - previous) / abs(previous)
+        worse = -change if higher_is_better else change
+        if path.endswith("_ms") and abs(current - previous) < MIN_LATENCY_DELTA_MS:
+            worse = 0.0
+        marker = "REGRESSION" if worse > tolerance else "ok"
+        print(f"{path:>28} {previous:>12.2f} -> {current:>12.2f} ({change:+.1%}) {marker}")
+        if worse > tolerance:
+            regressions.append(f"{path}: {previous:.2f} -> {current:.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Webhook and dashboard load test")
+    parser.add_argument("--backend", choices=["stub", "paper"], default="stub")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="simulated exchange round-trip")
+    parser.add_argument("--rate", type=float, default=50.0, help="alerts per second (open loop)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of alert traffic")
+    parser.add_argument("--concurrency", type=int, default=64, help="max alerts in flight")
+    parser.add_argument("--assets", type=lambda s: s.split(","), default=["ETH", "BTC", "SOL"])
+    parser.add_argument("--size", type=float, default=0.01)
+    parser.add_argument("--close-every", type=int, default=10, help="every Nth alert per asset is a CLOSE (0: never)")
+    parser.add_argument("--pollers", type=int, default=4, help="dashboard clients polling the REST API")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--streams", type=int, default=2, help="dashboard clients on /api/stream")
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--ui-port", type=int, default=5101)
+    parser.add_argument("--stub-port", type=int, default=8100)
+    parser.add_argument("--output", help="write the results JSON here")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+
+    run_id = uuid.uuid4().hex[:8]
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        db_path = os.path.join(tmp, "bot_data.db")
+        configure_backend(args)
+        probe = LoopLagProbe()
+        server, thread = start_servers(args, probe)
+
+        bytes_before = database_size(db_path)
+        rows_before = row_counts(db_path)
+        probe.reset()
+        results = asyncio.run(run_load(args, run_id))
+        results["event_loop_lag"] = summarize(probe.histogram)
+
+        # Shutdown flushes the write-behind queue before the database is measured
+        server.should_exit = True
+        thread.join(timeout=10)
+        bytes_after = database_size(db_path)
+        rows_after = row_counts(db_path)
+
+        results["server"] = server_summaries()
+        results["database"] = {
+            "bytes_before": bytes_before,
+            "bytes_after": bytes_after,
+            "growth_bytes": bytes_after - bytes_before,
+            "bytes_per_alert": (bytes_after - bytes_before) / max(1, results["alerts"]["sent"]),
+            "rows_added": {table: rows_after[table] - rows_before[table] for table in rows_after},
+        }
+        results["config"] = {key: value for key, value in vars(args).items()
+                             if key not in ("output", "baseline")}
+
+    alerts = results["alerts"]
+    print(f"backend {args.backend}, {alerts['sent']} alerts at {args.rate:.0f}/s target, "
+          f"{args.pollers} pollers, {args.streams} streams")
+    print(f"alerts    {alerts['throughput']:>8.1f}/s  p50 {alerts['latency']['p50_ms']:.1f}ms  "
+          f"p99 {alerts['latency']['p99_ms']:.1f}ms  statuses {alerts['statuses']}")
+    if results["dashboard"]:
+        dashboard = results["dashboard"]
+        print(f"dashboard {dashboard['throughput']:>8.1f}/s  p50 {dashboard['latency']['p50_ms']:.1f}ms  "
+              f"p99 {dashboard['latency']['p99_ms']:.1f}ms  errors {sum(dashboard['errors'].values())}")
+    lag = results["event_loop_lag"]
+    print(f"loop lag  p50 {lag['p50_ms']:.2f}ms  p99 {lag['p99_ms']:.2f}ms  max {lag['max_ms']:.2f}ms")
+    print(f"database  +{results['database']['growth_bytes']} bytes, rows {results['database']['rows_added']}")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {output}")
+
+    if baseline:
+        with open(baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("regressions: " + "; ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Local stub of the HyperLiquid REST API for offline benchmarks.
+
+Implements the subset of /info and /exchange used by AsyncExchangeManager.
+Orders fill immediately at their limit price and update an in-memory
+clearinghouse state. Signatures are accepted without verification. With
+--weight-limit, requests are weighted like HyperLiquid's and answered with
+HTTP 429 once a rolling window has spent the limit.
+
+    python benchmarks/stub_exchange.py --port 8100 --latency-ms 20 --weight-limit 1200
+"""
+
+import argparse
+import asyncio
+import collections
+import os
+import sys
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.rate_limit import exchange_weight, info_weight
+
+UNIVERSE = [
+    {"name": "BTC", "szDecimals": 5},
+    {"name": "ETH", "szDecimals": 4},
+    {"name": "SOL", "szDecimals": 2},
+] + [{"name": f"ALT{i}", "szDecimals": 1} for i in range(1, 41)]
+DEFAULT_MIDS = {"BTC": 60000.0, "ETH": 3500.0, "SOL": 150.0, **{f"ALT{i}": 10.0 for i in range(1, 41)}}
+
+
+class StubExchangeState:
+    def __init__(self, balance=10000.0, mids=None):
+        self.balance = balance
+        self.mids = dict(mids or DEFAULT_MIDS)
+        self.positions = {}  # coin -> [signed size, entry price]
+        self.orders = 0
+        self._next_oid = 1
+
+    def clearinghouse_state(self):
+        asset_positions = []
+        for coin, (szi, entry_px) in self.positions.items():
+            if szi == 0:
+                continue
+            mid = self.mids[coin]
+            asset_positions.append({
+                "type": "oneWay",
+                "position": {
+                    "coin": coin,
+                    "szi": str(szi),
+                    "entryPx": str(entry_px),
+                    "positionValue": str(abs(szi) * mid),
+                    "unrealizedPnl": str((mid - entry_px) * szi),
+                },
+            })
+        return {
+            "marginSummary": {"accountValue": str(self.balance), "totalMarginUsed": "0.0"},
+            "withdrawable": str(self.balance),
+            "assetPositions": asset_positions,
+        }
+
+    def fill(self, order):
+        coin = UNIVERSE[order["a"]]["name"]
+        size = float(order["s"])
+        px = float(order["p"])
+        signed = size if order["b"] else -size
+        szi, entry_px = self.positions.get(coin, [0.0, 0.0])
+
+        new_szi = szi + signed
+        if szi == 0 or (szi > 0) == (signed > 0):
+            entry_px = (abs(szi) * entry_px + size * px) / abs(new_szi)
+        else:
+            closed = min(abs(szi), size)
+            self.balance += (px - entry_px) * closed * (1 if szi > 0 else -1)
+            if abs(new_szi) > 0 and (new_szi > 0) != (szi > 0):
+                entry_px = px
+        self.positions[coin] = [round(new_szi, 8), entry_px]
+
+        oid = self._next_oid
+        self._next_oid += 1
+        self.orders += 1
+        return {"filled": {"totalSz": order["s"], "avgPx": order["p"], "oid": oid}}
+
+
+class WeightLimit:
+    """Rolling-window request weight limit, enforced like HyperLiquid's per-IP limit"""
+
+    def __init__(self, limit, window=60.0):
+        self.limit = limit
+        self.window = window
+        self.spent = collections.deque()  # (time, weight)
+        self.total = 0
+        self.accepted = 0
+        self.rejected = 0
+
+    def allow(self, weight):
+        now = time.monotonic()
+        while self.spent and self.spent[0][0] <= now - self.window:
+            self.total -= self.spent.popleft()[1]
+        if self.total + weight > self.limit:
+            self.rejected += 1
+            return False
+        self.spent.append((now, weight))
+        self.total += weight
+        self.accepted += 1
+        return True
+
+
+def create_stub_app(latency=0.0, state=None, weight_limit=None, window=60.0):
+    """Build the stub FastAPI app; latency is added to every request in seconds
+
+    ``weight_limit`` caps the request weight accepted per rolling ``window``
+    seconds; the limiter is exposed as ``stub.state.limit``.
+    """
+    stub = FastAPI()
+    stub.state.exchange = state or StubExchangeState()
+    stub.state.limit = WeightLimit(weight_limit, window) if weight_limit else None
+
+    async def simulate_latency():
+        if latency > 0:
+            await asyncio.sleep(latency)
+
+    def throttled(weight):
+        limit = stub.state.limit
+        if limit is None or limit.allow(weight):
+            return None
+        return JSONResponse({"error": "rate limited"}, status_code=429)
+
+    @stub.post("/info")
+    async def info(request: Request):
+        await simulate_latency()
+        payload = await request.json()
+        rejected = throttled(info_weight(payload))
+        if rejected is not None:
+            return rejected
+        state = stub.state.exchange
+        kind = payload.get("type")
+        if kind == "meta":
+            return {"universe": UNIVERSE}
+        if kind == "allMids":
+            return {coin: str(mid) for coin, mid in state.mids.items()}
+        if kind == "clearinghouseState":
+            return state.clearinghouse_state()
+        if kind in ("candleSnapshot", "openOrders"):
+            return []
+        return {"error": f"unsupported info type {kind}"}
+
+    @stub.post("/exchange")
+    async def exchange(request: Request):
+        await simulate_latency()
+        payload = await request.json()
+        action = payload["action"]
+        rejected = throttled(exchange_weight(action))
+        if rejected is not None:
+            return rejected
+        if action.get("type") != "order":
+            return {"status": "err", "response": f"unsupported action {action.get('type')}"}
+        statuses = [stub.state.exchange.fill(order) for order in action["orders"]]
+        return {"status": "ok", "response": {"type": "order", "data": {"statuses": statuses}}}
+
+    return stub
+
+
+def run_stub_server(host="127.0.0.1", port=8100, latency=0.0, state=None, weight_limit=None, window=60.0):
+    """Start the stub in a daemon thread and wait until it accepts requests"""
+    stub = create_stub_app(latency, state, weight_limit, window)
+    config = uvicorn.Config(stub, host=host, port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("Stub exchange failed to start")
+        time.sleep(0.01)
+    return server, thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local HyperLiquid stub exchange")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--weight-limit", type=int, default=None, help="request weight allowed per window")
+    parser.add_argument("--window", type=float, default=60.0, help="rate limit window in seconds")
+    args = parser.parse_args()
+    stub = create_stub_app(args.latency_ms / 1000.0, weight_limit=args.weight_limit, window=args.window)
+    uvicorn.run(stub, host=args.host, port=args.port)
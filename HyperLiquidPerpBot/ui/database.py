@@ -1,21 +1,143 @@
 import sqlite3
 import datetime
 import os
+import queue
+import threading
+from contextlib import contextmanager
+
+from app.metrics import timed
+
+# Pragmas applied to every pooled connection. WAL lets the UI readers run
+# concurrently with the webhook writer, and synchronous=NORMAL only fsyncs
+# at checkpoints instead of on every commit.
+DEFAULT_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -16000),  # negative value is KiB, i.e. ~16MB page cache
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", 5000),
+)
+
+
+class ConnectionPool:
+    """Thread-safe pool of long-lived SQLite connections"""
+
+    def __init__(self, db_path, size=5, pragmas=DEFAULT_PRAGMAS, cached_statements=128):
+        self.db_path = db_path
+        self.size = size
+        self.pragmas = pragmas
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._all = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self):
+        # check_same_thread is disabled because connections are handed out to
+        # whichever thread checks them out; the pool guarantees exclusive use.
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas:
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    def acquire(self, timeout=None):
+        """Check out a connection, opening a new one while below the pool size"""
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if len(self._all) < self.size:
+                conn = self._connect()
+                self._all.append(conn)
+                return conn
+
+        return self._idle.get(timeout=timeout)
+
+    def release(self, conn):
+        """Return a connection to the pool"""
+        if self._closed:
+            conn.close()
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put_nowait(conn)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.acquire(timeout=timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close every connection owned by the pool"""
+        with self._lock:
+            self._closed = True
+            for conn in self._all:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._all.clear()
+
 
 class DatabaseManager:
-    def __init__(self, db_path="bot_data.db"):
+    # Column order of the insert statements below. Shared by the direct
+    # writers and write_batch so both paths hit the same prepared statement.
+    TRADE_COLUMNS = ("timestamp", "ts", "asset", "type", "size", "price", "pnl", "account")
+    BALANCE_COLUMNS = ("timestamp", "ts", "balance")
+    STATUS_COLUMNS = ("status", "timestamp", "ts")
+    TRADE_INSERT = "INSERT INTO trades (timestamp, ts, asset, type, size, price, pnl, account) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+    BALANCE_INSERT = "INSERT INTO balance_history (timestamp, ts, balance) VALUES (?, ?, ?)"
+    STATUS_INSERT = "INSERT INTO bot_status (status, timestamp, ts) VALUES (?, ?, ?)"
+    ALERT_UPSERT = "INSERT OR REPLACE INTO webhook_alerts (key, ts, response) VALUES (?, ?, ?)"
+
+    # Balance rollup resolutions in seconds: minute, hour, day
+    ROLLUP_RESOLUTIONS = (60, 3600, 86400)
+    ROLLUP_UPSERT = """
+        INSERT INTO balance_rollups (resolution, bucket_ts, open, high, low, close, peak, max_drawdown, count)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
+        ON CONFLICT (resolution, bucket_ts) DO UPDATE SET
+            high = MAX(high, excluded.high),
+            low = MIN(low, excluded.low),
+            close = excluded.close,
+            peak = MAX(peak, excluded.peak),
+            max_drawdown = MAX(max_drawdown, excluded.max_drawdown),
+            count = count + 1
+    """
+
+    def __init__(self, db_path="bot_data.db", pool_size=5):
         self.db_path = db_path
+        # SQLite allows a single writer at a time; serializing writes in-process
+        # avoids SQLITE_BUSY retries between the UI and webhook threads.
+        self._write_lock = threading.Lock()
         self.init_database()
-    
+        self.pool = ConnectionPool(db_path, size=pool_size)
+        # Running all-time balance peak used for incremental drawdown
+        self._rollup_lock = threading.Lock()
+        rows = self._query("SELECT MAX(peak) AS peak FROM balance_rollups")
+        self._balance_peak = rows[0]["peak"] if rows and rows[0]["peak"] is not None else None
+
     def init_database(self):
         # Create the database directory if it doesn't exist
         db_dir = os.path.dirname(self.db_path)
         if db_dir and not os.path.exists(db_dir):
             os.makedirs(db_dir)
-            
+
         conn = sqlite3.connect(self.db_path)
         c = conn.cursor()
-        
+
         # Create tables for data storage
         c.execute('''
         CREATE TABLE IF NOT EXISTS trades (
@@ -28,7 +150,7 @@ class DatabaseManager:
             pnl REAL
         )
         ''')
-        
+
         c.execute('''
         CREATE TABLE IF NOT EXISTS balance_history (
             id INTEGER PRIMARY KEY,
@@ -36,7 +158,7 @@ class DatabaseManager:
             balance REAL
         )
         ''')
-        
+
         c.execute('''
         CREATE TABLE IF NOT EXISTS bot_status (
             id INTEGER PRIMARY KEY,
@@ -44,81 +166,294 @@ class DatabaseManager:
             timestamp TEXT
         )
         ''')
-        
+
         conn.commit()
+        self.migrate(conn)
         conn.close()
-    
-    def record_trade(self, asset, trade_type, size, price, pnl):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        timestamp = datetime.datetime.now().isoformat()
-        
-        c.execute(
-            "INSERT INTO trades (timestamp, asset, type, size, price, pnl) VALUES (?, ?, ?, ?, ?, ?)",
-            (timestamp, asset, trade_type, size, price, pnl)
+
+    def migrate(self, conn):
+        """Apply pending schema migrations, tracked in PRAGMA user_version
+
+        Each step and its version bump commit together. sqlite3 opens no
+        implicit transaction for DDL, so the transaction is begun explicitly;
+        otherwise a crash after an ALTER TABLE would re-run it on next start.
+        """
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for target in range(version + 1, len(self.MIGRATIONS) + 1):
+            migration = getattr(self, self.MIGRATIONS[target - 1])
+            with conn:
+                conn.execute("BEGIN")
+                migration(conn)
+                conn.execute(f"PRAGMA user_version = {target}")
+
+    @staticmethod
+    def _iso_to_ms(timestamp):
+        try:
+            return int(datetime.datetime.fromisoformat(timestamp).timestamp() * 1000)
+        except (TypeError, ValueError):
+            return None
+
+    def _migrate_epoch_timestamps(self, conn):
+        """v1: integer epoch-millisecond ts columns, backfilled, plus indexes"""
+        for table in ("trades", "balance_history", "bot_status"):
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN ts INTEGER")
+            rows = conn.execute(f"SELECT id, timestamp FROM {table}").fetchall()
+            conn.executemany(
+                f"UPDATE {table} SET ts = ? WHERE id = ?",
+                ((self._iso_to_ms(timestamp), row_id) for row_id, timestamp in rows)
+            )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_ts ON trades (ts)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_asset_ts ON trades (asset, ts)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_balance_history_ts ON balance_history (ts)")
+
+    def _migrate_balance_rollups(self, conn):
+        """v2: minute/hour/day OHLC + drawdown rollups of balance_history"""
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS balance_rollups (
+            resolution INTEGER,
+            bucket_ts INTEGER,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            peak REAL,
+            max_drawdown REAL,
+            count INTEGER,
+            PRIMARY KEY (resolution, bucket_ts)
+        ) WITHOUT ROWID
+        """)
+
+        peak = None
+        rollups = {}
+        for ts, balance in conn.execute(
+                "SELECT ts, balance FROM balance_history WHERE ts IS NOT NULL ORDER BY ts, id"):
+            peak = balance if peak is None else max(peak, balance)
+            for params in self._rollup_params(ts, balance, peak):
+                key = params[:2]
+                bucket = rollups.get(key)
+                if bucket is None:
+                    rollups[key] = list(params) + [1]
+                else:
+                    bucket[3] = max(bucket[3], balance)
+                    bucket[4] = min(bucket[4], balance)
+                    bucket[5] = balance
+                    bucket[6] = max(bucket[6], peak)
+                    bucket[7] = max(bucket[7], params[7])
+                    bucket[8] += 1
+        conn.executemany(
+            "INSERT INTO balance_rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rollups.values()
         )
-        
-        conn.commit()
-        conn.close()
-    
-    def record_balance(self, balance):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        timestamp = datetime.datetime.now().isoformat()
-        
-        c.execute(
-            "INSERT INTO balance_history (timestamp, balance) VALUES (?, ?)",
-            (timestamp, balance)
+
+    def _migrate_webhook_alerts(self, conn):
+        """v3: idempotency keys and cached responses of processed alerts"""
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS webhook_alerts (
+            key TEXT PRIMARY KEY,
+            ts INTEGER,
+            response TEXT
         )
-        
-        conn.commit()
-        conn.close()
-    
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_webhook_alerts_ts ON webhook_alerts (ts)")
+
+    def _migrate_trade_accounts(self, conn):
+        """v4: account that made each trade (NULL for trades before multi-account support)"""
+        conn.execute("ALTER TABLE trades ADD COLUMN account TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_account_ts ON trades (account, ts)")
+
+    # Ordered migration method names; position + 1 is the schema version
+    MIGRATIONS = (
+        "_migrate_epoch_timestamps",
+        "_migrate_balance_rollups",
+        "_migrate_webhook_alerts",
+        "_migrate_trade_accounts",
+    )
+
+    @timed("db_write_seconds", "Time to commit a database write transaction")
+    def _execute(self, sql, params=()):
+        """Run a single write statement in its own transaction"""
+        with self._write_lock, self.pool.connection() as conn:
+            with conn:
+                conn.execute(sql, params)
+
+    @timed("db_query_seconds", "Time to run a database read query")
+    def _query(self, sql, params=()):
+        """Run a read query and return the rows as dicts"""
+        with self.pool.connection() as conn:
+            return [dict(row) for row in conn.execute(sql, params).fetchall()]
+
+    @staticmethod
+    def _now():
+        now = datetime.datetime.now()
+        return now.isoformat(), int(now.timestamp() * 1000)
+
+    def trade_params(self, asset, trade_type, size, price, pnl, account=None):
+        timestamp, ts = self._now()
+        return (timestamp, ts, asset, trade_type, size, price, pnl, account)
+
+    def balance_params(self, balance):
+        timestamp, ts = self._now()
+        return (timestamp, ts, balance)
+
+    def status_params(self, status):
+        timestamp, ts = self._now()
+        return (status, timestamp, ts)
+
+    def alert_params(self, key, response):
+        return (key, self._now()[1], response)
+
+    def record_trade(self, asset, trade_type, size, price, pnl, account=None):
+        self._execute(self.TRADE_INSERT, self.trade_params(asset, trade_type, size, price, pnl, account))
+
+    def _rollup_params(self, ts, balance, peak):
+        drawdown = (peak - balance) / peak if peak > 0 else 0.0
+        for resolution in self.ROLLUP_RESOLUTIONS:
+            bucket_ms = resolution * 1000
+            yield (resolution, ts - ts % bucket_ms, balance, balance, balance, balance, peak, drawdown)
+
+    def balance_statements(self, balance):
+        """The balance_history insert plus the rollup upserts it implies"""
+        params = self.balance_params(balance)
+        with self._rollup_lock:
+            self._balance_peak = balance if self._balance_peak is None else max(self._balance_peak, balance)
+            peak = self._balance_peak
+        statements = [(self.BALANCE_INSERT, params)]
+        statements.extend((self.ROLLUP_UPSERT, p) for p in self._rollup_params(params[1], balance, peak))
+        return statements
+
+    def record_balance(self, balance):
+        self.write_batch(self.balance_statements(balance))
+
     def update_status(self, status):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        timestamp = datetime.datetime.now().isoformat()
-        
-        c.execute(
-            "INSERT INTO bot_status (status, timestamp) VALUES (?, ?)",
-            (status, timestamp)
+        self._execute(self.STATUS_INSERT, self.status_params(status))
+
+    @timed("db_write_seconds")
+    def write_batch(self, statements):
+        """Apply a list of (sql, params) writes in a single transaction"""
+        with self._write_lock, self.pool.connection() as conn:
+            with conn:
+                for sql, params in statements:
+                    conn.execute(sql, params)
+
+    def get_trades(self, limit=50, since_id=None, before_ts=None, asset=None, account=None):
+        """Recent trades, newest first
+
+        since_id returns only trades newer than that id, oldest first, for
+        incremental polling. before_ts (epoch ms) pages back through history.
+        """
+        clauses, params = [], []
+        if asset:
+            clauses.append("asset = ?")
+            params.append(asset)
+        if account:
+            clauses.append("account = ?")
+            params.append(account)
+        if since_id is not None:
+            clauses.append("id > ?")
+            params.append(since_id)
+            order = "id ASC"
+        else:
+            order = "ts DESC, id DESC"
+        if before_ts is not None:
+            clauses.append("ts < ?")
+            params.append(before_ts)
+
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        return self._query(f"SELECT * FROM trades {where}ORDER BY {order} LIMIT ?", (*params, limit))
+
+    def get_balance_history(self, days=7, since_id=None, before_ts=None, limit=None):
+        """Balance points from the last `days` days, oldest first
+
+        since_id returns only points newer than that id. before_ts (epoch ms)
+        with a limit returns the `limit` points immediately before it.
+        """
+        cutoff_ts = int((datetime.datetime.now() - datetime.timedelta(days=days)).timestamp() * 1000)
+        clauses, params = ["ts > ?"], [cutoff_ts]
+        if since_id is not None:
+            clauses.append("id > ?")
+            params.append(since_id)
+        if before_ts is not None:
+            clauses.append("ts < ?")
+            params.append(before_ts)
+        where = " AND ".join(clauses)
+
+        if limit is None:
+            return self._query(f"SELECT * FROM balance_history WHERE {where} ORDER BY ts ASC, id ASC", params)
+
+        if since_id is not None:
+            return self._query(
+                f"SELECT * FROM balance_history WHERE {where} ORDER BY ts ASC, id ASC LIMIT ?", (*params, limit)
+            )
+
+        # Latest `limit` points in the window, returned oldest first
+        rows = self._query(
+            f"SELECT * FROM balance_history WHERE {where} ORDER BY ts DESC, id DESC LIMIT ?", (*params, limit)
         )
-        
-        conn.commit()
-        conn.close()
-    
-    def get_trades(self, limit=50):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        
-        c.execute("SELECT * FROM trades ORDER BY timestamp DESC LIMIT ?", (limit,))
-        trades = [dict(row) for row in c.fetchall()]
-        
-        conn.close()
-        return trades
-    
-    def get_balance_history(self, days=7):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        
-        # Calculate date for filtering
-        cutoff_date = (datetime.datetime.now() - datetime.timedelta(days=days)).isoformat()
-        
-        c.execute("SELECT * FROM balance_history WHERE timestamp > ? ORDER BY timestamp ASC", (cutoff_date,))
-        history = [dict(row) for row in c.fetchall()]
-        
-        conn.close()
-        return history
-    
+        rows.reverse()
+        return rows
+
+    def get_balance_series(self, days=7, max_points=300):
+        """Balance history for charting, never more than max_points points
+
+        Returns raw points when the window holds few enough of them, otherwise
+        the finest rollup resolution that fits, merging adjacent buckets when
+        even daily buckets exceed the budget.
+        """
+        now_ms = int(datetime.datetime.now().timestamp() * 1000)
+        start_ts = now_ms - int(days * 86400 * 1000)
+
+        raw = self._query(
+            "SELECT * FROM balance_history WHERE ts > ? ORDER BY ts ASC, id ASC LIMIT ?",
+            (start_ts, max_points + 1)
+        )
+        if len(raw) <= max_points:
+            for row in raw:
+                row["resolution"] = 0
+            return raw
+
+        window_s = (now_ms - start_ts) / 1000
+        resolution = next(
+            (r for r in self.ROLLUP_RESOLUTIONS if window_s / r <= max_points),
+            self.ROLLUP_RESOLUTIONS[-1]
+        )
+        buckets = self._query(
+            "SELECT * FROM balance_rollups WHERE resolution = ? AND bucket_ts >= ? ORDER BY bucket_ts ASC",
+            (resolution, start_ts - start_ts % (resolution * 1000))
+        )
+
+        # Merge groups of adjacent buckets when still over budget
+        group = -(-len(buckets) // max_points) if buckets else 1
+        series = []
+        for i in range(0, len(buckets), group):
+            chunk = buckets[i:i + group]
+            series.append({
+                "ts": chunk[0]["bucket_ts"],
+                "timestamp": datetime.datetime.fromtimestamp(chunk[0]["bucket_ts"] / 1000).isoformat(),
+                "open": chunk[0]["open"],
+                "high": max(b["high"] for b in chunk),
+                "low": min(b["low"] for b in chunk),
+                "close": chunk[-1]["close"],
+                "balance": chunk[-1]["close"],
+                "drawdown": max(b["max_drawdown"] for b in chunk),
+                "count": sum(b["count"] for b in chunk),
+                "resolution": resolution * group,
+            })
+        return series
+
+    def load_recent_alerts(self, since_ts, limit):
+        """(key, response) of alerts processed since since_ts, oldest first"""
+        rows = self._query(
+            "SELECT key, response FROM webhook_alerts WHERE ts > ? ORDER BY ts DESC LIMIT ?",
+            (since_ts, limit)
+        )
+        return [(row["key"], row["response"]) for row in reversed(rows)]
+
+    def prune_alerts(self, before_ts):
+        self._execute("DELETE FROM webhook_alerts WHERE ts < ?", (before_ts,))
+
     def get_latest_status(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        
-        c.execute("SELECT * FROM bot_status ORDER BY id DESC LIMIT 1")
-        status = c.fetchone()
-        
-        conn.close()
-        return dict(status) if status else {"status": "UNKNOWN", "timestamp": datetime.datetime.now().isoformat()}
\ No newline at end of file
+        rows = self._query("SELECT * FROM bot_status ORDER BY id DESC LIMIT 1")
+        return rows[0] if rows else {"status": "UNKNOWN", "timestamp": datetime.datetime.now().isoformat()}
+
+    def close(self):
+        """Close all pooled connections"""
+        self.pool.close()
@@ -1,198 +1,366 @@
-from flask import Flask, jsonify, request, render_template, redirect, url_for, send_from_directory
+from fastapi import FastAPI, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from fastapi.staticfiles import StaticFiles
+import asyncio
+import hashlib
+import json
 import os
+import queue
 import sys
-import threading
 import time
+from typing import Optional
 
 # Add the parent directory to the path so we can import from app
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from ui.database import DatabaseManager
 from app.exchange_manager import ExchangeManager
-from app.logger import logger
-from app.config import settings
+from app.logger import bind_request_id, logger, request_id_var, reset_request_id
+from app.market_data import price_cache
+from app.events import RESYNC, event_bus
+from app.metrics import metrics
+from app.rate_limit import UI_READ, read_priority
 
-app = Flask(__name__,
-            static_folder='static',
-            template_folder='templates')
+UI_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Global variables
+# Example prices the alert generator uses in demo mode, which has no price feed
+DEMO_PRICES = {'BTC': 30000, 'ETH': 2000}
+
+
+class StreamSafeGZipMiddleware:
+    """GZipMiddleware that leaves the event stream routes uncompressed
+
+    Older Starlette releases (such as 0.27, used by fastapi 0.104) gzip
+    text/event-stream responses too, which buffers SSE events until the
+    compressor flushes.
+    """
+
+    def __init__(self, app, minimum_size: int = 500, uncompressed_paths=("/api/stream",)):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size)
+        self.uncompressed_paths = frozenset(uncompressed_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.uncompressed_paths:
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip(scope, receive, send)
+
+
+app = FastAPI(title="HyperLiquidPerpBot Dashboard", docs_url=None, redoc_url=None, openapi_url=None)
+# Compresses JSON and static assets; event streams are left uncompressed
+app.add_middleware(StreamSafeGZipMiddleware, minimum_size=1000)
+# StaticFiles answers If-None-Match/If-Modified-Since with 304
+app.mount("/static", StaticFiles(directory=os.path.join(UI_DIR, "static")), name="static")
+
+# Global variables, set by init_ui
 bot_instance = None
-db_manager = DatabaseManager()
+db_manager = None
+
+def init_ui(exchange_manager_instance=None, database: DatabaseManager = None):
+    """Bind the dashboard to the bot and the database shared with the webhook handler"""
+    global bot_instance, db_manager
+    bot_instance = exchange_manager_instance
+    db_manager = database or DatabaseManager()
+
+    # Initialize with a stopped status if nothing exists
+    try:
+        status = db_manager.get_latest_status()
+        if not status or 'status' not in status:
+            db_manager.update_status("STOPPED")
+    except Exception:
+        db_manager.update_status("STOPPED")
+    return app
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    """Bind the request ID and read priority and record the request time per endpoint"""
+    started = time.perf_counter()
+    token = bind_request_id(request.headers.get("X-Request-ID"))
+    # Exchange reads made for the dashboard yield to trading
+    priority = read_priority.set(UI_READ)
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id_var.get()
+    finally:
+        read_priority.reset(priority)
+        reset_request_id(token)
+
+    # Streaming responses are timed to their first byte
+    endpoint = request.scope.get("endpoint")
+    endpoint = getattr(endpoint, "__name__", type(endpoint).__name__ if endpoint else "unknown")
+    metrics.histogram("ui_request_seconds", "Dashboard API request time", endpoint=endpoint).record(
+        time.perf_counter() - started
+    )
+    if response.status_code >= 500:
+        metrics.counter("ui_request_errors_total", "Dashboard API 5xx responses", endpoint=endpoint).inc()
+    return response
+
+def not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in tags or "*" in tags
+
+def cached_json(request: Request, data, status_code: int = 200) -> Response:
+    """JSON response with an ETag of its body; a client holding the same body gets a 304"""
+    body = json.dumps(data, separators=(",", ":")).encode()
+    etag = 'W/"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if status_code == 200 and not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, status_code=status_code, media_type="application/json", headers=headers)
+
+async def run_db(method, *args, **kwargs):
+    """Run a blocking database call off the event loop"""
+    return await asyncio.to_thread(method, *args, **kwargs)
+
+async def call_bot(method, *args, **kwargs):
+    """Call a bot method without blocking the event loop
+
+    Coroutine methods (AsyncExchangeManager) run on this loop, which the
+    dashboard shares with the webhook server; blocking ones run in a thread.
+    """
+    if asyncio.iscoroutinefunction(method):
+        return await method(*args, **kwargs)
+    return await asyncio.to_thread(method, *args, **kwargs)
 
 # API routes
-@app.route('/')
-def index():
-    return render_template('index.html')
+@app.get('/')
+async def index(request: Request):
+    path = os.path.join(UI_DIR, "templates", "index.html")
+    response = FileResponse(path, stat_result=os.stat(path), headers={"Cache-Control": "no-cache"})
+    if not_modified(request, response.headers["etag"]):
+        return Response(status_code=304, headers={"ETag": response.headers["etag"]})
+    return response
 
-@app.route('/static/<path:path>')
-def serve_static(path):
-    return send_from_directory('static', path)
+@app.get('/api/prices')
+async def get_prices(request: Request):
+    return cached_json(request, price_cache.snapshot())
 
-@app.route('/api/status')
-def get_status():
-    status = db_manager.get_latest_status()
-    return jsonify(status)
+@app.get('/api/status')
+async def get_status(request: Request):
+    status = await run_db(db_manager.get_latest_status)
+    return cached_json(request, status)
 
-@app.route('/api/open_positions')
-def get_open_positions():
+@app.get('/api/open_positions')
+async def get_open_positions(request: Request):
     if bot_instance:
         try:
             positions = []
             # In a real implementation, get positions from exchange
-            positions = bot_instance.get_open_positions()
-            return jsonify(positions)
+            positions = await call_bot(bot_instance.get_open_positions)
+            return cached_json(request, positions)
         except Exception as e:
-            logger.error(f"Error getting positions: {e}")
-            return jsonify([])
-    return jsonify([])
+            logger.error("Error getting positions: %s", e)
+            return cached_json(request, [])
+    return cached_json(request, [])
 
-@app.route('/api/trade_history')
-def get_trade_history():
+@app.get('/api/trade_history')
+async def get_trade_history(request: Request, limit: int = 50, since_id: Optional[int] = None,
+                            before_ts: Optional[int] = None, asset: Optional[str] = None,
+                            account: Optional[str] = None):
     try:
-        trades = db_manager.get_trades(limit=50)
-        return jsonify(trades)
+        trades = await run_db(
+            db_manager.get_trades,
+            limit=min(limit, 500),
+            since_id=since_id,
+            before_ts=before_ts,
+            asset=asset,
+            account=account
+        )
+        return cached_json(request, trades)
     except Exception as e:
-        logger.error(f"Error getting trade history: {e}")
-        return jsonify([])
+        logger.error("Error getting trade history: %s", e)
+        return cached_json(request, [])
 
-@app.route('/api/balance_history')
-def get_balance_history():
+@app.get('/api/balance_history')
+async def get_balance_history(request: Request, days: float = 7, since_id: Optional[int] = None,
+                              before_ts: Optional[int] = None, limit: Optional[int] = None,
+                              max_points: int = 300):
     try:
-        history = db_manager.get_balance_history(days=7)
-        return jsonify(history)
+        if since_id is not None or before_ts is not None or limit is not None:
+            # Cursor queries return raw points
+            history = await run_db(
+                db_manager.get_balance_history,
+                days=days,
+                since_id=since_id,
+                before_ts=before_ts,
+                limit=limit
+            )
+        else:
+            history = await run_db(
+                db_manager.get_balance_series,
+                days=days,
+                max_points=min(max_points, 2000)
+            )
+        return cached_json(request, history)
     except Exception as e:
-        logger.error(f"Error getting balance history: {e}")
-        return jsonify([])
+        logger.error("Error getting balance history: %s", e)
+        return cached_json(request, [])
 
-@app.route('/api/start_bot', methods=['POST'])
-def start_bot():
+def format_sse(event_type, data, event_id=None):
+    message = f"event: {event_type}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    return message + f"data: {json.dumps(data)}\n\n"
+
+async def build_snapshot():
+    """Full dashboard state sent when a stream opens or resyncs"""
+    positions = []
+    if bot_instance:
+        try:
+            positions = await call_bot(bot_instance.get_open_positions)
+        except Exception as e:
+            logger.error("Error getting positions: %s", e)
+    return {
+        "status": await run_db(db_manager.get_latest_status),
+        "positions": positions,
+        "trades": await run_db(db_manager.get_trades, limit=50),
+        "balance_history": await run_db(db_manager.get_balance_series, days=7),
+    }
+
+@app.get('/api/stream')
+async def stream():
+    """Server-sent events: one snapshot, then trade/balance/status/positions deltas"""
+    subscription = event_bus.subscribe()
+
+    async def generate():
+        try:
+            # Subscribe before reading the snapshot so no delta is missed
+            yield format_sse("snapshot", await build_snapshot())
+            while True:
+                try:
+                    event = await subscription.aget(timeout=15)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is RESYNC:
+                    yield format_sse("snapshot", await build_snapshot())
+                else:
+                    yield format_sse(event.type, event.data, event.id)
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return StreamingResponse(generate(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.post('/api/start_bot')
+async def start_bot():
     if bot_instance:
         try:
             # In a real implementation, start the bot's trading functionality
             # For now, just update the status
-            db_manager.update_status("RUNNING")
-            return jsonify({'status': 'started'})
+            await run_db(db_manager.update_status, "RUNNING")
+            event_bus.publish("status", await run_db(db_manager.get_latest_status))
+            return {'status': 'started'}
         except Exception as e:
-            logger.error(f"Error starting bot: {e}")
-            return jsonify({'status': 'error', 'message': str(e)}), 500
-    return jsonify({'status': 'error', 'message': 'Bot not initialized'}), 500
+            logger.error("Error starting bot: %s", e)
+            return JSONResponse({'status': 'error', 'message': str(e)}, status_code=500)
+    return JSONResponse({'status': 'error', 'message': 'Bot not initialized'}, status_code=500)
 
-@app.route('/api/stop_bot', methods=['POST'])
-def stop_bot():
+@app.post('/api/stop_bot')
+async def stop_bot():
     if bot_instance:
         try:
             # In a real implementation, stop the bot's trading functionality
             # For now, just update the status
-            db_manager.update_status("STOPPED")
-            return jsonify({'status': 'stopped'})
+            await run_db(db_manager.update_status, "STOPPED")
+            event_bus.publish("status", await run_db(db_manager.get_latest_status))
+            return {'status': 'stopped'}
         except Exception as e:
-            logger.error(f"Error stopping bot: {e}")
-            return jsonify({'status': 'error', 'message': str(e)}), 500
-    return jsonify({'status': 'error', 'message': 'Bot not initialized'}), 500
+            logger.error("Error stopping bot: %s", e)
+            return JSONResponse({'status': 'error', 'message': str(e)}, status_code=500)
+    return JSONResponse({'status': 'error', 'message': 'Bot not initialized'}, status_code=500)
 
-@app.route('/api/update_keys', methods=['POST'])
-def update_api_keys():
+@app.post('/api/update_keys')
+async def update_api_keys(request: Request):
     if not bot_instance:
-        return jsonify({'status': 'error', 'message': 'Bot not initialized'}), 500
-    
+        return JSONResponse({'status': 'error', 'message': 'Bot not initialized'}, status_code=500)
+
     try:
-        data = request.json
-        
+        data = await request.json()
+
         # Update environment variables
         if 'privateKey' in data and data['privateKey']:
             os.environ['HYPERLIQUID_PRIVATE_KEY'] = data['privateKey']
             # Update the bot instance
             bot_instance.private_key = data['privateKey']
-        
+
         if 'accountAddress' in data and data['accountAddress']:
             os.environ['HYPERLIQUID_ACCOUNT_ADDRESS'] = data['accountAddress']
             # Update the bot instance
             bot_instance.account_address = data['accountAddress']
-        
+
         if 'monitoringAddress' in data and data['monitoringAddress']:
             os.environ['HYPERLIQUID_MONITORING_ADDRESS'] = data['monitoringAddress']
             # Update the bot instance
             bot_instance.monitoring_address = data['monitoringAddress']
-        
+
         # Optional: Re-initialize the bot with new keys
         bot_instance.initialize_exchange()
-        
+
         logger.info("API keys updated successfully")
-        return jsonify({'status': 'success', 'message': 'API keys updated successfully'})
+        return {'status': 'success', 'message': 'API keys updated successfully'}
     except Exception as e:
-        logger.error(f"Error updating API keys: {e}")
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        logger.error("Error updating API keys: %s", e)
+        return JSONResponse({'status': 'error', 'message': str(e)}, status_code=500)
+
+@app.post('/api/generate_alert')
+async def generate_alert(request: Request):
+    if not bot_instance:
+        return JSONResponse({'status': 'error', 'message': 'Bot not initialized'}, status_code=500)
 
-@app.route('/api/generate_alert', methods=['POST'])
-def generate_alert():
     try:
-        data = request.json
+        data = await request.json()
         trading_pair = data.get('tradingPair', 'ETH')
-        position_size_percent = float(data.get('positionSize', 10))
         action = data.get('action', 'BUY')
-        
-        # Get current balance
-        balance = bot_instance.get_account_balance()
-        
-        # Calculate the absolute position size based on percentage
-        position_size = (balance * (position_size_percent / 100))
-        
-        # Format to a reasonable number of decimal places for the asset
-        if trading_pair in ['BTC']:
-            position_size = round(position_size / 30000, 4)  # Example BTC price $30,000
-        elif trading_pair in ['ETH']:
-            position_size = round(position_size / 2000, 4)  # Example ETH price $2,000
+
+        # Sizes are converted at the live mid. Demo mode runs without a feed
+        # and falls back to the position's last mark or an example price;
+        # trading through the exchange without a fresh price is refused
+        price = bot_instance.get_price(trading_pair)
+        if price is None:
+            if hasattr(bot_instance, 'get_mid_price'):
+                return JSONResponse({'status': 'error', 'message': f"No live price for {trading_pair}"}, status_code=503)
+            position = bot_instance.positions.get(trading_pair)
+            price = position.current_price if position else DEMO_PRICES.get(trading_pair, 100)
+
+        # Fetching the balance also refreshes the account snapshot the sizer works from
+        balance = await call_bot(bot_instance.get_account_balance)
+        # Largest size the risk engine allows right now
+        max_size = round(bot_instance.calculate_max_position_size(trading_pair), 4)
+
+        # positionSize is a percentage of the balance (10 when omitted); an
+        # empty value asks for the risk-based size instead
+        position_size_percent = data.get('positionSize', 10)
+        if position_size_percent not in (None, ''):
+            position_size = round(balance * (float(position_size_percent) / 100) / price, 4)
         else:
-            position_size = round(position_size / 100, 4)  # Default divisor
-        
+            position_size = max_size
+
         # Generate the alert JSON
         alert_json = {
             "action": action,
             "asset": trading_pair,
             "size": position_size
         }
-        
-        return jsonify({
-            'status': 'success', 
+
+        return {
+            'status': 'success',
             'alert': alert_json,
+            'price': price,
+            'maxSize': max_size,
             'webhook_url': f"http://your-server:8000/webhook"
-        })
+        }
     except Exception as e:
-        logger.error(f"Error generating alert: {e}")
-        return jsonify({'status': 'error', 'message': str(e)}), 500
-
-def run_flask_app(host='0.0.0.0', port=5000):
-    app.run(host=host, port=port, debug=False)
-
-def start_ui_server(exchange_manager_instance=None, host='0.0.0.0', port=5000):
-    global bot_instance
-    bot_instance = exchange_manager_instance
-    
-    # Initialize with a stopped status if nothing exists
-    try:
-        status = db_manager.get_latest_status()
-        if not status or 'status' not in status:
-            db_manager.update_status("STOPPED")
-    except Exception:
-        db_manager.update_status("STOPPED")
-    
-    # Create a thread for the UI server
-    ui_thread = threading.Thread(target=run_flask_app, args=(host, port))
-    ui_thread.daemon = True
-    ui_thread.start()
-    
-    logger.info(f"UI server started at http://{host}:{port}")
-    return ui_thread
+        logger.error("Error generating alert: %s", e)
+        return JSONResponse({'status': 'error', 'message': str(e)}, status_code=500)
 
 if __name__ == "__main__":
-    # For testing, create an exchange manager instance
-    try:
-        exchange_manager = ExchangeManager()
-        start_ui_server(exchange_manager, port=5000)
-        
-        # Keep the main thread alive
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        logger.info("UI server stopping...")
\ No newline at end of file
+    # For testing, serve the dashboard alone with a demo exchange manager
+    import uvicorn
+    init_ui(ExchangeManager())
+    uvicorn.run(app, host="0.0.0.0", port=5000)
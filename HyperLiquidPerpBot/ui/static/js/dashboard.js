@@ -56,35 +56,101 @@ function updateStatusIndicator(status) {
     }
 }
 
+// Render open positions
+function renderPositions(positions) {
+    const tableBody = document.getElementById('positions-table');
+    tableBody.innerHTML = '';
+    
+    if (positions.length === 0) {
+        tableBody.innerHTML = '<tr><td colspan="5" class="text-center">No open positions</td></tr>';
+        return;
+    }
+    
+    positions.forEach(position => {
+        const row = document.createElement('tr');
+        
+        const pnlClass = position.pnl >= 0 ? 'text-success' : 'text-danger';
+        
+        row.innerHTML = `
+            <td>${position.asset}</td>
+            <td>${position.size}</td>
+            <td>${formatCurrency(position.entryPrice)}</td>
+            <td>${formatCurrency(position.currentPrice)}</td>
+            <td class="${pnlClass}">${formatCurrency(position.pnl)}</td>
+        `;
+        
+        tableBody.appendChild(row);
+    });
+}
+
+// Render trade history (newest first)
+let tradeHistory = [];
+
+function renderTrades(trades) {
+    tradeHistory = trades;
+    const tableBody = document.getElementById('trade-history');
+    tableBody.innerHTML = '';
+    
+    if (trades.length === 0) {
+        tableBody.innerHTML = '<tr><td colspan="6" class="text-center">No trade history</td></tr>';
+        return;
+    }
+    
+    document.getElementById('total-trades').textContent = trades.length;
+    
+    // Calculate 24h P/L
+    const now = new Date();
+    const oneDayAgo = new Date(now - 24 * 60 * 60 * 1000);
+    
+    let dailyPnl = 0;
+    
+    trades.forEach(trade => {
+        const tradeDate = new Date(trade.timestamp);
+        
+        if (tradeDate >= oneDayAgo) {
+            dailyPnl += parseFloat(trade.pnl);
+        }
+        
+        const row = document.createElement('tr');
+        
+        const pnlClass = parseFloat(trade.pnl) >= 0 ? 'text-success' : 'text-danger';
+        
+        row.innerHTML = `
+            <td>${formatDate(trade.timestamp)}</td>
+            <td>${trade.asset}${trade.account && trade.account !== 'main' ? ` <small class="text-muted">${trade.account}</small>` : ''}</td>
+            <td>${trade.type}</td>
+            <td>${trade.size}</td>
+            <td>${formatCurrency(trade.price)}</td>
+            <td class="${pnlClass}">${formatCurrency(trade.pnl)}</td>
+        `;
+        
+        tableBody.appendChild(row);
+    });
+    
+    // Update daily P/L display
+    const dailyPnlElement = document.getElementById('daily-pnl');
+    const pnlClass = dailyPnl >= 0 ? 'text-success' : 'text-danger';
+    dailyPnlElement.className = pnlClass;
+    dailyPnlElement.textContent = `${formatCurrency(dailyPnl)}`;
+}
+
+// Render balance history
+function renderBalanceHistory(history) {
+    if (history.length > 0) {
+        // Update current balance
+        const latestBalance = history[history.length - 1].balance;
+        document.getElementById('current-balance').textContent = formatCurrency(latestBalance);
+        
+        // Update balance chart
+        initBalanceChart(history);
+    }
+}
+
 // Fetch open positions
 function fetchOpenPositions() {
     fetch('/api/open_positions')
         .then(response => response.json())
-        .then(positions => {
-            const tableBody = document.getElementById('positions-table');
-            tableBody.innerHTML = '';
-            
-            if (positions.length === 0) {
-                tableBody.innerHTML = '<tr><td colspan="5" class="text-center">No open positions</td></tr>';
-                return;
-            }
-            
-            positions.forEach(position => {
-                const row = document.createElement('tr');
-                
-                const pnlClass = position.pnl >= 0 ? 'text-success' : 'text-danger';
-                
-                row.innerHTML = `
-                    <td>${position.asset}</td>
-                    <td>${position.size}</td>
-                    <td>${formatCurrency(position.entryPrice)}</td>
-                    <td>${formatCurrency(position.currentPrice)}</td>
-                    <td class="${pnlClass}">${formatCurrency(position.pnl)}</td>
-                `;
-                
-                tableBody.appendChild(row);
-            });
-        })
+        .then(renderPositions)
         .catch(error => console.error('Error fetching positions:', error));
 }
 
@@ -92,52 +158,7 @@ function fetchOpenPositions() {
 function fetchTradeHistory() {
     fetch('/api/trade_history')
         .then(response => response.json())
-        .then(trades => {
-            const tableBody = document.getElementById('trade-history');
-            tableBody.innerHTML = '';
-            
-            if (trades.length === 0) {
-                tableBody.innerHTML = '<tr><td colspan="6" class="text-center">No trade history</td></tr>';
-                return;
-            }
-            
-            document.getElementById('total-trades').textContent = trades.length;
-            
-            // Calculate 24h P/L
-            const now = new Date();
-            const oneDayAgo = new Date(now - 24 * 60 * 60 * 1000);
-            
-            let dailyPnl = 0;
-            
-            trades.forEach(trade => {
-                const tradeDate = new Date(trade.timestamp);
-                
-                if (tradeDate >= oneDayAgo) {
-                    dailyPnl += parseFloat(trade.pnl);
-                }
-                
-                const row = document.createElement('tr');
-                
-                const pnlClass = parseFloat(trade.pnl) >= 0 ? 'text-success' : 'text-danger';
-                
-                row.innerHTML = `
-                    <td>${formatDate(trade.timestamp)}</td>
-                    <td>${trade.asset}</td>
-                    <td>${trade.type}</td>
-                    <td>${trade.size}</td>
-                    <td>${formatCurrency(trade.price)}</td>
-                    <td class="${pnlClass}">${formatCurrency(trade.pnl)}</td>
-                `;
-                
-                tableBody.appendChild(row);
-            });
-            
-            // Update daily P/L display
-            const dailyPnlElement = document.getElementById('daily-pnl');
-            const pnlClass = dailyPnl >= 0 ? 'text-success' : 'text-danger';
-            dailyPnlElement.className = pnlClass;
-            dailyPnlElement.textContent = `${formatCurrency(dailyPnl)}`;
-        })
+        .then(renderTrades)
         .catch(error => console.error('Error fetching trade history:', error));
 }
 
@@ -145,16 +166,7 @@ function fetchTradeHistory() {
 function fetchBalanceHistory() {
     fetch('/api/balance_history')
         .then(response => response.json())
-        .then(history => {
-            if (history.length > 0) {
-                // Update current balance
-                const latestBalance = history[history.length - 1].balance;
-                document.getElementById('current-balance').textContent = formatCurrency(latestBalance);
-                
-                // Update balance chart
-                initBalanceChart(history);
-            }
-        })
+        .then(renderBalanceHistory)
         .catch(error => console.error('Error fetching balance history:', error));
 }
 
@@ -168,6 +180,88 @@ function fetchBotStatus() {
         .catch(error => console.error('Error fetching bot status:', error));
 }
 
+function fetchAll() {
+    fetchBotStatus();
+    fetchOpenPositions();
+    fetchTradeHistory();
+    fetchBalanceHistory();
+}
+
+// Apply a single balance point to the chart without re-rendering it,
+// keeping at most MAX_CHART_POINTS points on screen
+const MAX_CHART_POINTS = 300;
+
+function appendBalancePoint(point) {
+    document.getElementById('current-balance').textContent = formatCurrency(point.balance);
+    if (!balanceChart) {
+        initBalanceChart([point]);
+        return;
+    }
+    balanceChart.data.labels.push(formatDate(point.timestamp));
+    balanceChart.data.datasets[0].data.push(point.balance);
+    if (balanceChart.data.labels.length > MAX_CHART_POINTS) {
+        balanceChart.data.labels.shift();
+        balanceChart.data.datasets[0].data.shift();
+    }
+    balanceChart.update('none');
+}
+
+function tradeKey(trade) {
+    return `${trade.timestamp}|${trade.account || ''}|${trade.asset}|${trade.type}`;
+}
+
+// Live updates: one snapshot over /api/stream followed by deltas.
+// Falls back to polling when server-sent events are unavailable.
+let pollTimer = null;
+
+function startPolling() {
+    if (pollTimer === null) {
+        fetchAll();
+        pollTimer = setInterval(fetchAll, 30000); // Refresh every 30 seconds
+    }
+}
+
+function stopPolling() {
+    if (pollTimer !== null) {
+        clearInterval(pollTimer);
+        pollTimer = null;
+    }
+}
+
+function connectStream() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    
+    const source = new EventSource('/api/stream');
+    
+    source.addEventListener('snapshot', event => {
+        const snapshot = JSON.parse(event.data);
+        stopPolling();
+        updateStatusIndicator(snapshot.status.status);
+        renderPositions(snapshot.positions);
+        renderTrades(snapshot.trades);
+        renderBalanceHistory(snapshot.balance_history);
+    });
+    
+    source.addEventListener('trade', event => {
+        const trade = JSON.parse(event.data);
+        // The snapshot may already contain a trade published while it was read
+        if (tradeHistory.some(t => tradeKey(t) === tradeKey(trade))) {
+            return;
+        }
+        renderTrades([trade, ...tradeHistory].slice(0, 50));
+    });
+    
+    source.addEventListener('balance', event => appendBalancePoint(JSON.parse(event.data)));
+    source.addEventListener('status', event => updateStatusIndicator(JSON.parse(event.data).status));
+    source.addEventListener('positions', event => renderPositions(JSON.parse(event.data)));
+    
+    // EventSource reconnects on its own and gets a fresh snapshot; poll meanwhile
+    source.onerror = () => startPolling();
+}
+
 // Start bot
 document.getElementById('start-btn').addEventListener('click', function() {
     fetch('/api/start_bot', {
@@ -192,11 +286,8 @@ document.getElementById('stop-btn').addEventListener('click', function() {
     .catch(error => console.error('Error stopping bot:', error));
 });
 
-// Initial data load
-fetchBotStatus();
-fetchOpenPositions();
-fetchTradeHistory();
-fetchBalanceHistory();
+// Initial data load and live updates
+connectStream();
 
 // API keys configuration
 document.getElementById('save-api-config').addEventListener('click', function() {
@@ -264,6 +355,7 @@ document.getElementById('generate-alert').addEventListener('click', function() {
                 "// Instructions": "Copy this JSON to your TradingView alert message",
                 "// Webhook URL": webhookUrl,
                 "// Set Content Type": "application/json",
+                "// Max size under risk limits": result.maxSize,
                 ...alertJson
             };
             
@@ -276,12 +368,4 @@ document.getElementById('generate-alert').addEventListener('click', function() {
         console.error('Error generating alert:', error);
         alert('Error generating alert. See console for details.');
     });
-});
-
-// Set up auto-refresh
-setInterval(() => {
-    fetchBotStatus();
-    fetchOpenPositions();
-    fetchTradeHistory();
-    fetchBalanceHistory();
-}, 30000); // Refresh every 30 seconds
\ No newline at end of file
+});
\ No newline at end of file
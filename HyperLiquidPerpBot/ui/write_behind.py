@@ -0,0 +1,144 @@
+import atexit
+import queue
+import threading
+import time
+
+from app.events import event_bus
+from app.logger import logger
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """Buffers trade/balance/status writes and flushes them in batches
+
+    Records are timestamped when they are queued, published to the dashboard
+    event bus immediately, and written by a background thread in a single
+    transaction per batch. A batch is flushed as soon as it reaches
+    ``batch_size`` records or ``flush_interval`` seconds after its first
+    record, whichever comes first.
+    """
+
+    def __init__(self, db_manager, batch_size=100, flush_interval=0.05, max_queue=10000):
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # A full queue blocks the producer rather than dropping records.
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self.records_written = 0
+        self.batches_written = 0
+        self.write_errors = 0
+        self.max_depth = 0
+
+        self._thread = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def depth(self):
+        """Number of records waiting to be written"""
+        return self._queue.qsize()
+
+    def _put(self, sql, params):
+        if self._closed:
+            # Late writers after shutdown go straight to disk.
+            self.db_manager.write_batch([(sql, params)])
+            return
+        self._queue.put((sql, params))
+        depth = self._queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def record_trade(self, asset, trade_type, size, price, pnl, account=None):
+        params = self.db_manager.trade_params(asset, trade_type, size, price, pnl, account)
+        self._put(self.db_manager.TRADE_INSERT, params)
+        event_bus.publish("trade", dict(zip(self.db_manager.TRADE_COLUMNS, params)))
+
+    def record_balance(self, balance):
+        statements = self.db_manager.balance_statements(balance)
+        for sql, params in statements:
+            self._put(sql, params)
+        event_bus.publish("balance", dict(zip(self.db_manager.BALANCE_COLUMNS, statements[0][1])))
+
+    def update_status(self, status):
+        params = self.db_manager.status_params(status)
+        self._put(self.db_manager.STATUS_INSERT, params)
+        event_bus.publish("status", dict(zip(self.db_manager.STATUS_COLUMNS, params)))
+
+    def record_alert(self, key, response):
+        self._put(self.db_manager.ALERT_UPSERT, self.db_manager.alert_params(key, response))
+
+    def _collect(self, first):
+        """Gather up to batch_size records, waiting at most flush_interval"""
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        stop = False
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _write(self, batch):
+        try:
+            self.db_manager.write_batch(batch)
+            self.records_written += len(batch)
+            self.batches_written += 1
+        except Exception as e:
+            self.write_errors += 1
+            logger.error("Error flushing %s queued database writes: %s", len(batch), e)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                self._queue.task_done()
+                break
+            batch, stop = self._collect(first)
+            self._write(batch)
+            if stop:
+                self._queue.task_done()
+                break
+
+        # Drain anything queued after the stop marker.
+        remaining = []
+        while True:
+            try:
+                remaining.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if remaining:
+            self._write(remaining)
+
+    def flush(self):
+        """Block until every queued record has been written"""
+        if self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """Stop the worker after writing all pending records"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        logger.info("Write-behind queue closed: %s records in %s batches", self.records_written, self.batches_written)
+
+    def stats(self):
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "records_written": self.records_written,
+            "batches_written": self.batches_written,
+            "write_errors": self.write_errors,
+        }